@@ -11,6 +11,7 @@ export default function Controls() {
     nodeInfo: controlNodeInfo,
     nodeState: controlNodeState,
     calibrate,
+    verifyCalibration,
     addCalibrationPoint,
   } = useControlNode("/control0");
 
@@ -43,6 +44,14 @@ export default function Controls() {
         >
           Start Calibration
         </Button>
+        <Button
+          disabled={disableButtons || !controlNodeState.calibrated}
+          onClick={() => {
+            verifyCalibration();
+          }}
+        >
+          Verify Calibration
+        </Button>
       </div>
       <p className="text-center">
         After calibration, click on the image below to fire the laser at that
@@ -80,6 +80,10 @@ export default function useControlNode(nodeName: string) {
     ros.callService(`${nodeName}/calibrate`, "std_srvs/Trigger", {});
   }, [ros, nodeName]);
 
+  const verifyCalibration = useCallback(() => {
+    ros.callService(`${nodeName}/verify_calibration`, "std_srvs/Trigger", {});
+  }, [ros, nodeName]);
+
   const addCalibrationPoint = useCallback(
     (normalizedX: number, normalizedY: number) => {
       ros.callService(
@@ -114,6 +118,7 @@ export default function useControlNode(nodeName: string) {
     nodeInfo,
     nodeState,
     calibrate,
+    verifyCalibration,
     addCalibrationPoint,
     manualTargetAimLaser,
     startRunnerCutter,
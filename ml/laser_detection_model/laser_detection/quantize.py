@@ -0,0 +1,37 @@
+"""File: quantize.py
+
+Description: Script to quantize a trained YOLOv8 model to INT8, and report its accuracy and latency
+against the unquantized model
+"""
+
+import argparse
+import os
+
+from laser_detection.yolov8_eval import evaluate
+from runner_segmentation.quantize import add_quantize_args, run_quantize_command
+
+PROJECT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+# Same size that the model is trained and run at
+MODEL_SIZE = (640, 480)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Quantize a trained model to INT8, and report its accuracy and latency"
+    )
+    add_quantize_args(parser, os.path.join(PROJECT_PATH, "dataset.yml"), MODEL_SIZE)
+    parser.add_argument(
+        "--skip_ultralytics_val",
+        action="store_true",
+        help="Skip the reference evaluation of the PyTorch model with yolov8_eval",
+    )
+    args = parser.parse_args()
+
+    reference_metrics = None
+    if not args.skip_ultralytics_val:
+        metrics = evaluate(args.weights_file)
+        reference_metrics = {
+            "mAP50 (box)": metrics.box.map50,
+            "mAP50-95 (box)": metrics.box.map,
+        }
+    run_quantize_command(args, reference_metrics)
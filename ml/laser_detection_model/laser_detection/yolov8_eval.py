@@ -10,12 +10,16 @@ from ultralytics import YOLO
 PROJECT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 
 
-def main(model_path):
+def evaluate(model_path):
     model = YOLO(model_path)
-    metrics = model.val(
+    return model.val(
         data=os.path.join(PROJECT_PATH, "dataset.yml"),
         split="test",
     )
+
+
+def main(model_path):
+    metrics = evaluate(model_path)
     print(f"mAP50: {metrics.box.map50}")
     print(f"mAP50-95: {metrics.box.map}")
 
@@ -0,0 +1,158 @@
+"""
+Helpers for instance mask bitmaps: (N, height, width) boolean arrays with one mask per instance,
+such as the "bitmaps" masks of runner_segmentation's Yolo. Working on bitmaps directly avoids
+extracting polygons from model masks and rasterizing them again. Bounding boxes are found with
+vectorized operations on all masks, and per-mask work is limited to each mask's bounding box.
+"""
+
+import cv2
+import numpy as np
+
+from ml_utils.mask_center import CENTER_METHODS, medial_axis_points
+
+
+def mask_bboxes(masks):
+    """
+    Args:
+        masks (numpy.ndarray): (N, height, width) boolean masks
+
+    Returns:
+        numpy.ndarray: (N, 4) int array of (x1, y1, x2, y2) bounding boxes, where x2 and y2 are exclusive. All zeros for empty masks.
+    """
+    num_masks, height, width = masks.shape
+    rows = masks.any(axis=2)
+    cols = masks.any(axis=1)
+    bboxes = np.column_stack(
+        (
+            cols.argmax(axis=1),
+            rows.argmax(axis=1),
+            width - cols[:, ::-1].argmax(axis=1),
+            height - rows[:, ::-1].argmax(axis=1),
+        )
+    )
+    bboxes[~rows.any(axis=1)] = 0
+    return bboxes
+
+
+def _mask_crops(masks, bboxes):
+    # Crops of each mask to its bounding box, as uint8 views for OpenCV
+    return [
+        mask[y1:y2, x1:x2].view(np.uint8)
+        for mask, (x1, y1, x2, y2) in zip(masks, bboxes)
+    ]
+
+
+def mask_areas(masks):
+    """
+    Args:
+        masks (numpy.ndarray): (N, height, width) boolean masks
+
+    Returns:
+        numpy.ndarray: (N,) number of pixels in each mask
+    """
+    crops = _mask_crops(masks, mask_bboxes(masks))
+    return np.array([np.count_nonzero(crop) for crop in crops], dtype=np.int64)
+
+
+def mask_centroids(masks):
+    """
+    Args:
+        masks (numpy.ndarray): (N, height, width) boolean masks
+
+    Returns:
+        numpy.ndarray: (N, 2) (x, y) centroid of each mask. NaN for empty masks.
+    """
+    bboxes = mask_bboxes(masks)
+    centroids = np.full((len(masks), 2), np.nan)
+    for idx, crop in enumerate(_mask_crops(masks, bboxes)):
+        if crop.size == 0:
+            continue
+        moments = cv2.moments(crop, binaryImage=True)
+        if moments["m00"] > 0:
+            centroids[idx] = (
+                bboxes[idx, 0] + moments["m10"] / moments["m00"],
+                bboxes[idx, 1] + moments["m01"] / moments["m00"],
+            )
+    return centroids
+
+
+def mask_centers(masks, method="skeleton"):
+    """
+    Find the center of each mask: the point on the mask's medial axis that is closest to its
+    centroid, as in mask_center.mask_center. The medial axis is found only within each mask's
+    bounding box.
+
+    Args:
+        masks (numpy.ndarray): (N, height, width) boolean masks
+        method (str): One of mask_center.CENTER_METHODS.
+
+    Returns:
+        List[Optional[List[int]]]: Center (x, y) of each mask, or None if a mask is empty.
+    """
+    if method not in CENTER_METHODS:
+        raise ValueError(f"Unknown center method: {method}")
+
+    centers = []
+    bboxes = mask_bboxes(masks)
+    for crop, (x1, y1, x2, y2) in zip(_mask_crops(masks, bboxes), bboxes):
+        if x2 <= x1 or y2 <= y1:
+            centers.append(None)
+            continue
+
+        # Pad the bounding box by 1 pixel so that the mask's edge does not touch the crop's edge,
+        # which would affect the medial axis
+        padded = cv2.copyMakeBorder(crop, 1, 1, 1, 1, cv2.BORDER_CONSTANT, value=0)
+        points = medial_axis_points(padded, method)
+        if len(points) == 0:
+            centers.append(None)
+            continue
+
+        # Find the point on the medial axis that is closest to the centroid
+        moments = cv2.moments(padded, binaryImage=True)
+        centroid = (moments["m01"] / moments["m00"], moments["m10"] / moments["m00"])
+        distances = np.linalg.norm(points - np.array(centroid), axis=1)
+        center = points[np.argmin(distances)]
+        # Bounding boxes are numpy ints, so cast the sums to match contour_centers
+        centers.append([int(center[1] + x1 - 1), int(center[0] + y1 - 1)])
+    return centers
+
+
+def scale_mask_points(points, mask_size, image_size):
+    """
+    Convert pixel coords in masks to pixel coords in an image covering the same area at a different
+    resolution.
+
+    Args:
+        points (numpy.ndarray): (N, 2) (x, y) pixel coords in the masks
+        mask_size (Tuple[int, int]): (width, height) of the masks
+        image_size (Tuple[int, int]): (width, height) of the image
+
+    Returns:
+        numpy.ndarray: (N, 2) (x, y) pixel coords in the image
+    """
+    scale = np.array(image_size) / np.array(mask_size)
+    # Map pixel centers to pixel centers
+    return (np.asarray(points, dtype=np.float64) + 0.5) * scale - 0.5
+
+
+def overlay_masks(image, masks, color):
+    """
+    Fill the union of masks on an image, resizing the masks to the image if needed.
+
+    Args:
+        image (numpy.ndarray): (height, width, channels) image to draw on, in place
+        masks (numpy.ndarray): (N, mask_height, mask_width) boolean masks covering the image
+        color (Tuple[int, ...]): Fill color
+
+    Returns:
+        numpy.ndarray: The image
+    """
+    if len(masks) == 0:
+        return image
+
+    union = masks.any(axis=0).astype(np.uint8)
+    height, width = image.shape[:2]
+    if union.shape != (height, width):
+        union = cv2.resize(union, (width, height), interpolation=cv2.INTER_NEAREST)
+    image[union.astype(bool)] = color
+    return image
@@ -6,7 +6,7 @@ import numpy as np
 from scipy import ndimage
 from shapely import Polygon
 from shapely.ops import nearest_points
-from skimage.morphology import skeletonize
+from skimage.morphology import medial_axis, skeletonize
 from . import segment_utils
 
 
@@ -41,6 +41,90 @@ def contour_center(contour):
     return mask_center(mask)
 
 
+# Methods for finding a mask's center among points on its medial axis:
+#   "skeleton": skeletonize the mask, as in mask_center
+#   "distance_transform": ridge of the mask's distance transform. Fastest
+#   "medial_axis": medial axis of the mask
+CENTER_METHODS = ("skeleton", "distance_transform", "medial_axis")
+
+
+def medial_axis_points(mask, method="skeleton"):
+    """
+    Args:
+        mask (numpy.ndarray): uint8 mask
+        method (str): One of CENTER_METHODS.
+
+    Returns:
+        numpy.ndarray: (N, 2) (row, col) points on the mask's medial axis
+    """
+    if method == "skeleton":
+        axis = skeletonize(mask)
+    elif method == "distance_transform":
+        # Ridge pixels of the distance transform are local maxima in their 3x3 neighborhood
+        dist = cv2.distanceTransform(mask, cv2.DIST_L2, cv2.DIST_MASK_PRECISE)
+        axis = (dist > 0) & (dist >= cv2.dilate(dist, np.ones((3, 3), np.uint8)))
+    elif method == "medial_axis":
+        # medial_axis breaks ties in a random order, so seed it for repeatable centers
+        axis = medial_axis(mask, rng=0)
+    else:
+        raise ValueError(f"Unknown center method: {method}")
+    return np.column_stack(np.nonzero(axis))
+
+
+def local_contour_center(contour, method="skeleton"):
+    """
+    Find the center of a contour by rasterizing it only within its bounding box, rather than
+    allocating and processing a mask spanning from the origin to the contour as contour_center
+    does. With the "skeleton" method, gives the same result as contour_center, except that
+    contour_center clips the contour's last row and column.
+
+    Args:
+        contour (numpy.ndarray): (N, 2) points of the contour outline
+        method (str): One of CENTER_METHODS. How to find the mask's medial axis, on which the point closest to the centroid is the center.
+
+    Returns:
+        Optional[List[int]]: Center (x, y) of the contour, or None if the contour is empty.
+    """
+    contour = np.array(contour, dtype=np.int32).reshape(-1, 1, 2)
+    if contour.shape[0] == 0:
+        return None
+
+    # Pad the bounding box by 1 pixel so that the mask's edge does not touch the crop's edge,
+    # which would affect the skeleton and distance transform
+    left, top, width, height = cv2.boundingRect(contour)
+    mask = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    cv2.drawContours(
+        mask, [contour], -1, 255, thickness=cv2.FILLED, offset=(1 - left, 1 - top)
+    )
+
+    points = medial_axis_points(mask, method)
+    if len(points) == 0:
+        return None
+
+    # Find the point on the medial axis that is closest to the centroid
+    moments = cv2.moments(mask, binaryImage=True)
+    centroid = (moments["m01"] / moments["m00"], moments["m10"] / moments["m00"])
+    distances = np.linalg.norm(points - np.array(centroid), axis=1)
+    center = points[np.argmin(distances)]
+    return [int(center[1] + left - 1), int(center[0] + top - 1)]
+
+
+def contour_centers(contours, method="skeleton"):
+    """
+    Find the centers of all contours in a frame. See local_contour_center.
+
+    Args:
+        contours (List[numpy.ndarray]): Contours, each of (N, 2) points of the contour outline
+        method (str): One of CENTER_METHODS.
+
+    Returns:
+        List[Optional[List[int]]]: Center (x, y) of each contour, or None if a contour is empty.
+    """
+    if method not in CENTER_METHODS:
+        raise ValueError(f"Unknown center method: {method}")
+    return [local_contour_center(contour, method) for contour in contours]
+
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument(
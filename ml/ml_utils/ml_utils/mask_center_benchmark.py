@@ -0,0 +1,189 @@
+"""
+Benchmark the speed and agreement of local_contour_center methods against contour_center, on
+runner contours from YOLO segmentation labels or on synthetic runner contours.
+"""
+
+import argparse
+import os
+from glob import glob
+from time import perf_counter
+
+import cv2
+import numpy as np
+
+from ml_utils.mask_center import CENTER_METHODS, contour_center, local_contour_center
+
+
+def tuple_type(arg_string):
+    try:
+        # Parse the input string as a tuple
+        parsed_tuple = tuple(map(int, arg_string.strip("()").split(",")))
+        return parsed_tuple
+    except Exception as e:
+        raise argparse.ArgumentTypeError(f"Invalid tuple value: {arg_string}")
+
+
+def load_label_contours(labels_dir, frame_size):
+    """
+    Load contours from YOLO segmentation label files.
+
+    Args:
+        labels_dir (str): Directory containing YOLO segmentation label .txt files
+        frame_size (Tuple[int, int]): (width, height) of the frame the labels are scaled to
+
+    Returns:
+        List[numpy.ndarray]: (N, 2) contours in frame coords
+    """
+    contours = []
+    for label_path in sorted(glob(os.path.join(labels_dir, "*.txt"))):
+        with open(label_path) as f:
+            for line in f.read().splitlines():
+                values = line.split()
+                # Each line is a class index followed by normalized x, y pairs
+                if len(values) < 7:
+                    continue
+                contour = np.array(values[1:], dtype=np.float32).reshape(-1, 2)
+                contours.append(contour * np.array(frame_size, dtype=np.float32))
+    return contours
+
+
+def generate_synthetic_contours(num_contours, frame_size, seed=0):
+    """
+    Generate runner-like contours: thick, meandering curves anywhere in the frame.
+
+    Args:
+        num_contours (int): Number of contours to generate
+        frame_size (Tuple[int, int]): (width, height) of the frame
+        seed (int): Random seed
+
+    Returns:
+        List[numpy.ndarray]: (N, 2) contours in frame coords
+    """
+    rng = np.random.default_rng(seed)
+    width, height = frame_size
+    contours = []
+    while len(contours) < num_contours:
+        num_steps = rng.integers(5, 20)
+        step_length = rng.uniform(10.0, 40.0)
+        angles = rng.uniform(0.0, 2 * np.pi) + np.cumsum(
+            rng.normal(0.0, 0.4, num_steps)
+        )
+        steps = step_length * np.column_stack((np.cos(angles), np.sin(angles)))
+        start = rng.uniform((0, 0), (width, height))
+        points = np.vstack((start, start + np.cumsum(steps, axis=0)))
+
+        mask = np.zeros((height, width), dtype=np.uint8)
+        cv2.polylines(
+            mask,
+            [np.round(points).astype(np.int32)],
+            isClosed=False,
+            color=255,
+            thickness=int(rng.integers(4, 20)),
+        )
+        mask_contours, _ = cv2.findContours(
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        if not mask_contours:
+            continue
+        contour = max(mask_contours, key=cv2.contourArea).reshape(-1, 2)
+        if len(contour) < 3:
+            continue
+        # Model output contours have sub-pixel coords
+        contours.append(contour + rng.uniform(0.0, 1.0, contour.shape))
+    return contours
+
+
+def benchmark(contours, repeat=1):
+    """
+    Args:
+        contours (List[numpy.ndarray]): (N, 2) contours in frame coords
+        repeat (int): Number of times to time each method on all contours
+
+    Returns:
+        dict: For the reference contour_center and each local_contour_center method, the time per contour in milliseconds (best of the repetitions) and, for each method, its distance in pixels to the reference center
+    """
+
+    def time_centers(center_fn):
+        durations_ms = []
+        for _ in range(repeat):
+            start = perf_counter()
+            centers = [center_fn(contour) for contour in contours]
+            durations_ms.append((perf_counter() - start) * 1000 / len(contours))
+        return centers, min(durations_ms)
+
+    reference_centers, reference_ms = time_centers(contour_center)
+    results = {"reference": {"ms_per_contour": reference_ms}}
+    for method in CENTER_METHODS:
+        centers, method_ms = time_centers(
+            lambda contour: local_contour_center(contour, method)
+        )
+        distances = np.array(
+            [
+                np.linalg.norm(np.array(center) - np.array(reference_center))
+                for center, reference_center in zip(centers, reference_centers)
+                if center is not None and reference_center is not None
+            ]
+        )
+        results[method] = {
+            "ms_per_contour": method_ms,
+            "speedup": reference_ms / method_ms,
+            "mean_dist": float(distances.mean()),
+            "p95_dist": float(np.percentile(distances, 95)),
+            "max_dist": float(distances.max()),
+            "exact_match": float(np.mean(distances == 0.0)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--labels_dir",
+        type=str,
+        default=None,
+        help="Dir of YOLO segmentation label files to take contours from. If not provided, synthetic contours are used",
+    )
+    parser.add_argument(
+        "--frame_size",
+        type=tuple_type,
+        default="(2048, 1536)",
+        help="Frame size (width, height) that contours are scaled to or generated in",
+    )
+    parser.add_argument(
+        "--num_synthetic",
+        type=int,
+        default=200,
+        help="Number of synthetic contours",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="Number of timing repetitions"
+    )
+    args = parser.parse_args()
+
+    if args.labels_dir is not None:
+        contours = load_label_contours(args.labels_dir, args.frame_size)
+    else:
+        contours = generate_synthetic_contours(args.num_synthetic, args.frame_size)
+    if not contours:
+        print("No contours found.")
+        return
+
+    results = benchmark(contours, args.repeat)
+    print(f"{len(contours)} contours, frame size {args.frame_size}")
+    print(
+        f"contour_center (reference): {results['reference']['ms_per_contour']:.3f} ms"
+    )
+    for method in CENTER_METHODS:
+        method_results = results[method]
+        print(
+            f"local_contour_center ({method}): {method_results['ms_per_contour']:.3f} ms "
+            f"({method_results['speedup']:.1f}x), distance to reference: "
+            f"mean {method_results['mean_dist']:.2f} px, "
+            f"p95 {method_results['p95_dist']:.2f} px, "
+            f"max {method_results['max_dist']:.2f} px, "
+            f"exact {method_results['exact_match']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
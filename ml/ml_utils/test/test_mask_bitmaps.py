@@ -0,0 +1,102 @@
+import cv2
+import numpy as np
+import pytest
+
+from ml_utils.mask_bitmaps import (
+    mask_areas,
+    mask_bboxes,
+    mask_centers,
+    mask_centroids,
+    overlay_masks,
+    scale_mask_points,
+)
+from ml_utils.mask_center import CENTER_METHODS, contour_centers
+from test_mask_center import make_runner_contours
+
+FRAME_SIZE = (600, 600)
+
+
+def _contours_to_bitmaps(contours):
+    masks = np.zeros((len(contours), *FRAME_SIZE), dtype=np.uint8)
+    for mask, contour in zip(masks, contours):
+        cv2.drawContours(mask, [contour.reshape(-1, 1, 2)], -1, 1, cv2.FILLED)
+    return masks.astype(bool)
+
+
+@pytest.mark.parametrize("method", CENTER_METHODS)
+def test_mask_centers_match_contour_centers(method):
+    contours = make_runner_contours(20)
+    masks = _contours_to_bitmaps(contours)
+
+    centers = mask_centers(masks, method)
+
+    assert centers == contour_centers(contours, method)
+    for center in centers:
+        assert all(type(value) is int for value in center)
+
+
+def test_mask_centers_of_empty_mask():
+    masks = np.zeros((2, 20, 30), dtype=bool)
+    masks[1, 5:10, 5:25] = True
+
+    centers = mask_centers(masks)
+
+    assert centers[0] is None
+    assert centers[1] is not None
+
+
+def test_mask_centers_unknown_method():
+    with pytest.raises(ValueError):
+        mask_centers(np.zeros((1, 20, 30), dtype=bool), "unknown")
+
+
+def test_mask_stats_match_full_mask():
+    contours = make_runner_contours(10)
+    masks = _contours_to_bitmaps(contours)
+
+    bboxes = mask_bboxes(masks)
+    areas = mask_areas(masks)
+    centroids = mask_centroids(masks)
+
+    for mask, bbox, area, centroid in zip(masks, bboxes, areas, centroids):
+        x, y, width, height = cv2.boundingRect(mask.astype(np.uint8))
+        assert bbox.tolist() == [x, y, x + width, y + height]
+        assert area == np.count_nonzero(mask)
+        rows, cols = np.nonzero(mask)
+        np.testing.assert_allclose(centroid, (cols.mean(), rows.mean()))
+
+
+def test_mask_stats_of_empty_mask():
+    masks = np.zeros((2, 20, 30), dtype=bool)
+    masks[1, 19, 29] = True
+
+    assert mask_bboxes(masks).tolist() == [[0, 0, 0, 0], [29, 19, 30, 20]]
+    assert mask_areas(masks).tolist() == [0, 1]
+    centroids = mask_centroids(masks)
+    assert np.isnan(centroids[0]).all()
+    assert centroids[1].tolist() == [29.0, 19.0]
+
+
+def test_scale_mask_points():
+    points = scale_mask_points([[0, 0], [159, 119]], (160, 120), (640, 480))
+
+    # Pixel centers map to pixel centers
+    np.testing.assert_allclose(points, [[1.5, 1.5], [637.5, 477.5]])
+    np.testing.assert_allclose(
+        scale_mask_points(points, (640, 480), (160, 120)), [[0, 0], [159, 119]]
+    )
+
+
+def test_overlay_masks_resizes_masks():
+    masks = np.zeros((2, 10, 10), dtype=bool)
+    masks[0, :5, :5] = True
+    masks[1, 5:, 5:] = True
+    image = np.zeros((20, 20, 3), dtype=np.uint8)
+
+    overlay_masks(image, masks, (255, 0, 0))
+
+    expected = np.zeros((20, 20), dtype=bool)
+    expected[:10, :10] = True
+    expected[10:, 10:] = True
+    assert (image[expected] == (255, 0, 0)).all()
+    assert (image[~expected] == 0).all()
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+import pytest
+
+from ml_utils.mask_center import (
+    CENTER_METHODS,
+    contour_centers,
+    local_contour_center,
+    mask_center,
+)
+from ml_utils.segment_utils import convert_contour_to_mask
+
+
+def make_runner_contours(num_contours: int, seed: int = 0):
+    """
+    Outlines of thick random curves, shaped like runners, away from the frame's edges.
+    """
+    rng = np.random.default_rng(seed)
+    contours = []
+    for _ in range(num_contours):
+        start = rng.uniform(50, 400, 2)
+        direction = rng.uniform(-1, 1, 2)
+        direction /= np.linalg.norm(direction)
+        length = rng.uniform(40, 150)
+        bend = rng.uniform(-0.5, 0.5)
+        t = np.linspace(0, 1, 20)[:, np.newaxis]
+        normal = np.array([-direction[1], direction[0]])
+        points = (
+            start + t * length * direction + np.sin(t * np.pi) * bend * length * normal
+        )
+        mask = np.zeros((600, 600), dtype=np.uint8)
+        cv2.polylines(
+            mask,
+            [points.astype(np.int32)],
+            isClosed=False,
+            color=255,
+            thickness=int(rng.integers(3, 12)),
+        )
+        mask_contours, _ = cv2.findContours(
+            mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+        )
+        contours.append(max(mask_contours, key=cv2.contourArea).reshape(-1, 2))
+    return contours
+
+
+def _full_frame_center(contour):
+    # contour_center, without clipping the contour's last row and column
+    max_x, max_y = np.max(contour, axis=0)
+    mask = convert_contour_to_mask(contour, mask_size=(max_x + 2, max_y + 2))
+    return mask_center(mask)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_local_contour_center_matches_full_frame_center(seed):
+    for contour in make_runner_contours(10, seed):
+        center = local_contour_center(contour, "skeleton")
+
+        assert center == [int(value) for value in _full_frame_center(contour)]
+
+
+@pytest.mark.parametrize("method", CENTER_METHODS)
+def test_contour_center_is_on_mask(method):
+    contours = make_runner_contours(20)
+
+    centers = contour_centers(contours, method)
+
+    for contour, center in zip(contours, centers):
+        assert all(type(value) is int for value in center)
+        mask = np.zeros((600, 600), dtype=np.uint8)
+        cv2.drawContours(mask, [contour.reshape(-1, 1, 2)], -1, 255, cv2.FILLED)
+        assert mask[center[1], center[0]] > 0
+
+
+def test_empty_contour_has_no_center():
+    assert local_contour_center(np.empty((0, 2))) is None
+
+
+def test_unknown_method():
+    with pytest.raises(ValueError):
+        contour_centers([], "unknown")
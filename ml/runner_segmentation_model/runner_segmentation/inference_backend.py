@@ -0,0 +1,165 @@
+"""
+CPU inference backends for YOLOv8 models exported with Yolo.export. Backends only run the exported
+network; pre- and post-processing are done in yolo_postprocess.
+"""
+
+import os
+from abc import ABC, abstractmethod
+from glob import glob
+from typing import List, Tuple
+
+import numpy as np
+
+
+class InferenceBackend(ABC):
+    @property
+    @abstractmethod
+    def input_size(self) -> Tuple[int, int]:
+        """
+        Returns:
+            Tuple[int, int]: (width, height) of the model input.
+        """
+        pass
+
+    @abstractmethod
+    def __call__(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        """
+        Run the model.
+
+        Args:
+            input_tensor (np.ndarray): (1, 3, height, width) float32 input tensor.
+
+        Returns:
+            List[np.ndarray]: Raw model outputs.
+        """
+        pass
+
+
+class OnnxRuntimeBackend(InferenceBackend):
+    """
+    Runs an exported .onnx model with ONNX Runtime on CPU.
+    """
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        """
+        Args:
+            model_path (str): Path to the .onnx model.
+            num_threads (int): Number of intra-op threads. 0 lets ONNX Runtime decide.
+        """
+        import onnxruntime as ort
+
+        session_options = ort.SessionOptions()
+        session_options.intra_op_num_threads = num_threads
+        session_options.graph_optimization_level = (
+            ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        self._session = ort.InferenceSession(
+            model_path, session_options, providers=["CPUExecutionProvider"]
+        )
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        # Input shape is (batch, channels, height, width)
+        self._input_size = (model_input.shape[3], model_input.shape[2])
+
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        return self._input_size
+
+    def __call__(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        return self._session.run(None, {self._input_name: input_tensor})
+
+
+class OpenVinoBackend(InferenceBackend):
+    """
+    Runs an exported OpenVINO IR model on CPU.
+    """
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        """
+        Args:
+            model_path (str): Path to the .xml model, or to the directory containing it.
+            num_threads (int): Number of inference threads. 0 lets OpenVINO decide.
+        """
+        import openvino as ov
+
+        if os.path.isdir(model_path):
+            xml_paths = glob(os.path.join(model_path, "*.xml"))
+            if not xml_paths:
+                raise FileNotFoundError(f"No .xml model found in {model_path}")
+            model_path = xml_paths[0]
+
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if num_threads > 0:
+            config["INFERENCE_NUM_THREADS"] = num_threads
+        core = ov.Core()
+        model = core.read_model(model_path)
+        # Input shape is (batch, channels, height, width)
+        input_shape = model.inputs[0].get_shape()
+        self._input_size = (int(input_shape[3]), int(input_shape[2]))
+        self._compiled_model = core.compile_model(model, "CPU", config)
+        self._infer_request = self._compiled_model.create_infer_request()
+
+    @property
+    def input_size(self) -> Tuple[int, int]:
+        return self._input_size
+
+    def __call__(self, input_tensor: np.ndarray) -> List[np.ndarray]:
+        self._infer_request.infer({0: input_tensor})
+        return [
+            self._infer_request.get_output_tensor(idx).data.copy()
+            for idx in range(len(self._compiled_model.outputs))
+        ]
+
+
+# Backend name -> (backend class, exported model path suffix relative to the .pt weights file
+# without its extension)
+BACKENDS = {
+    "onnx": (OnnxRuntimeBackend, ".onnx"),
+    "openvino": (OpenVinoBackend, "_openvino_model"),
+}
+# Inserted between the weights file name and the exported model path suffix for INT8 models
+INT8_SUFFIX = "_int8"
+
+
+def get_exported_model_path(weights_file: str, backend: str, int8: bool = False) -> str:
+    """
+    Args:
+        weights_file (str): Path to the .pt weights file the model was exported from.
+        backend (str): Backend name. "onnx" or "openvino".
+        int8 (bool): Whether to get the path of the INT8 quantized model.
+
+    Returns:
+        str: Path that Yolo.export, or quantize.py for INT8 models, writes the exported model to.
+    """
+    return (
+        os.path.splitext(weights_file)[0]
+        + (INT8_SUFFIX if int8 else "")
+        + BACKENDS[backend][1]
+    )
+
+
+def create_inference_backend(
+    weights_file: str, backend: str, num_threads: int = 0, int8: bool = False
+) -> InferenceBackend:
+    """
+    Create a backend for the model exported from a .pt weights file.
+
+    Args:
+        weights_file (str): Path to the .pt weights file the model was exported from.
+        backend (str): Backend name. "onnx" or "openvino".
+        num_threads (int): Number of inference threads. 0 lets the backend decide.
+        int8 (bool): Whether to run the INT8 quantized model.
+
+    Returns:
+        InferenceBackend: Backend running the exported model.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    model_path = get_exported_model_path(weights_file, backend, int8)
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(
+            f"Exported model not found: {model_path}. Export it with `yolo.py export`"
+            + (", then quantize it with `quantize.py`." if int8 else ".")
+        )
+    return BACKENDS[backend][0](model_path, num_threads)
@@ -0,0 +1,665 @@
+"""
+INT8 post-training quantization of exported YOLOv8 models, and evaluation of the accuracy/latency
+trade-off of the quantized models against the PyTorch and unquantized exported models.
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+from glob import glob
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import yaml
+from natsort import natsorted
+from ultralytics import settings
+from runner_segmentation.inference_backend import BACKENDS, get_exported_model_path
+from runner_segmentation.yolo import DEFAULT_SIZE, Yolo, tuple_type
+from runner_segmentation.yolo_postprocess import preprocess
+
+PROJECT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+DEFAULT_NUM_CALIBRATION_IMAGES = 300
+# Same IoU thresholds and confidence threshold that ultralytics uses to compute mAP
+MAP_IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+EVAL_CONF_THRESHOLD = 0.001
+# Masks are compared at this fraction of the image size, to bound memory use
+EVAL_MASK_SCALE = 0.25
+NUM_WARMUP_IMAGES = 3
+
+
+def get_split_image_paths(dataset_yml: str, split: str) -> List[str]:
+    """
+    Args:
+        dataset_yml (str): Path to a YOLO dataset yml.
+        split (str): "train", "val", or "test".
+
+    Returns:
+        List[str]: Paths of the images in the split.
+    """
+    with open(dataset_yml) as f:
+        dataset = yaml.safe_load(f)
+    dataset_dir = dataset["path"]
+    if not os.path.isabs(dataset_dir):
+        dataset_dir = os.path.join(
+            os.path.dirname(os.path.abspath(dataset_yml)), dataset_dir
+        )
+    images_dir = os.path.join(dataset_dir, dataset[split])
+    return natsorted(
+        glob(os.path.join(images_dir, "*.jpg"))
+        + glob(os.path.join(images_dir, "*.png"))
+    )
+
+
+def get_label_path(image_path: str) -> str:
+    """
+    Args:
+        image_path (str): Path to an image in a YOLO dataset.
+
+    Returns:
+        str: Path to the YOLO label txt file of the image.
+    """
+    images_dir = f"{os.sep}images{os.sep}"
+    labels_dir = f"{os.sep}labels{os.sep}"
+    head, sep, tail = image_path.rpartition(images_dir)
+    label_path = head + labels_dir + tail if sep else image_path
+    return os.path.splitext(label_path)[0] + ".txt"
+
+
+def load_rgb_image(image_path: str, size: Tuple[int, int]) -> np.ndarray:
+    """
+    Load an image and resize it to the model input size, as is done by the camera control node.
+
+    Args:
+        image_path (str): Path to the image.
+        size (Tuple[int, int]): (width, height) of the model input.
+
+    Returns:
+        np.ndarray: Image in RGB8 format.
+    """
+    image = cv2.cvtColor(cv2.imread(image_path), cv2.COLOR_BGR2RGB)
+    return cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+
+def sample_calibration_images(
+    image_paths: List[str],
+    num_images: int = DEFAULT_NUM_CALIBRATION_IMAGES,
+    seed: int = 0,
+) -> List[str]:
+    """
+    Args:
+        image_paths (List[str]): Paths of the images to sample from.
+        num_images (int): Number of images to sample.
+        seed (int): Random seed, so that calibration is reproducible.
+
+    Returns:
+        List[str]: Sampled image paths.
+    """
+    if len(image_paths) <= num_images:
+        return list(image_paths)
+    return random.Random(seed).sample(image_paths, num_images)
+
+
+def _get_head_layer_idx(node_names: List[str]) -> int:
+    # Names of exported YOLOv8 nodes contain "model.<layer index>", followed by "/" in ONNX models
+    # and "." or "/" in OpenVINO models. The head is the last layer
+    return max(
+        int(match.group(1))
+        for match in (re.search(r"model\.(\d+)", name) for name in node_names)
+        if match is not None
+    )
+
+
+def quantize_onnx(
+    model_path: str,
+    output_path: str,
+    calibration_image_paths: List[str],
+):
+    """
+    Statically quantize an exported ONNX model to INT8 with ONNX Runtime. Convolution weights are
+    quantized per channel and activations are calibrated on the given images. The box decoding
+    (DFL) layers of the head are kept in float, as they are sensitive to quantization.
+
+    Args:
+        model_path (str): Path to the FP32 .onnx model.
+        output_path (str): Path to write the INT8 .onnx model to.
+        calibration_image_paths (List[str]): Images to calibrate activation ranges on.
+    """
+    import onnx
+    from onnxruntime.quantization import (
+        CalibrationDataReader,
+        QuantFormat,
+        QuantType,
+        quantize_static,
+    )
+
+    model = onnx.load(model_path)
+    # Input shape is (batch, channels, height, width)
+    input_shape = model.graph.input[0].type.tensor_type.shape.dim
+    input_size = (input_shape[3].dim_value, input_shape[2].dim_value)
+    input_name = model.graph.input[0].name
+    node_names = [node.name for node in model.graph.node]
+    dfl_prefix = f"/model.{_get_head_layer_idx(node_names)}/dfl/"
+
+    class ImageDataReader(CalibrationDataReader):
+        def __init__(self):
+            self._image_paths = iter(calibration_image_paths)
+
+        def get_next(self):
+            image_path = next(self._image_paths, None)
+            if image_path is None:
+                return None
+            input_tensor, _, _ = preprocess(
+                load_rgb_image(image_path, input_size), input_size
+            )
+            return {input_name: input_tensor}
+
+    quantize_static(
+        model_path,
+        output_path,
+        ImageDataReader(),
+        quant_format=QuantFormat.QDQ,
+        op_types_to_quantize=["Conv"],
+        nodes_to_exclude=[name for name in node_names if name.startswith(dfl_prefix)],
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+
+
+def quantize_openvino(
+    model_path: str,
+    output_path: str,
+    calibration_image_paths: List[str],
+):
+    """
+    Quantize an exported OpenVINO model to INT8 with NNCF. Activations are calibrated on the given
+    images. The box decoding (DFL) layers and elementwise ops of the head are kept in float, as they
+    are sensitive to quantization.
+
+    Args:
+        model_path (str): Path to the FP32 OpenVINO model directory.
+        output_path (str): Path to the directory to write the INT8 OpenVINO model to.
+        calibration_image_paths (List[str]): Images to calibrate activation ranges on.
+    """
+    import nncf
+    import openvino as ov
+
+    xml_path = glob(os.path.join(model_path, "*.xml"))[0]
+    model = ov.Core().read_model(xml_path)
+    # Input shape is (batch, channels, height, width)
+    input_shape = model.inputs[0].get_shape()
+    input_size = (int(input_shape[3]), int(input_shape[2]))
+    head_layer_idx = _get_head_layer_idx(
+        [op.get_friendly_name() for op in model.get_ops()]
+    )
+
+    def transform_fn(image_path):
+        input_tensor, _, _ = preprocess(
+            load_rgb_image(image_path, input_size), input_size
+        )
+        return input_tensor
+
+    quantized_model = nncf.quantize(
+        model,
+        nncf.Dataset(calibration_image_paths, transform_fn),
+        preset=nncf.QuantizationPreset.MIXED,
+        subset_size=len(calibration_image_paths),
+        ignored_scope=nncf.IgnoredScope(
+            types=["Multiply", "Subtract", "Sigmoid"],
+            patterns=[f".*model\\.{head_layer_idx}[./]dfl.*"],
+            validate=False,
+        ),
+    )
+    os.makedirs(output_path, exist_ok=True)
+    ov.save_model(
+        quantized_model, os.path.join(output_path, os.path.basename(xml_path))
+    )
+
+
+def _load_labels(
+    label_path: str, image_size: Tuple[int, int]
+) -> Tuple[np.ndarray, np.ndarray, List[np.ndarray]]:
+    # YOLO labels are one object per line: class followed by either a normalized xywh box, or a
+    # normalized polygon for segmentation datasets
+    classes = []
+    boxes = []
+    polygons = []
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            for line in f:
+                values = line.split()
+                if len(values) < 5:
+                    continue
+                coords = np.array(values[1:], dtype=np.float32)
+                classes.append(int(values[0]))
+                if len(coords) == 4:
+                    cx, cy, w, h = coords * np.tile(image_size, 2)
+                    boxes.append([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2])
+                    polygons.append(
+                        np.array(
+                            [
+                                [cx - w / 2, cy - h / 2],
+                                [cx + w / 2, cy - h / 2],
+                                [cx + w / 2, cy + h / 2],
+                                [cx - w / 2, cy + h / 2],
+                            ],
+                            dtype=np.float32,
+                        )
+                    )
+                else:
+                    polygon = coords.reshape(-1, 2) * np.array(image_size)
+                    boxes.append([*polygon.min(axis=0), *polygon.max(axis=0)])
+                    polygons.append(polygon)
+    return (
+        np.array(classes, dtype=np.int64),
+        np.array(boxes, dtype=np.float32).reshape(-1, 4),
+        polygons,
+    )
+
+
+def _box_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray) -> np.ndarray:
+    top_left = np.maximum(boxes_a[:, np.newaxis, :2], boxes_b[np.newaxis, :, :2])
+    bottom_right = np.minimum(boxes_a[:, np.newaxis, 2:], boxes_b[np.newaxis, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    areas_a = np.prod(boxes_a[:, 2:] - boxes_a[:, :2], axis=1)
+    areas_b = np.prod(boxes_b[:, 2:] - boxes_b[:, :2], axis=1)
+    union = areas_a[:, np.newaxis] + areas_b[np.newaxis, :] - intersection
+    return intersection / np.maximum(union, 1e-7)
+
+
+def _rasterize_polygons(
+    polygons: List[np.ndarray], image_size: Tuple[int, int]
+) -> np.ndarray:
+    # Returns (N, h * w) float32 masks at EVAL_MASK_SCALE of the image size
+    mask_w = round(image_size[0] * EVAL_MASK_SCALE)
+    mask_h = round(image_size[1] * EVAL_MASK_SCALE)
+    masks = np.zeros((len(polygons), mask_h, mask_w), dtype=np.uint8)
+    for idx, polygon in enumerate(polygons):
+        if len(polygon) > 0:
+            cv2.fillPoly(
+                masks[idx],
+                [np.round(polygon * EVAL_MASK_SCALE).astype(np.int32)],
+                1,
+            )
+    return masks.reshape(len(polygons), -1).astype(np.float32)
+
+
+def _mask_iou_matrix(masks_a: np.ndarray, masks_b: np.ndarray) -> np.ndarray:
+    intersection = masks_a @ masks_b.T
+    union = masks_a.sum(axis=1)[:, np.newaxis] + masks_b.sum(axis=1) - intersection
+    return intersection / np.maximum(union, 1e-7)
+
+
+def _match_predictions(
+    pred_classes: np.ndarray, target_classes: np.ndarray, iou: np.ndarray
+) -> np.ndarray:
+    """
+    Match predictions to targets at each IoU threshold, the same way ultralytics does.
+
+    Args:
+        pred_classes (np.ndarray): (N,) predicted classes.
+        target_classes (np.ndarray): (M,) target classes.
+        iou (np.ndarray): (M, N) IoU between targets and predictions.
+
+    Returns:
+        np.ndarray: (N, num IoU thresholds) boolean array of whether each prediction is a true positive.
+    """
+    correct = np.zeros((len(pred_classes), len(MAP_IOU_THRESHOLDS)), dtype=bool)
+    iou = iou * (target_classes[:, np.newaxis] == pred_classes[np.newaxis, :])
+    for threshold_idx, threshold in enumerate(MAP_IOU_THRESHOLDS):
+        matches = np.array(np.nonzero(iou >= threshold)).T
+        if matches.shape[0] == 0:
+            continue
+        # Each target and each prediction is matched at most once, highest IoU first
+        matches = matches[iou[matches[:, 0], matches[:, 1]].argsort()[::-1]]
+        matches = matches[np.unique(matches[:, 1], return_index=True)[1]]
+        matches = matches[np.unique(matches[:, 0], return_index=True)[1]]
+        correct[matches[:, 1], threshold_idx] = True
+    return correct
+
+
+def _compute_ap(recall: np.ndarray, precision: np.ndarray) -> float:
+    # COCO 101-point interpolated AP
+    recall = np.concatenate(([0.0], recall, [1.0]))
+    precision = np.concatenate(([1.0], precision, [0.0]))
+    precision = np.flip(np.maximum.accumulate(np.flip(precision)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, recall, precision)
+    # Trapezoidal integration
+    return float(np.sum((y[1:] + y[:-1]) / 2 * np.diff(x)))
+
+
+def _compute_map(
+    correct: np.ndarray,
+    confs: np.ndarray,
+    pred_classes: np.ndarray,
+    target_classes: np.ndarray,
+) -> Tuple[float, float]:
+    """
+    Args:
+        correct (np.ndarray): (N, num IoU thresholds) true positives of all predictions.
+        confs (np.ndarray): (N,) confidences of all predictions.
+        pred_classes (np.ndarray): (N,) predicted classes of all predictions.
+        target_classes (np.ndarray): (M,) classes of all targets.
+
+    Returns:
+        Tuple[float, float]: (mAP50, mAP50-95) averaged over classes with targets.
+    """
+    order = np.argsort(-confs)
+    correct = correct[order]
+    pred_classes = pred_classes[order]
+    aps = []
+    for cls in np.unique(target_classes):
+        is_class = pred_classes == cls
+        num_targets = np.count_nonzero(target_classes == cls)
+        tp = np.cumsum(correct[is_class], axis=0)
+        fp = np.cumsum(~correct[is_class], axis=0)
+        recall = tp / num_targets
+        precision = tp / np.maximum(tp + fp, 1)
+        aps.append(
+            [
+                _compute_ap(recall[:, idx], precision[:, idx]) if tp.shape[0] else 0.0
+                for idx in range(len(MAP_IOU_THRESHOLDS))
+            ]
+        )
+    if not aps:
+        return 0.0, 0.0
+    aps = np.array(aps)
+    return float(aps[:, 0].mean()), float(aps.mean())
+
+
+def evaluate(
+    model: Yolo,
+    image_paths: List[str],
+    size: Tuple[int, int],
+    iou: float = 0.6,
+) -> Dict[str, float]:
+    """
+    Compute box (and mask, for segmentation models) mAP and per-image latency of a model on labeled
+    images. Every model variant is evaluated with the same matching and AP computation, so that the
+    results are directly comparable. mAP is computed with a low confidence threshold as is done by
+    ultralytics, while latency is measured in a separate pass with the default confidence threshold,
+    as the post-processing time depends on the number of detections.
+
+    Args:
+        model (Yolo): Model to evaluate.
+        image_paths (List[str]): Paths of labeled images in a YOLO dataset.
+        size (Tuple[int, int]): (width, height) of the model input. Images are resized to this size, as is done by the camera control node.
+        iou (float): IoU threshold for NMS.
+
+    Returns:
+        Dict[str, float]: mAP50 and mAP50-95 for boxes (and masks), and mean, p50 and p95 per-image latency in milliseconds, including pre- and post-processing.
+    """
+    box_correct = []
+    mask_correct = []
+    confs = []
+    pred_classes = []
+    target_classes = []
+    has_masks = False
+    for image_path in image_paths:
+        image = load_rgb_image(image_path, size)
+        result = model.predict(image, iou=iou, conf=EVAL_CONF_THRESHOLD)
+        result_classes = result["classes"].astype(np.int64)
+        labels_classes, labels_boxes, labels_polygons = _load_labels(
+            get_label_path(image_path), size
+        )
+        confs.append(result["conf"])
+        pred_classes.append(result_classes)
+        target_classes.append(labels_classes)
+        box_correct.append(
+            _match_predictions(
+                result_classes,
+                labels_classes,
+                _box_iou_matrix(labels_boxes, result["bboxes"]),
+            )
+        )
+        # PyTorch segmentation results have no masks when there are no detections
+        if "masks" not in result:
+            mask_correct.append(
+                np.zeros((len(result_classes), len(MAP_IOU_THRESHOLDS)), dtype=bool)
+            )
+        else:
+            has_masks = True
+            mask_correct.append(
+                _match_predictions(
+                    result_classes,
+                    labels_classes,
+                    _mask_iou_matrix(
+                        _rasterize_polygons(labels_polygons, size),
+                        _rasterize_polygons(result["masks"], size),
+                    ),
+                )
+            )
+
+    confs = np.concatenate(confs)
+    pred_classes = np.concatenate(pred_classes)
+    target_classes = np.concatenate(target_classes)
+    metrics = {}
+    metrics["mAP50 (box)"], metrics["mAP50-95 (box)"] = _compute_map(
+        np.concatenate(box_correct), confs, pred_classes, target_classes
+    )
+    if has_masks:
+        metrics["mAP50 (seg)"], metrics["mAP50-95 (seg)"] = _compute_map(
+            np.concatenate(mask_correct), confs, pred_classes, target_classes
+        )
+
+    latencies_ms = []
+    for idx, image_path in enumerate(image_paths):
+        image = load_rgb_image(image_path, size)
+        if idx == 0:
+            for _ in range(NUM_WARMUP_IMAGES):
+                model.predict(image, iou=iou)
+        start = perf_counter()
+        model.predict(image, iou=iou)
+        latencies_ms.append((perf_counter() - start) * 1000)
+    metrics["mean latency (ms)"] = float(np.mean(latencies_ms))
+    metrics["p50 latency (ms)"] = float(np.percentile(latencies_ms, 50))
+    metrics["p95 latency (ms)"] = float(np.percentile(latencies_ms, 95))
+    return metrics
+
+
+def _get_model_size_mb(model_path: str) -> float:
+    if os.path.isdir(model_path):
+        num_bytes = sum(
+            os.path.getsize(os.path.join(model_path, file_name))
+            for file_name in os.listdir(model_path)
+        )
+    else:
+        num_bytes = os.path.getsize(model_path)
+    return num_bytes / 1e6
+
+
+def quantize_and_evaluate(
+    weights_file: str,
+    dataset_yml: str,
+    backend: str = "onnx",
+    size: Tuple[int, int] = DEFAULT_SIZE,
+    num_calibration_images: int = DEFAULT_NUM_CALIBRATION_IMAGES,
+    split: str = "test",
+    num_threads: int = 0,
+    iou: float = 0.6,
+) -> Dict[str, Dict[str, float]]:
+    """
+    Quantize the model exported from a .pt weights file to INT8, calibrating on a sample of the
+    dataset's training images, then evaluate the PyTorch, FP32 exported and INT8 exported models on
+    a dataset split. The FP32 model is exported first if it does not exist yet.
+
+    Args:
+        weights_file (str): Path to the .pt weights file.
+        dataset_yml (str): Path to the YOLO dataset yml.
+        backend (str): Exported model backend. "onnx" or "openvino".
+        size (Tuple[int, int]): (width, height) of the model input.
+        num_calibration_images (int): Number of training images to calibrate on.
+        split (str): Dataset split to evaluate on.
+        num_threads (int): Number of inference threads for the exported models. 0 lets the backend decide.
+        iou (float): IoU threshold for NMS.
+
+    Returns:
+        Dict[str, Dict[str, float]]: Metrics of each model variant. See `evaluate`.
+    """
+    fp32_path = get_exported_model_path(weights_file, backend)
+    int8_path = get_exported_model_path(weights_file, backend, int8=True)
+    if not os.path.exists(fp32_path):
+        print(f"Exporting {weights_file} to {fp32_path}")
+        Yolo(weights_file).export(backend, size)
+
+    calibration_image_paths = sample_calibration_images(
+        get_split_image_paths(dataset_yml, "train"), num_calibration_images
+    )
+    if not calibration_image_paths:
+        raise ValueError(f"No training images found for {dataset_yml}")
+    print(
+        f"Quantizing {fp32_path} to {int8_path} using {len(calibration_image_paths)} calibration images"
+    )
+    if backend == "onnx":
+        quantize_onnx(fp32_path, int8_path, calibration_image_paths)
+    else:
+        quantize_openvino(fp32_path, int8_path, calibration_image_paths)
+
+    eval_image_paths = get_split_image_paths(dataset_yml, split)
+    if not eval_image_paths:
+        raise ValueError(f"No {split} images found for {dataset_yml}")
+    models = {
+        "pytorch": (Yolo(weights_file), weights_file),
+        f"{backend} fp32": (
+            Yolo(weights_file, backend=backend, num_threads=num_threads),
+            fp32_path,
+        ),
+        f"{backend} int8": (
+            Yolo(weights_file, backend=backend, num_threads=num_threads, int8=True),
+            int8_path,
+        ),
+    }
+    report = {}
+    for name, (model, model_path) in models.items():
+        print(f"Evaluating {name} on {len(eval_image_paths)} {split} images")
+        report[name] = evaluate(model, eval_image_paths, size, iou)
+        report[name]["size (MB)"] = _get_model_size_mb(model_path)
+    return report
+
+
+def format_report(report: Dict[str, Dict[str, float]]) -> str:
+    """
+    Args:
+        report (Dict[str, Dict[str, float]]): Metrics of each model variant.
+
+    Returns:
+        str: Table with a row per model variant and a column per metric, with the change of each metric relative to the first variant.
+    """
+    names = list(report.keys())
+    metric_names = list(dict.fromkeys(key for name in names for key in report[name]))
+    baseline = report[names[0]]
+    name_width = max(len(name) for name in names)
+    lines = [
+        " | ".join(
+            ["model".ljust(name_width)] + [metric.ljust(22) for metric in metric_names]
+        )
+    ]
+    for name in names:
+        cells = [name.ljust(name_width)]
+        for metric in metric_names:
+            value = report[name].get(metric)
+            if value is None:
+                cells.append("".ljust(22))
+            elif name == names[0] or metric not in baseline:
+                cells.append(f"{value:.4f}".ljust(22))
+            else:
+                cells.append(f"{value:.4f} ({value - baseline[metric]:+.4f})".ljust(22))
+        lines.append(" | ".join(cells))
+    return "\n".join(lines)
+
+
+def add_quantize_args(
+    parser: argparse.ArgumentParser,
+    default_dataset_yml: str,
+    default_size: Tuple[int, int],
+):
+    """
+    Add quantization command arguments to a parser, so that model packages share the same CLI.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser to add arguments to.
+        default_dataset_yml (str): Default path to the YOLO dataset yml.
+        default_size (Tuple[int, int]): Default (width, height) of the model input.
+    """
+    parser.add_argument("--weights_file", required=True)
+    parser.add_argument("--dataset_yml", default=default_dataset_yml)
+    parser.add_argument("--backend", choices=list(BACKENDS.keys()), default="onnx")
+    parser.add_argument(
+        "--size",
+        type=tuple_type,
+        default=f"({default_size[0]}, {default_size[1]})",
+    )
+    parser.add_argument(
+        "--num_calibration_images", type=int, default=DEFAULT_NUM_CALIBRATION_IMAGES
+    )
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--num_threads", type=int, default=0)
+    parser.add_argument("--report_file", help="Path to write the JSON report to")
+
+
+def run_quantize_command(
+    args: argparse.Namespace,
+    reference_metrics: Optional[Dict[str, float]] = None,
+):
+    """
+    Run the quantization command and print the report.
+
+    Args:
+        args (argparse.Namespace): Arguments added by `add_quantize_args`.
+        reference_metrics (Optional[Dict[str, float]]): mAP of the PyTorch model from the package's existing ultralytics evaluation, included in the report for reference.
+    """
+    report = quantize_and_evaluate(
+        args.weights_file,
+        args.dataset_yml,
+        backend=args.backend,
+        size=args.size,
+        num_calibration_images=args.num_calibration_images,
+        split=args.split,
+        num_threads=args.num_threads,
+    )
+    print(format_report(report))
+    if reference_metrics is not None:
+        print(f"Ultralytics val of the PyTorch model: {json.dumps(reference_metrics)}")
+        report["pytorch (ultralytics val)"] = reference_metrics
+    if args.report_file:
+        with open(args.report_file, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Quantize the YOLOv8 model to INT8, and report its accuracy and latency"
+    )
+    add_quantize_args(parser, os.path.join(PROJECT_PATH, "dataset.yml"), DEFAULT_SIZE)
+    parser.add_argument(
+        "--skip_ultralytics_val",
+        action="store_true",
+        help="Skip the reference evaluation of the PyTorch model with Yolo.eval",
+    )
+    args = parser.parse_args()
+
+    settings.update(
+        {
+            "datasets_dir": PROJECT_PATH,
+            "runs_dir": os.path.join(PROJECT_PATH, "output", "ultralytics", "runs"),
+            "weights_dir": os.path.join(
+                PROJECT_PATH, "output", "ultralytics", "weights"
+            ),
+        }
+    )
+
+    reference_metrics = None
+    if not args.skip_ultralytics_val:
+        metrics = Yolo(args.weights_file).eval(args.dataset_yml)
+        reference_metrics = {
+            "mAP50 (box)": metrics.box.map50,
+            "mAP50-95 (box)": metrics.box.map,
+            "mAP50 (seg)": metrics.seg.map50,
+            "mAP50-95 (seg)": metrics.seg.map,
+        }
+    run_quantize_command(args, reference_metrics)
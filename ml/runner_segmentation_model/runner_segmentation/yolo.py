@@ -5,8 +5,17 @@ from time import perf_counter
 import json
 import cv2
 import numpy as np
+import yaml
 from glob import glob
 from natsort import natsorted
+from runner_segmentation.inference_backend import BACKENDS, create_inference_backend
+from runner_segmentation.yolo_postprocess import (
+    LETTERBOX_PAD_VALUE,
+    MASK_FORMATS,
+    postprocess,
+    preprocess,
+    remove_letterbox_padding,
+)
 
 PROJECT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
 DEFAULT_SIZE = (1024, 768)
@@ -14,8 +23,26 @@ DEFAULT_EPOCHS = 150
 
 
 class Yolo:
-    def __init__(self, weights_file=None):
-        if weights_file is not None and os.path.exists(weights_file):
+    def __init__(self, weights_file=None, backend="pytorch", num_threads=0, int8=False):
+        """
+        Args:
+            weights_file (str): Path to the .pt weights file.
+            backend (str): Inference backend. "pytorch" runs the weights file with ultralytics. "onnx" and "openvino" run the model exported from the weights file (see `export`) on CPU, with numpy pre- and post-processing.
+            num_threads (int): Number of inference threads for the exported model backends. 0 lets the backend decide.
+            int8 (bool): Whether to run the INT8 quantized model (see quantize.py) with the exported model backends.
+        """
+        self.backend = backend
+        self._inference_backend = None
+        self._tracker = None
+        if backend != "pytorch":
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown inference backend: {backend}")
+            # Training and evaluation are not supported with exported models
+            self.model = None
+            self._inference_backend = create_inference_backend(
+                weights_file, backend, num_threads, int8
+            )
+        elif weights_file is not None and os.path.exists(weights_file):
             self.model = YOLO(weights_file)
         else:
             self.model = YOLO("yolov8n-seg.yaml")
@@ -44,25 +71,63 @@ class Yolo:
         )
         return metrics
 
-    def predict(self, image, iou=0.6):
+    def predict(self, image, iou=0.6, conf=0.25, mask_format="polygons", scale_up=True):
         """
         Run inference on an image and return bounding boxes and masks of detected object instances.
 
         Args:
             image (np.ndarray): color image in RGB8 format
             iou (float): Intersection Over Union (IoU) threshold for Non-Maximum Suppression (NMS). Lower values result in fewer detections by eliminating overlapping boxes, useful for reducing duplicates.
+            conf (float): Min confidence of detections.
+            mask_format (str): Format of masks. "polygons" or "bitmaps". See yolo_postprocess.MASK_FORMATS.
+            scale_up (bool): Whether an image smaller than the model input size is upscaled to it. When False, the image keeps its scale: the PyTorch model runs on the image padded to a multiple of the model stride, and exported models run on the image padded to their fixed input size.
         """
+        if mask_format not in MASK_FORMATS:
+            raise ValueError(f"Unknown mask format: {mask_format}")
+        if self._inference_backend is not None:
+            return self._predict_exported(image, iou, conf, mask_format, scale_up)
+
         # YOLO prediction takes an numpy array with BGR8 format
-        result = self.model(cv2.cvtColor(image, cv2.COLOR_RGB2BGR), iou=iou)[0]
+        image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        kwargs = {}
+        if not scale_up:
+            # Pad the bottom and right to a multiple of the stride and run at that size, so that
+            # the letterbox neither scales nor offsets the image
+            height, width = image.shape[:2]
+            stride = int(self.model.model.stride.max())
+            padded_height = -(-height // stride) * stride
+            padded_width = -(-width // stride) * stride
+            image = cv2.copyMakeBorder(
+                image,
+                0,
+                padded_height - height,
+                0,
+                padded_width - width,
+                cv2.BORDER_CONSTANT,
+                value=(LETTERBOX_PAD_VALUE,) * 3,
+            )
+            kwargs["imgsz"] = (padded_height, padded_width)
+        result = self.model(image, iou=iou, conf=conf, **kwargs)[0]
         out = {}
         out["conf"] = result.boxes.conf.cpu().numpy()
         out["bboxes"] = result.boxes.xyxy.cpu().numpy()
+        out["classes"] = result.boxes.cls.int().cpu().numpy()
         if result.masks is not None:
-            out["masks"] = result.masks.xy
+            out["masks"] = self._get_result_masks(result, mask_format)
+        if not scale_up:
+            out["bboxes"][:, 0::2] = np.clip(out["bboxes"][:, 0::2], 0, width)
+            out["bboxes"][:, 1::2] = np.clip(out["bboxes"][:, 1::2], 0, height)
+            if "masks" in out:
+                if mask_format == "bitmaps":
+                    out["masks"] = out["masks"][:, :height, :width]
+                else:
+                    out["masks"] = [
+                        np.clip(polygon, 0, (width, height)) for polygon in out["masks"]
+                    ]
 
         return out
 
-    def track(self, image, iou=0.6):
+    def track(self, image, iou=0.6, mask_format="polygons"):
         """
         Run inference on an image and return bounding boxes, masks, and IDs of detected object instances.
         This differs from `predict` in that it also runs object tracking that maintains a unique ID for each detected object.
@@ -70,7 +135,13 @@ class Yolo:
         Args:
             image (np.ndarray): color image in RGB8 format
             iou (float): Intersection Over Union (IoU) threshold for Non-Maximum Suppression (NMS). Lower values result in fewer detections by eliminating overlapping boxes, useful for reducing duplicates.
+            mask_format (str): Format of masks. "polygons" or "bitmaps". See yolo_postprocess.MASK_FORMATS.
         """
+        if mask_format not in MASK_FORMATS:
+            raise ValueError(f"Unknown mask format: {mask_format}")
+        if self._inference_backend is not None:
+            return self._track_exported(image, iou, mask_format)
+
         # YOLO prediction takes an numpy array with BGR8 format
         result = self.model.track(
             cv2.cvtColor(image, cv2.COLOR_RGB2BGR), iou=iou, persist=True
@@ -78,14 +149,92 @@ class Yolo:
         out = {}
         out["conf"] = result.boxes.conf.cpu().numpy()
         out["bboxes"] = result.boxes.xyxy.cpu().numpy()
+        out["classes"] = result.boxes.cls.int().cpu().numpy()
         out["track_ids"] = (
             result.boxes.id.int().cpu().tolist() if result.boxes.id is not None else []
         )
         if result.masks is not None:
-            out["masks"] = result.masks.xy
+            out["masks"] = self._get_result_masks(result, mask_format)
+
+        return out
+
+    def _get_result_masks(self, result, mask_format):
+        if mask_format == "bitmaps":
+            # Mask data is in model input coords
+            return remove_letterbox_padding(
+                result.masks.data.cpu().numpy().astype(bool), result.orig_shape
+            )
+        return result.masks.xy
+
+    def _predict_exported(
+        self, image, iou=0.6, conf=0.25, mask_format="polygons", scale_up=True
+    ):
+        input_size = self._inference_backend.input_size
+        input_tensor, gain, pad = preprocess(image, input_size, scale_up)
+        outputs = self._inference_backend(input_tensor)
+        return postprocess(
+            outputs,
+            input_size,
+            gain,
+            pad,
+            image.shape[:2],
+            conf_threshold=conf,
+            iou_threshold=iou,
+            mask_format=mask_format,
+            scale_up=scale_up,
+        )
+
+    def _track_exported(self, image, iou=0.6, mask_format="polygons"):
+        # Same tracker and tracker config that ultralytics uses for `track`
+        from ultralytics.engine.results import Boxes
+        from ultralytics.trackers.byte_tracker import BYTETracker
+        from ultralytics.utils import IterableSimpleNamespace
+        from ultralytics.utils.checks import check_yaml
 
+        if self._tracker is None:
+            with open(check_yaml("bytetrack.yaml")) as f:
+                tracker_cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+            self._tracker = BYTETracker(args=tracker_cfg)
+
+        out = self._predict_exported(image, iou, mask_format=mask_format)
+        out["track_ids"] = []
+        if out["conf"].size == 0:
+            return out
+
+        detections = np.hstack(
+            (out["bboxes"], out["conf"][:, np.newaxis], out["classes"][:, np.newaxis])
+        )
+        tracks = self._tracker.update(Boxes(detections, image.shape[:2]), image)
+        if len(tracks) == 0:
+            return out
+
+        # Tracks are (x1, y1, x2, y2, track ID, conf, class, detection index)
+        detection_idxs = tracks[:, -1].astype(int)
+        out["conf"] = tracks[:, 5].astype(np.float32)
+        out["bboxes"] = tracks[:, :4].astype(np.float32)
+        out["classes"] = tracks[:, 6].astype(np.int64)
+        out["track_ids"] = tracks[:, 4].astype(int).tolist()
+        if "masks" in out:
+            if mask_format == "bitmaps":
+                out["masks"] = out["masks"][detection_idxs]
+            else:
+                out["masks"] = [out["masks"][idx] for idx in detection_idxs]
         return out
 
+    def export(self, format="onnx", size=DEFAULT_SIZE):
+        """
+        Export the model at a fixed input size for use with an exported model backend. The exported
+        model is written next to the weights file.
+
+        Args:
+            format (str): "onnx" or "openvino".
+            size (Tuple[int, int]): (width, height) of the model input.
+
+        Returns:
+            str: Path to the exported model.
+        """
+        return self.model.export(format=format, imgsz=(size[1], size[0]), dynamic=False)
+
     def debug(self, image_path, iou=0.6):
         if os.path.isfile(image_path):
             image_paths = [image_path]
@@ -118,6 +267,121 @@ class Yolo:
             result.show()  # display to screen
 
 
+def _polygon_to_mask(polygon, image_shape):
+    mask = np.zeros(image_shape, dtype=np.uint8)
+    if len(polygon) > 0:
+        cv2.fillPoly(mask, [np.round(polygon).astype(np.int32)], 1)
+    return mask.astype(bool)
+
+
+def _box_iou(box_a, box_b):
+    x1, y1 = np.maximum(box_a[:2], box_b[:2])
+    x2, y2 = np.minimum(box_a[2:], box_b[2:])
+    intersection = max(x2 - x1, 0) * max(y2 - y1, 0)
+    union = (
+        (box_a[2] - box_a[0]) * (box_a[3] - box_a[1])
+        + (box_b[2] - box_b[0]) * (box_b[3] - box_b[1])
+        - intersection
+    )
+    return intersection / union if union > 0 else 0.0
+
+
+def parity(weights_file, image_path, backend, size=DEFAULT_SIZE, iou=0.6):
+    """
+    Compare predictions of an exported model backend against the PyTorch model. Images are resized
+    to the model input size, as is done by the camera control node.
+
+    Args:
+        weights_file (str): Path to the .pt weights file the model was exported from.
+        image_path (str): Image file or dir path.
+        backend (str): Exported model backend. "onnx" or "openvino".
+        size (Tuple[int, int]): (width, height) of the model input.
+        iou (float): IoU threshold for NMS.
+
+    Returns:
+        dict: Summary of detection count mismatches, box and mask agreement of matched detections, and mean inference times.
+    """
+    if os.path.isfile(image_path):
+        image_paths = [image_path]
+    else:
+        image_paths = natsorted(
+            glob(os.path.join(image_path, "*.jpg"))
+            + glob(os.path.join(image_path, "*.png"))
+        )
+
+    reference_model = Yolo(weights_file)
+    exported_model = Yolo(weights_file, backend=backend)
+    num_count_mismatches = 0
+    box_ious = []
+    max_box_coord_diff = 0.0
+    conf_diffs = []
+    mask_ious = []
+    reference_times = []
+    exported_times = []
+    for path in image_paths:
+        image = cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB)
+        image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+
+        start = perf_counter()
+        reference = reference_model.predict(image, iou=iou)
+        reference_times.append(perf_counter() - start)
+        start = perf_counter()
+        exported = exported_model.predict(image, iou=iou)
+        exported_times.append(perf_counter() - start)
+
+        if reference["conf"].size != exported["conf"].size:
+            num_count_mismatches += 1
+
+        # Match each reference detection to the exported detection with the highest box IoU
+        for ref_idx in range(reference["conf"].size):
+            if exported["conf"].size == 0:
+                break
+            ious = [
+                _box_iou(reference["bboxes"][ref_idx], bbox)
+                for bbox in exported["bboxes"]
+            ]
+            exp_idx = int(np.argmax(ious))
+            box_ious.append(ious[exp_idx])
+            max_box_coord_diff = max(
+                max_box_coord_diff,
+                float(
+                    np.max(
+                        np.abs(
+                            reference["bboxes"][ref_idx] - exported["bboxes"][exp_idx]
+                        )
+                    )
+                ),
+            )
+            conf_diffs.append(
+                abs(float(reference["conf"][ref_idx] - exported["conf"][exp_idx]))
+            )
+            if "masks" in reference and "masks" in exported:
+                ref_mask = _polygon_to_mask(
+                    reference["masks"][ref_idx], image.shape[:2]
+                )
+                exp_mask = _polygon_to_mask(exported["masks"][exp_idx], image.shape[:2])
+                union = np.count_nonzero(ref_mask | exp_mask)
+                mask_ious.append(
+                    np.count_nonzero(ref_mask & exp_mask) / union if union > 0 else 1.0
+                )
+
+    return {
+        "num_images": len(image_paths),
+        "num_count_mismatches": num_count_mismatches,
+        "mean_box_iou": float(np.mean(box_ious)) if box_ious else None,
+        "min_box_iou": float(np.min(box_ious)) if box_ious else None,
+        "max_box_coord_diff": max_box_coord_diff,
+        "max_conf_diff": float(np.max(conf_diffs)) if conf_diffs else None,
+        "mean_mask_iou": float(np.mean(mask_ious)) if mask_ious else None,
+        "mean_pytorch_inference_s": float(
+            np.mean(reference_times[1:] or reference_times)
+        ),
+        f"mean_{backend}_inference_s": float(
+            np.mean(exported_times[1:] or exported_times)
+        ),
+    }
+
+
 def tuple_type(arg_string):
     try:
         # Parse the input string as a tuple
@@ -156,6 +420,31 @@ if __name__ == "__main__":
         "--image_path", required=True, help="Image file or dir path"
     )
 
+    export_parser = subparsers.add_parser(
+        "export", help="Export model for CPU inference with ONNX Runtime or OpenVINO"
+    )
+    export_parser.add_argument("--weights_file", required=True)
+    export_parser.add_argument(
+        "--format", choices=list(BACKENDS.keys()), default="onnx"
+    )
+    export_parser.add_argument(
+        "--size", type=tuple_type, default=f"({DEFAULT_SIZE[0]}, {DEFAULT_SIZE[1]})"
+    )
+
+    parity_parser = subparsers.add_parser(
+        "parity", help="Compare exported model predictions against PyTorch"
+    )
+    parity_parser.add_argument("--weights_file", required=True)
+    parity_parser.add_argument(
+        "--backend", choices=list(BACKENDS.keys()), default="onnx"
+    )
+    parity_parser.add_argument(
+        "--image_path", required=True, help="Image file or dir path"
+    )
+    parity_parser.add_argument(
+        "--size", type=tuple_type, default=f"({DEFAULT_SIZE[0]}, {DEFAULT_SIZE[1]})"
+    )
+
     args = parser.parse_args()
 
     settings.update(
@@ -169,6 +458,11 @@ if __name__ == "__main__":
     )
 
     weights_file = args.weights_file
+    if args.command == "parity":
+        summary = parity(weights_file, args.image_path, args.backend, args.size)
+        print(json.dumps(summary))
+        exit()
+
     model = Yolo(weights_file)
     if args.command == "train":
         model.train(args.dataset_yml, args.size, args.epochs)
@@ -183,5 +477,8 @@ if __name__ == "__main__":
         print(json.dumps(summary))
     elif args.command == "debug":
         model.debug(args.image_path)
+    elif args.command == "export":
+        exported_path = model.export(args.format, args.size)
+        print(f"Exported model to {exported_path}")
     else:
         print("Invalid command.")
@@ -0,0 +1,351 @@
+"""
+Numpy-only pre- and post-processing for exported YOLOv8 detection and segmentation models, mirroring
+the ultralytics PyTorch pipeline (letterbox, NMS, mask prototype decode) so that exported models can
+run without PyTorch.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Same defaults as ultralytics predictions
+DEFAULT_CONF_THRESHOLD = 0.25
+DEFAULT_MAX_DETECTIONS = 300
+LETTERBOX_PAD_VALUE = 114
+# Max box width/height in pixels. Used to offset boxes by class for per-class NMS
+MAX_WH = 7680
+# Formats of instance masks in results:
+#   "polygons": list of (K, 2) polygons of each mask's largest contour, in original image coords
+#   "bitmaps": (N, height, width) boolean masks covering the original image at the model input
+#   scale. Skips polygon extraction, and is meant for ml_utils.mask_bitmaps
+MASK_FORMATS = ("polygons", "bitmaps")
+
+
+def letterbox(
+    image: np.ndarray, new_size: Tuple[int, int], scale_up: bool = True
+) -> Tuple[np.ndarray, Tuple[float, float], Tuple[int, int]]:
+    """
+    Resize an image to fit within new_size while keeping its aspect ratio, and pad the remainder.
+
+    Args:
+        image (np.ndarray): (h, w, 3) image.
+        new_size (Tuple[int, int]): (width, height) of the output image.
+        scale_up (bool): Whether an image smaller than new_size is upscaled. When False, it is only padded.
+
+    Returns:
+        Tuple[np.ndarray, Tuple[float, float], Tuple[int, int]]: (letterboxed image, (x, y) scale gain, (x, y) padding on the left and top).
+    """
+    h, w = image.shape[:2]
+    new_w, new_h = new_size
+    ratio = min(new_w / w, new_h / h)
+    if not scale_up:
+        ratio = min(ratio, 1.0)
+    unpadded_w, unpadded_h = round(w * ratio), round(h * ratio)
+    pad_x = (new_w - unpadded_w) / 2
+    pad_y = (new_h - unpadded_h) / 2
+
+    if (w, h) != (unpadded_w, unpadded_h):
+        image = cv2.resize(
+            image, (unpadded_w, unpadded_h), interpolation=cv2.INTER_LINEAR
+        )
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    if top or bottom or left or right:
+        image = cv2.copyMakeBorder(
+            image,
+            top,
+            bottom,
+            left,
+            right,
+            cv2.BORDER_CONSTANT,
+            value=(LETTERBOX_PAD_VALUE,) * 3,
+        )
+    # Gains are per axis as each side is rounded separately
+    return image, (unpadded_w / w, unpadded_h / h), (left, top)
+
+
+def preprocess(
+    image: np.ndarray, input_size: Tuple[int, int], scale_up: bool = True
+) -> Tuple[np.ndarray, Tuple[float, float], Tuple[int, int]]:
+    """
+    Convert an RGB image into a model input tensor.
+
+    Args:
+        image (np.ndarray): (h, w, 3) image in RGB8 format.
+        input_size (Tuple[int, int]): (width, height) of the model input.
+        scale_up (bool): Whether an image smaller than the model input is upscaled. See letterbox.
+
+    Returns:
+        Tuple[np.ndarray, Tuple[float, float], Tuple[int, int]]: ((1, 3, height, width) float32 tensor, (x, y) scale gain, (x, y) padding).
+    """
+    image, gain, pad = letterbox(image, input_size, scale_up)
+    tensor = image.transpose(2, 0, 1)[np.newaxis].astype(np.float32) / 255.0
+    return np.ascontiguousarray(tensor), gain, pad
+
+
+def xywh_to_xyxy(boxes: np.ndarray) -> np.ndarray:
+    """
+    Args:
+        boxes (np.ndarray): (N, 4) array of (center x, center y, width, height) boxes.
+
+    Returns:
+        np.ndarray: (N, 4) array of (x1, y1, x2, y2) boxes.
+    """
+    xyxy = np.empty_like(boxes)
+    half_wh = boxes[:, 2:4] / 2
+    xyxy[:, :2] = boxes[:, :2] - half_wh
+    xyxy[:, 2:] = boxes[:, :2] + half_wh
+    return xyxy
+
+
+def non_max_suppression(
+    boxes: np.ndarray, scores: np.ndarray, iou_threshold: float
+) -> np.ndarray:
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes (np.ndarray): (N, 4) array of (x1, y1, x2, y2) boxes.
+        scores (np.ndarray): (N,) array of scores.
+        iou_threshold (float): Boxes that overlap a higher scoring box by more than this IoU are suppressed.
+
+    Returns:
+        np.ndarray: Indices of the kept boxes, in descending score order.
+    """
+    order = np.argsort(-scores, kind="stable")
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size > 0:
+        idx = order[0]
+        keep.append(idx)
+        rest = order[1:]
+        x1 = np.maximum(boxes[idx, 0], boxes[rest, 0])
+        y1 = np.maximum(boxes[idx, 1], boxes[rest, 1])
+        x2 = np.minimum(boxes[idx, 2], boxes[rest, 2])
+        y2 = np.minimum(boxes[idx, 3], boxes[rest, 3])
+        intersection = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+        iou = intersection / (areas[idx] + areas[rest] - intersection + 1e-7)
+        order = rest[iou <= iou_threshold]
+    return np.array(keep, dtype=np.int64)
+
+
+def decode_predictions(
+    predictions: np.ndarray,
+    num_masks: int = 0,
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = 0.7,
+    max_detections: int = DEFAULT_MAX_DETECTIONS,
+) -> np.ndarray:
+    """
+    Filter raw YOLOv8 head outputs by confidence and run per-class NMS.
+
+    Args:
+        predictions (np.ndarray): (4 + num_classes + num_masks, N) raw outputs for a single image.
+        num_masks (int): Number of mask coefficients per prediction. 0 for detection models.
+        conf_threshold (float): Min class confidence.
+        iou_threshold (float): IoU threshold for NMS.
+        max_detections (int): Max number of detections to keep.
+
+    Returns:
+        np.ndarray: (M, 6 + num_masks) array of (x1, y1, x2, y2, conf, class, mask coefficients...) in model input coords, in descending confidence order.
+    """
+    predictions = predictions.T
+    num_classes = predictions.shape[1] - 4 - num_masks
+    class_scores = predictions[:, 4 : 4 + num_classes]
+    classes = np.argmax(class_scores, axis=1)
+    confs = class_scores[np.arange(predictions.shape[0]), classes]
+    candidates = confs > conf_threshold
+    if not np.any(candidates):
+        return np.empty((0, 6 + num_masks), dtype=np.float32)
+
+    boxes = xywh_to_xyxy(predictions[candidates, :4])
+    confs = confs[candidates]
+    classes = classes[candidates]
+    mask_coeffs = predictions[candidates, 4 + num_classes :]
+
+    # Offset boxes by class so that boxes of different classes never overlap
+    keep = non_max_suppression(
+        boxes + classes[:, np.newaxis] * MAX_WH, confs, iou_threshold
+    )[:max_detections]
+    return np.hstack(
+        (
+            boxes[keep],
+            confs[keep, np.newaxis],
+            classes[keep, np.newaxis].astype(boxes.dtype),
+            mask_coeffs[keep],
+        )
+    ).astype(np.float32)
+
+
+def scale_coords(
+    coords: np.ndarray,
+    gain: Tuple[float, float],
+    pad: Tuple[int, int],
+    image_shape: Tuple[int, int],
+) -> np.ndarray:
+    """
+    Map points from letterboxed model input coords to original image coords.
+
+    Args:
+        coords (np.ndarray): (..., 2) array of (x, y) points.
+        gain (Tuple[float, float]): Letterbox (x, y) scale gain.
+        pad (Tuple[int, int]): Letterbox (x, y) padding.
+        image_shape (Tuple[int, int]): (height, width) of the original image.
+
+    Returns:
+        np.ndarray: Points in original image coords, clipped to the image.
+    """
+    coords = (coords - np.array(pad, dtype=np.float32)) / np.array(
+        gain, dtype=np.float32
+    )
+    coords[..., 0] = np.clip(coords[..., 0], 0, image_shape[1])
+    coords[..., 1] = np.clip(coords[..., 1], 0, image_shape[0])
+    return coords
+
+
+def process_masks(
+    protos: np.ndarray,
+    mask_coeffs: np.ndarray,
+    boxes: np.ndarray,
+    input_size: Tuple[int, int],
+) -> np.ndarray:
+    """
+    Decode instance masks from mask prototypes and per-detection coefficients, upsample them to the
+    model input size and crop them to their boxes.
+
+    Args:
+        protos (np.ndarray): (num_masks, mask_h, mask_w) mask prototypes.
+        mask_coeffs (np.ndarray): (N, num_masks) mask coefficients.
+        boxes (np.ndarray): (N, 4) array of (x1, y1, x2, y2) boxes in model input coords.
+        input_size (Tuple[int, int]): (width, height) of the model input.
+
+    Returns:
+        np.ndarray: (N, height, width) boolean masks in model input coords.
+    """
+    num_masks, mask_h, mask_w = protos.shape
+    input_w, input_h = input_size
+    masks = np.zeros((mask_coeffs.shape[0], input_h, input_w), dtype=bool)
+    if mask_coeffs.shape[0] == 0:
+        return masks
+
+    logits = (mask_coeffs @ protos.reshape(num_masks, -1)).reshape(-1, mask_h, mask_w)
+    # Pixels are inside a box if x1 <= x < x2 and y1 <= y < y2
+    box_starts = np.clip(np.ceil(boxes[:, :2]), 0, None).astype(int)
+    box_ends = np.clip(np.ceil(boxes[:, 2:]), 0, None).astype(int)
+    for idx, mask_logits in enumerate(logits):
+        # Upsample before cropping so that the interpolated mask edges stay within the box.
+        # Thresholding logits at 0 is equivalent to thresholding probabilities at 0.5
+        upsampled = cv2.resize(
+            mask_logits, (input_w, input_h), interpolation=cv2.INTER_LINEAR
+        )
+        (x1, y1), (x2, y2) = box_starts[idx], box_ends[idx]
+        masks[idx, y1:y2, x1:x2] = upsampled[y1:y2, x1:x2] > 0.0
+    return masks
+
+
+def remove_letterbox_padding(
+    masks: np.ndarray, image_shape: Tuple[int, int], scale_up: bool = True
+) -> np.ndarray:
+    """
+    Crop the letterbox padding off masks in model input coords, so that they cover the original
+    image at the model input scale.
+
+    Args:
+        masks (np.ndarray): (N, height, width) masks in model input coords.
+        image_shape (Tuple[int, int]): (height, width) of the original image.
+        scale_up (bool): Whether the image was upscaled if smaller than the model input. See letterbox.
+
+    Returns:
+        np.ndarray: (N, unpadded_height, unpadded_width) view of masks.
+    """
+    input_h, input_w = masks.shape[1:]
+    h, w = image_shape
+    ratio = min(input_w / w, input_h / h)
+    if not scale_up:
+        ratio = min(ratio, 1.0)
+    unpadded_w, unpadded_h = round(w * ratio), round(h * ratio)
+    top = round((input_h - unpadded_h) / 2 - 0.1)
+    left = round((input_w - unpadded_w) / 2 - 0.1)
+    return masks[:, top : top + unpadded_h, left : left + unpadded_w]
+
+
+def mask_to_polygon(mask: np.ndarray) -> np.ndarray:
+    """
+    Convert a mask to the polygon of its largest contour.
+
+    Args:
+        mask (np.ndarray): (h, w) boolean mask.
+
+    Returns:
+        np.ndarray: (K, 2) float32 array of (x, y) polygon vertices. Empty if the mask is empty.
+    """
+    contours, _ = cv2.findContours(
+        mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+    if not contours:
+        return np.zeros((0, 2), dtype=np.float32)
+
+    return max(contours, key=len).reshape(-1, 2).astype(np.float32)
+
+
+def postprocess(
+    outputs: List[np.ndarray],
+    input_size: Tuple[int, int],
+    gain: Tuple[float, float],
+    pad: Tuple[int, int],
+    image_shape: Tuple[int, int],
+    conf_threshold: float = DEFAULT_CONF_THRESHOLD,
+    iou_threshold: float = 0.7,
+    max_detections: int = DEFAULT_MAX_DETECTIONS,
+    mask_format: str = "polygons",
+    scale_up: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Convert raw outputs of an exported YOLOv8 detection or segmentation model for a single image into
+    the same result format as Yolo.predict.
+
+    Args:
+        outputs (List[np.ndarray]): Raw model outputs. Detection models have a single (1, 4 + num_classes, N) output. Segmentation models additionally have a (1, num_masks, mask_h, mask_w) mask prototype output.
+        input_size (Tuple[int, int]): (width, height) of the model input.
+        gain (Tuple[float, float]): Letterbox (x, y) scale gain.
+        pad (Tuple[int, int]): Letterbox (x, y) padding.
+        image_shape (Tuple[int, int]): (height, width) of the original image.
+        conf_threshold (float): Min class confidence.
+        iou_threshold (float): IoU threshold for NMS.
+        max_detections (int): Max number of detections to keep.
+        mask_format (str): Format of masks. See MASK_FORMATS.
+        scale_up (bool): Whether the image was upscaled if smaller than the model input. See letterbox.
+
+    Returns:
+        Dict[str, np.ndarray]: "conf", "bboxes" (xyxy, in original image coords), "classes", and for segmentation models "masks" in mask_format.
+    """
+    predictions = next(output for output in outputs if output.ndim == 3)[0]
+    protos: Optional[np.ndarray] = next(
+        (output[0] for output in outputs if output.ndim == 4), None
+    )
+    num_masks = protos.shape[0] if protos is not None else 0
+    detections = decode_predictions(
+        predictions,
+        num_masks=num_masks,
+        conf_threshold=conf_threshold,
+        iou_threshold=iou_threshold,
+        max_detections=max_detections,
+    )
+
+    out = {}
+    out["conf"] = detections[:, 4]
+    out["bboxes"] = scale_coords(
+        detections[:, :4].reshape(-1, 2, 2), gain, pad, image_shape
+    ).reshape(-1, 4)
+    out["classes"] = detections[:, 5].astype(np.int64)
+    if protos is not None:
+        masks = process_masks(protos, detections[:, 6:], detections[:, :4], input_size)
+        if mask_format == "bitmaps":
+            out["masks"] = remove_letterbox_padding(masks, image_shape, scale_up)
+        else:
+            out["masks"] = [
+                scale_coords(mask_to_polygon(mask), gain, pad, image_shape)
+                for mask in masks
+            ]
+    return out
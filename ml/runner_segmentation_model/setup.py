@@ -23,6 +23,7 @@ setup(
     maintainer_email="kondo.genki@gmail.com",
     description="TODO: Package description",
     license="TODO: License declaration",
+    extras_require={"cpu_inference": ["onnx", "onnxruntime", "openvino", "nncf"]},
     tests_require=[],
     entry_points={},
 )
@@ -0,0 +1,132 @@
+"""
+Parity of the exported model backends against the PyTorch model. Runs on the weights files in
+YOLO_PARITY_WEIGHTS (separated by os.pathsep), or by default on the camera control node's models,
+and skips those that are not available or have not been exported for a backend.
+"""
+
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")
+
+from runner_segmentation.inference_backend import get_exported_model_path
+from runner_segmentation.yolo import Yolo, _box_iou, _polygon_to_mask
+
+MODELS_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "..",
+    "..",
+    "..",
+    "ros2",
+    "camera_control",
+    "models",
+)
+DEFAULT_WEIGHTS_FILES = [
+    os.path.join(MODELS_DIR, "LaserDetectionYoloV8n.pt"),
+    os.path.join(MODELS_DIR, "RunnerSegYoloV8l.pt"),
+]
+WEIGHTS_FILES = (
+    os.environ["YOLO_PARITY_WEIGHTS"].split(os.pathsep)
+    if os.environ.get("YOLO_PARITY_WEIGHTS")
+    else DEFAULT_WEIGHTS_FILES
+)
+BACKEND_MODULES = {"onnx": "onnxruntime", "openvino": "openvino"}
+CONF_THRESHOLD = 0.25
+# Detections whose conf is within this of the threshold may be kept by one backend and not the
+# other, so they are not required to match
+CONF_TOLERANCE = 0.05
+MIN_BOX_IOU = 0.9
+MAX_BOX_COORD_DIFF_PX = 2.0
+MIN_MASK_IOU = 0.8
+
+
+def _load_models(weights_file, backend):
+    pytest.importorskip(BACKEND_MODULES[backend])
+    if not os.path.exists(get_exported_model_path(weights_file, backend)):
+        pytest.skip(f"{weights_file} has not been exported for {backend}")
+    try:
+        reference_model = Yolo(weights_file)
+    except Exception as e:
+        # e.g. a DVC pointer file that has not been pulled
+        pytest.skip(f"Could not load {weights_file}: {e}")
+    return reference_model, Yolo(weights_file, backend=backend)
+
+
+def _make_image(size, seed):
+    # Smooth noise with a few bright blobs, so that models produce detections of varied conf
+    width, height = size
+    rng = np.random.default_rng(seed)
+    image = cv2.resize(
+        rng.integers(0, 256, (height // 16, width // 16, 3), dtype=np.uint8),
+        (width, height),
+        interpolation=cv2.INTER_CUBIC,
+    )
+    for _ in range(5):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        cv2.circle(image, center, int(rng.integers(2, 20)), (255, 255, 255), -1)
+    return image
+
+
+def _match(reference, exported):
+    """
+    Returns:
+        List[Tuple[int, int, float]]: (reference index, exported index, box IoU) of each reference detection matched to the exported detection with the highest box IoU.
+    """
+    matches = []
+    for ref_idx in range(reference["conf"].size):
+        if exported["conf"].size == 0:
+            break
+        ious = [
+            _box_iou(reference["bboxes"][ref_idx], bbox) for bbox in exported["bboxes"]
+        ]
+        exp_idx = int(np.argmax(ious))
+        matches.append((ref_idx, exp_idx, ious[exp_idx]))
+    return matches
+
+
+@pytest.mark.parametrize("backend", list(BACKEND_MODULES.keys()))
+@pytest.mark.parametrize("weights_file", WEIGHTS_FILES)
+def test_exported_backend_matches_pytorch(weights_file, backend):
+    reference_model, exported_model = _load_models(weights_file, backend)
+    # Images are resized to the model input size by the camera control node
+    input_size = exported_model._inference_backend.input_size
+
+    for seed in range(3):
+        image = _make_image(input_size, seed)
+        reference = reference_model.predict(image, conf=CONF_THRESHOLD)
+        exported = exported_model.predict(image, conf=CONF_THRESHOLD)
+        matches = {
+            ref_idx: (exp_idx, iou)
+            for ref_idx, exp_idx, iou in _match(reference, exported)
+        }
+
+        for ref_idx, conf in enumerate(reference["conf"]):
+            if conf < CONF_THRESHOLD + CONF_TOLERANCE:
+                continue
+            assert ref_idx in matches, f"Detection {ref_idx} (conf {conf}) has no match"
+            exp_idx, iou = matches[ref_idx]
+            assert iou >= MIN_BOX_IOU
+            np.testing.assert_allclose(
+                exported["bboxes"][exp_idx],
+                reference["bboxes"][ref_idx],
+                atol=MAX_BOX_COORD_DIFF_PX,
+            )
+            assert abs(float(exported["conf"][exp_idx]) - float(conf)) <= CONF_TOLERANCE
+
+            if "masks" in reference:
+                ref_mask = _polygon_to_mask(
+                    reference["masks"][ref_idx], image.shape[:2]
+                )
+                exp_mask = _polygon_to_mask(exported["masks"][exp_idx], image.shape[:2])
+                union = np.count_nonzero(ref_mask | exp_mask)
+                if union > 0:
+                    assert np.count_nonzero(ref_mask & exp_mask) / union >= MIN_MASK_IOU
+
+        # Exported detections well above the threshold must also be found by the PyTorch model
+        num_confident_exported = np.count_nonzero(
+            exported["conf"] >= CONF_THRESHOLD + CONF_TOLERANCE
+        )
+        assert num_confident_exported <= reference["conf"].size
@@ -0,0 +1,190 @@
+import numpy as np
+import pytest
+
+from runner_segmentation.yolo_postprocess import (
+    LETTERBOX_PAD_VALUE,
+    decode_predictions,
+    letterbox,
+    non_max_suppression,
+    postprocess,
+    preprocess,
+    process_masks,
+    remove_letterbox_padding,
+    scale_coords,
+)
+
+
+@pytest.mark.parametrize(
+    "image_size, input_size, scale_up",
+    [
+        ((1024, 768), (640, 480), True),
+        ((2048, 1536), (640, 480), True),
+        ((1280, 720), (640, 480), True),
+        ((300, 400), (640, 480), True),
+        ((161, 161), (640, 480), False),
+    ],
+)
+def test_letterbox_scale_coords_round_trip(image_size, input_size, scale_up):
+    width, height = image_size
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    letterboxed, gain, pad = letterbox(image, input_size, scale_up)
+    assert letterboxed.shape == (input_size[1], input_size[0], 3)
+    if not scale_up:
+        assert gain == (1.0, 1.0)
+
+    rng = np.random.default_rng(0)
+    points = rng.uniform((0, 0), (width, height), size=(100, 2)).astype(np.float32)
+    input_points = points * np.array(gain, dtype=np.float32) + np.array(pad)
+    assert np.all(input_points >= 0)
+    assert np.all(input_points <= input_size)
+    np.testing.assert_allclose(
+        scale_coords(input_points, gain, pad, (height, width)), points, atol=1e-3
+    )
+
+
+def test_letterbox_pads_with_pad_value():
+    image = np.zeros((100, 200, 3), dtype=np.uint8)
+    letterboxed, gain, pad = letterbox(image, (200, 200))
+    assert gain == (1.0, 1.0)
+    assert pad == (0, 50)
+    assert np.all(letterboxed[:50] == LETTERBOX_PAD_VALUE)
+    assert np.all(letterboxed[50:150] == 0)
+    assert np.all(letterboxed[150:] == LETTERBOX_PAD_VALUE)
+
+
+def test_preprocess_tensor_layout():
+    image = np.zeros((480, 640, 3), dtype=np.uint8)
+    image[..., 0] = 255
+    tensor, gain, pad = preprocess(image, (640, 480))
+    assert tensor.shape == (1, 3, 480, 640)
+    assert tensor.dtype == np.float32
+    assert tensor.flags["C_CONTIGUOUS"]
+    np.testing.assert_allclose(tensor[0, 0], 1.0)
+    np.testing.assert_allclose(tensor[0, 1:], 0.0)
+    assert gain == (1.0, 1.0)
+    assert pad == (0, 0)
+
+
+def test_non_max_suppression():
+    boxes = np.array(
+        [
+            [0, 0, 10, 10],
+            # IoU with the first box is 0.81
+            [0, 0, 10, 9],
+            # Disjoint from the others
+            [20, 20, 30, 30],
+            # IoU with the first box is 0.25
+            [5, 0, 15, 10],
+        ],
+        dtype=np.float32,
+    )
+    scores = np.array([0.9, 0.95, 0.5, 0.8], dtype=np.float32)
+    np.testing.assert_array_equal(non_max_suppression(boxes, scores, 0.5), [1, 3, 2])
+    np.testing.assert_array_equal(non_max_suppression(boxes, scores, 0.2), [1, 2])
+    np.testing.assert_array_equal(non_max_suppression(boxes, scores, 0.9), [1, 0, 3, 2])
+    assert non_max_suppression(np.zeros((0, 4)), np.zeros(0), 0.5).size == 0
+
+
+def test_decode_predictions_filters_and_runs_per_class_nms():
+    # (center x, center y, width, height, class 0 score, class 1 score) per prediction
+    predictions = np.array(
+        [
+            [50, 50, 20, 20, 0.9, 0.0],
+            # Overlaps the first prediction, same class
+            [51, 50, 20, 20, 0.8, 0.0],
+            # Overlaps the first prediction, other class
+            [50, 50, 20, 20, 0.0, 0.7],
+            # Below the conf threshold
+            [10, 10, 5, 5, 0.1, 0.0],
+        ],
+        dtype=np.float32,
+    ).T
+    detections = decode_predictions(predictions, conf_threshold=0.25, iou_threshold=0.5)
+    assert detections.shape == (2, 6)
+    np.testing.assert_allclose(detections[0], [40, 40, 60, 60, 0.9, 0])
+    np.testing.assert_allclose(detections[1], [40, 40, 60, 60, 0.7, 1])
+
+    assert decode_predictions(predictions, conf_threshold=0.95).shape == (0, 6)
+
+
+def test_process_masks_crops_to_boxes():
+    input_size = (64, 32)
+    # One prototype that is positive everywhere and one that is negative everywhere
+    protos = np.stack((np.ones((8, 16)), -np.ones((8, 16)))).astype(np.float32)
+    mask_coeffs = np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32)
+    boxes = np.array([[4, 2, 20, 10], [0, 0, 64, 32]], dtype=np.float32)
+    masks = process_masks(protos, mask_coeffs, boxes, input_size)
+    assert masks.shape == (2, 32, 64)
+    expected = np.zeros((32, 64), dtype=bool)
+    expected[2:10, 4:20] = True
+    np.testing.assert_array_equal(masks[0], expected)
+    assert not masks[1].any()
+
+    assert process_masks(
+        protos, np.zeros((0, 2), np.float32), np.zeros((0, 4)), input_size
+    ).shape == (0, 32, 64)
+
+
+def test_remove_letterbox_padding():
+    masks = np.zeros((1, 480, 640), dtype=bool)
+    # A 1024x576 image is letterboxed into 640x360 with 60 rows of padding on top and bottom
+    masks[0, 60:420] = True
+    unpadded = remove_letterbox_padding(masks, (576, 1024))
+    assert unpadded.shape == (1, 360, 640)
+    assert unpadded.all()
+
+    # Without upscaling, a 100x50 image is centered
+    masks = np.zeros((1, 480, 640), dtype=bool)
+    masks[0, 215:265, 270:370] = True
+    unpadded = remove_letterbox_padding(masks, (50, 100), scale_up=False)
+    assert unpadded.shape == (1, 50, 100)
+    assert unpadded.all()
+
+
+def test_postprocess_segmentation_outputs():
+    input_size = (64, 48)
+    image_shape = (96, 128)
+    gain = (0.5, 0.5)
+    pad = (0, 0)
+    num_masks = 2
+    # One detection with a box of (8, 8)-(24, 16) in model input coords
+    predictions = np.zeros((1, 4 + 1 + num_masks, 2), dtype=np.float32)
+    predictions[0, :, 0] = [16, 12, 16, 8, 0.9, 1.0, 0.0]
+    predictions[0, :, 1] = [40, 30, 8, 8, 0.1, 1.0, 0.0]
+    protos = np.stack((np.ones((12, 16)), -np.ones((12, 16))))[np.newaxis].astype(
+        np.float32
+    )
+
+    out = postprocess(
+        [predictions, protos],
+        input_size,
+        gain,
+        pad,
+        image_shape,
+        mask_format="polygons",
+    )
+    np.testing.assert_allclose(out["conf"], [0.9])
+    np.testing.assert_allclose(out["bboxes"], [[16, 16, 48, 32]])
+    np.testing.assert_array_equal(out["classes"], [0])
+    assert len(out["masks"]) == 1
+    polygon = out["masks"][0]
+    np.testing.assert_allclose(polygon.min(axis=0), [16, 16])
+    # Polygon vertices are pixel centers of the last row and column of the mask
+    np.testing.assert_allclose(polygon.max(axis=0), [46, 30])
+
+    out = postprocess(
+        [predictions, protos], input_size, gain, pad, image_shape, mask_format="bitmaps"
+    )
+    assert out["masks"].shape == (1, 48, 64)
+    expected = np.zeros((48, 64), dtype=bool)
+    expected[8:16, 8:24] = True
+    np.testing.assert_array_equal(out["masks"][0], expected)
+
+
+def test_postprocess_detection_outputs_without_detections():
+    predictions = np.zeros((1, 5, 10), dtype=np.float32)
+    out = postprocess([predictions], (64, 48), (1.0, 1.0), (0, 0), (48, 64))
+    assert out["conf"].shape == (0,)
+    assert out["bboxes"].shape == (0, 4)
+    assert out["classes"].shape == (0,)
+    assert "masks" not in out
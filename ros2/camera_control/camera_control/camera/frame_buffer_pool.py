@@ -0,0 +1,112 @@
+import threading
+from collections import deque
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    Fixed-size pool of preallocated numpy buffers for frame data. Buffers are reference counted so
+    that a single buffer can be shared by multiple consumers, and are returned to the pool once the
+    last reference is released. Free buffers are handed out in least-recently-released order.
+    """
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, num_buffers: int):
+        """
+        Args:
+            shape (Tuple[int, ...]): Shape of each buffer.
+            dtype (np.dtype): Data type of each buffer.
+            num_buffers (int): Number of buffers to preallocate.
+        """
+        self._shape = tuple(shape)
+        self._dtype = np.dtype(dtype)
+        self._buffers = [np.empty(shape, dtype=dtype) for _ in range(num_buffers)]
+        self._buffer_idxs = {
+            id(buffer): idx for idx, buffer in enumerate(self._buffers)
+        }
+        self._ref_counts = [0] * num_buffers
+        self._free_buffer_idxs = deque(range(num_buffers))
+        self._lock = threading.Lock()
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """
+        Returns:
+            Tuple[int, ...]: Shape of each buffer.
+        """
+        return self._shape
+
+    @property
+    def dtype(self) -> np.dtype:
+        """
+        Returns:
+            np.dtype: Data type of each buffer.
+        """
+        return self._dtype
+
+    @property
+    def num_buffers(self) -> int:
+        """
+        Returns:
+            int: Total number of buffers in the pool.
+        """
+        return len(self._buffers)
+
+    @property
+    def num_buffers_in_use(self) -> int:
+        """
+        Returns:
+            int: Number of buffers that are currently referenced.
+        """
+        with self._lock:
+            return len(self._buffers) - len(self._free_buffer_idxs)
+
+    def acquire(self) -> Optional[np.ndarray]:
+        """
+        Take a free buffer from the pool with a reference count of 1.
+
+        Returns:
+            Optional[np.ndarray]: A free buffer, or None if all buffers are in use.
+        """
+        with self._lock:
+            if not self._free_buffer_idxs:
+                return None
+            idx = self._free_buffer_idxs.popleft()
+            self._ref_counts[idx] = 1
+            return self._buffers[idx]
+
+    def retain(self, buffer: np.ndarray):
+        """
+        Add a reference to a buffer that was acquired from this pool.
+
+        Args:
+            buffer (np.ndarray): Buffer acquired from this pool.
+        """
+        idx = self._get_buffer_idx(buffer)
+        with self._lock:
+            if self._ref_counts[idx] <= 0:
+                raise ValueError("Cannot retain a buffer that is not in use")
+            self._ref_counts[idx] += 1
+
+    def release(self, buffer: np.ndarray):
+        """
+        Remove a reference to a buffer that was acquired from this pool. When no references remain,
+        the buffer is returned to the pool.
+
+        Args:
+            buffer (np.ndarray): Buffer acquired from this pool.
+        """
+        idx = self._get_buffer_idx(buffer)
+        with self._lock:
+            if self._ref_counts[idx] <= 0:
+                raise ValueError("Cannot release a buffer that is not in use")
+            self._ref_counts[idx] -= 1
+            if self._ref_counts[idx] == 0:
+                self._free_buffer_idxs.append(idx)
+
+    def _get_buffer_idx(self, buffer: np.ndarray) -> int:
+        idx = self._buffer_idxs.get(id(buffer))
+        if idx is None or self._buffers[idx] is not buffer:
+            raise ValueError("Buffer does not belong to this pool")
+        return idx
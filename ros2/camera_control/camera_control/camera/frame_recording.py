@@ -0,0 +1,462 @@
+"""
+Chunked, memory-mappable container for recorded RGB-D frames. A recording is a directory laid out as:
+
+    metadata.json       RecordingMetadata
+    calibration.npz     Calibration matrices of the camera
+    chunk_00000/
+        color.npy       (chunk_size, h, w, 3) uint8 color frames
+        depth.npy       (chunk_size, h, w, c) raw depth frames (Coord3D_ABCY16 for Lucid cameras)
+        timestamps.npy  (chunk_size, 2) float64 (timestamp_millis, depth_age_millis). Unwritten rows are NaN
+    chunk_00001/
+    ...
+
+Frames are stored raw so that they can be read back via memory-mapping without any decoding.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from dataclasses import asdict, dataclass, field, fields
+from enum import Enum, auto
+from glob import glob
+from typing import Deque, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .lucid_frame import LucidCalibration, LucidFrame
+
+RECORDING_FORMAT_VERSION = 1
+METADATA_FILENAME = "metadata.json"
+CALIBRATION_FILENAME = "calibration.npz"
+COLOR_FILENAME = "color.npy"
+DEPTH_FILENAME = "depth.npy"
+TIMESTAMPS_FILENAME = "timestamps.npy"
+
+
+@dataclass
+class RecordingMetadata:
+    camera_type: str
+    color_frame_shape: Tuple[int, ...]
+    depth_frame_shape: Tuple[int, ...]
+    depth_dtype: str
+    chunk_size: int = 100
+    # Lucid only: scale and offsets to convert raw Coord3D_ABCY16 values to mm
+    xyz_scale: float = 1.0
+    xyz_offset: Tuple[float, float, float] = (0.0, 0.0, 0.0)
+    format_version: int = RECORDING_FORMAT_VERSION
+    extra: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, metadata: dict) -> "RecordingMetadata":
+        metadata = dict(metadata)
+        metadata["color_frame_shape"] = tuple(metadata["color_frame_shape"])
+        metadata["depth_frame_shape"] = tuple(metadata["depth_frame_shape"])
+        metadata["xyz_offset"] = tuple(metadata["xyz_offset"])
+        return cls(**metadata)
+
+
+class DropPolicy(Enum):
+    """
+    Which frame to drop when a FrameRecorder's queue is full.
+    """
+
+    # Drop the incoming frame, keeping the frames already queued
+    DROP_NEWEST = auto()
+    # Drop the oldest queued frame to make room for the incoming frame
+    DROP_OLDEST = auto()
+
+
+@dataclass
+class FrameRecorderStats:
+    num_frames_recorded: int = 0
+    num_frames_dropped: int = 0
+    num_frames_queued: int = 0
+
+
+def get_chunk_dir(recording_dir: str, chunk_idx: int) -> str:
+    return os.path.join(recording_dir, f"chunk_{chunk_idx:05d}")
+
+
+def lucid_calibration_to_dict(calibration: LucidCalibration) -> Dict[str, np.ndarray]:
+    """
+    Args:
+        calibration (LucidCalibration): Calibration params of a LUCID camera pair.
+
+    Returns:
+        Dict[str, np.ndarray]: Calibration matrices by name, as stored in a recording.
+    """
+    return {
+        calibration_field.name: getattr(calibration, calibration_field.name)
+        for calibration_field in fields(calibration)
+        if calibration_field.init
+    }
+
+
+def lucid_calibration_from_dict(calibration: Dict[str, np.ndarray]) -> LucidCalibration:
+    """
+    Args:
+        calibration (Dict[str, np.ndarray]): Calibration matrices by name, as stored in a recording.
+
+    Returns:
+        LucidCalibration: Calibration params of a LUCID camera pair.
+    """
+    return LucidCalibration(
+        **{
+            calibration_field.name: calibration[calibration_field.name]
+            for calibration_field in fields(LucidCalibration)
+            if calibration_field.init
+        }
+    )
+
+
+class FrameRecordingWriter:
+    """
+    Appends frames to a recording. Chunks are preallocated as memory-mapped .npy files, so each
+    write is a copy into the mapped file. Not thread-safe.
+    """
+
+    def __init__(
+        self,
+        recording_dir: str,
+        metadata: RecordingMetadata,
+        calibration: Dict[str, np.ndarray],
+    ):
+        """
+        Args:
+            recording_dir (str): Directory to create the recording in. Must not already contain a recording.
+            metadata (RecordingMetadata): Recording metadata.
+            calibration (Dict[str, np.ndarray]): Calibration matrices of the camera, by name.
+        """
+        self.recording_dir = recording_dir
+        self.metadata = metadata
+        self.num_frames = 0
+        if os.path.exists(os.path.join(recording_dir, METADATA_FILENAME)):
+            raise FileExistsError(f"A recording already exists in {recording_dir}")
+        os.makedirs(recording_dir, exist_ok=True)
+        with open(os.path.join(recording_dir, METADATA_FILENAME), "w") as f:
+            json.dump(asdict(metadata), f, indent=2)
+        np.savez(os.path.join(recording_dir, CALIBRATION_FILENAME), **calibration)
+
+        self._chunk_color = None
+        self._chunk_depth = None
+        self._chunk_timestamps = None
+
+    def write(
+        self,
+        color_frame: np.ndarray,
+        depth_frame: np.ndarray,
+        timestamp_millis: float,
+        depth_age_millis: float = 0.0,
+    ):
+        """
+        Append a frame to the recording.
+
+        Args:
+            color_frame (np.ndarray): Color frame. Must match metadata.color_frame_shape.
+            depth_frame (np.ndarray): Raw depth frame. Must match metadata.depth_frame_shape.
+            timestamp_millis (float): Timestamp of the frame, in milliseconds.
+            depth_age_millis (float): Age of the depth frame relative to the color frame, in milliseconds.
+        """
+        chunk_size = self.metadata.chunk_size
+        idx_in_chunk = self.num_frames % chunk_size
+        if idx_in_chunk == 0:
+            self._open_chunk(self.num_frames // chunk_size)
+
+        self._chunk_color[idx_in_chunk] = color_frame
+        self._chunk_depth[idx_in_chunk] = depth_frame
+        self._chunk_timestamps[idx_in_chunk] = (timestamp_millis, depth_age_millis)
+        self.num_frames += 1
+
+    def close(self):
+        """
+        Flush and close the current chunk.
+        """
+        self._close_chunk()
+
+    def _open_chunk(self, chunk_idx: int):
+        self._close_chunk()
+        chunk_dir = get_chunk_dir(self.recording_dir, chunk_idx)
+        os.makedirs(chunk_dir)
+        chunk_size = self.metadata.chunk_size
+        self._chunk_color = np.lib.format.open_memmap(
+            os.path.join(chunk_dir, COLOR_FILENAME),
+            mode="w+",
+            dtype=np.uint8,
+            shape=(chunk_size, *self.metadata.color_frame_shape),
+        )
+        self._chunk_depth = np.lib.format.open_memmap(
+            os.path.join(chunk_dir, DEPTH_FILENAME),
+            mode="w+",
+            dtype=np.dtype(self.metadata.depth_dtype),
+            shape=(chunk_size, *self.metadata.depth_frame_shape),
+        )
+        self._chunk_timestamps = np.lib.format.open_memmap(
+            os.path.join(chunk_dir, TIMESTAMPS_FILENAME),
+            mode="w+",
+            dtype=np.float64,
+            shape=(chunk_size, 2),
+        )
+        # Rows with NaN timestamps denote frames that were never written
+        self._chunk_timestamps[:] = np.nan
+
+    def _close_chunk(self):
+        for chunk_array in (
+            self._chunk_color,
+            self._chunk_depth,
+            self._chunk_timestamps,
+        ):
+            if chunk_array is not None:
+                chunk_array.flush()
+        self._chunk_color = None
+        self._chunk_depth = None
+        self._chunk_timestamps = None
+
+
+class FrameRecordingReader:
+    """
+    Reads frames from a recording. All frame data is memory-mapped, so frames are only paged in
+    from disk when accessed.
+    """
+
+    def __init__(self, recording_dir: str):
+        """
+        Args:
+            recording_dir (str): Directory containing the recording.
+        """
+        self.recording_dir = recording_dir
+        with open(os.path.join(recording_dir, METADATA_FILENAME)) as f:
+            self.metadata = RecordingMetadata.from_dict(json.load(f))
+        if self.metadata.format_version != RECORDING_FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported recording format version: {self.metadata.format_version}"
+            )
+        with np.load(os.path.join(recording_dir, CALIBRATION_FILENAME)) as calibration:
+            self.calibration = {key: calibration[key] for key in calibration.files}
+
+        # Each entry is (color, depth, timestamps, num_frames) for a chunk
+        self._chunks: List[Tuple[np.ndarray, np.ndarray, np.ndarray, int]] = []
+        for chunk_dir in sorted(glob(os.path.join(recording_dir, "chunk_*"))):
+            timestamps = np.load(
+                os.path.join(chunk_dir, TIMESTAMPS_FILENAME), mmap_mode="r"
+            )
+            num_frames = int(np.count_nonzero(~np.isnan(timestamps[:, 0])))
+            if num_frames == 0:
+                continue
+            self._chunks.append(
+                (
+                    np.load(os.path.join(chunk_dir, COLOR_FILENAME), mmap_mode="r"),
+                    np.load(os.path.join(chunk_dir, DEPTH_FILENAME), mmap_mode="r"),
+                    timestamps,
+                    num_frames,
+                )
+            )
+        self._chunk_start_idxs = np.cumsum([0] + [chunk[3] for chunk in self._chunks])
+
+    def __len__(self) -> int:
+        return int(self._chunk_start_idxs[-1])
+
+    def get_frame(self, idx: int) -> Tuple[np.ndarray, np.ndarray, float, float]:
+        """
+        Args:
+            idx (int): Index of the frame in the recording.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray, float, float]: (color frame, depth frame, timestamp_millis, depth_age_millis). The frames are read-only memory-mapped views.
+        """
+        if idx < 0 or idx >= len(self):
+            raise IndexError(f"Frame index {idx} out of range")
+
+        chunk_idx = int(np.searchsorted(self._chunk_start_idxs, idx, side="right")) - 1
+        color, depth, timestamps, _ = self._chunks[chunk_idx]
+        idx_in_chunk = idx - int(self._chunk_start_idxs[chunk_idx])
+        timestamp_millis, depth_age_millis = timestamps[idx_in_chunk]
+        return (
+            color[idx_in_chunk],
+            depth[idx_in_chunk],
+            float(timestamp_millis),
+            float(depth_age_millis),
+        )
+
+    def get_timestamps_millis(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: (N,) array of the timestamps of all frames in the recording, in milliseconds.
+        """
+        if not self._chunks:
+            return np.empty(0)
+
+        return np.concatenate(
+            [
+                timestamps[:num_frames, 0]
+                for _, _, timestamps, num_frames in self._chunks
+            ]
+        )
+
+
+class FrameRecorder:
+    """
+    Records frames to disk on a background writer thread, so that recording never blocks the thread
+    that produces frames. Frames are queued by reference without copying. When the writer cannot keep
+    up, the bounded queue fills and frames are dropped according to the drop policy.
+
+    Note that queued frames keep their (possibly pooled) buffers alive, so max_queue_size should be
+    kept below the number of frame buffers of the camera.
+
+    Only LucidFrames are supported. The recording metadata and calibration are taken from the first
+    recorded frame.
+    """
+
+    def __init__(
+        self,
+        recording_dir: str,
+        chunk_size: int = 100,
+        max_queue_size: int = 4,
+        drop_policy: DropPolicy = DropPolicy.DROP_NEWEST,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            recording_dir (str): Directory to create the recording in.
+            chunk_size (int): Number of frames per chunk.
+            max_queue_size (int): Max number of frames waiting to be written.
+            drop_policy (DropPolicy): Which frame to drop when the queue is full.
+            logger (Optional[logging.Logger]): Logger
+        """
+        self.recording_dir = recording_dir
+        self._chunk_size = chunk_size
+        self._max_queue_size = max_queue_size
+        self._drop_policy = drop_policy
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = logging.getLogger(__name__)
+            self._logger.setLevel(logging.INFO)
+
+        self._cv = threading.Condition()
+        self._queue: Deque[LucidFrame] = deque()
+        self._is_running = False
+        self._writer_thread = None
+        self._stats = FrameRecorderStats()
+
+    @property
+    def is_running(self) -> bool:
+        """
+        Returns:
+            bool: Whether the recorder is accepting frames.
+        """
+        return self._is_running
+
+    @property
+    def stats(self) -> FrameRecorderStats:
+        """
+        Returns:
+            FrameRecorderStats: Snapshot of the recording counters.
+        """
+        with self._cv:
+            return FrameRecorderStats(
+                num_frames_recorded=self._stats.num_frames_recorded,
+                num_frames_dropped=self._stats.num_frames_dropped,
+                num_frames_queued=len(self._queue),
+            )
+
+    def start(self):
+        """
+        Start the writer thread.
+        """
+        if self._is_running:
+            return
+
+        self._is_running = True
+        self._writer_thread = threading.Thread(
+            target=self._writer_thread_fn, daemon=True
+        )
+        self._writer_thread.start()
+
+    def stop(self):
+        """
+        Stop accepting frames, and block until all queued frames have been written.
+        """
+        if not self._is_running:
+            return
+
+        with self._cv:
+            self._is_running = False
+            self._cv.notify_all()
+
+        if self._writer_thread is not None:
+            self._writer_thread.join()
+            self._writer_thread = None
+
+    def record(self, frame: LucidFrame) -> bool:
+        """
+        Queue a frame to be written. Never blocks on disk I/O.
+
+        Args:
+            frame (LucidFrame): Frame to record.
+
+        Returns:
+            bool: Whether the frame was queued.
+        """
+        if not isinstance(frame, LucidFrame):
+            raise TypeError(f"Unsupported frame type: {type(frame).__name__}")
+
+        with self._cv:
+            if not self._is_running:
+                return False
+
+            if len(self._queue) >= self._max_queue_size:
+                self._stats.num_frames_dropped += 1
+                if self._drop_policy == DropPolicy.DROP_NEWEST:
+                    return False
+                self._queue.popleft()
+
+            self._queue.append(frame)
+            self._cv.notify()
+            return True
+
+    def _writer_thread_fn(self):
+        writer = None
+        try:
+            while True:
+                with self._cv:
+                    while self._is_running and not self._queue:
+                        self._cv.wait()
+                    if not self._queue:
+                        # Stopped and fully drained
+                        break
+                    frame = self._queue.popleft()
+
+                if writer is None:
+                    writer = FrameRecordingWriter(
+                        self.recording_dir,
+                        RecordingMetadata(
+                            camera_type="lucid",
+                            color_frame_shape=frame.color_frame.shape,
+                            depth_frame_shape=frame.depth_frame_abcy.shape,
+                            depth_dtype=frame.depth_frame_abcy.dtype.str,
+                            chunk_size=self._chunk_size,
+                            xyz_scale=float(frame.xyz_scale),
+                            xyz_offset=tuple(float(v) for v in frame.xyz_offset),
+                        ),
+                        lucid_calibration_to_dict(frame.calibration),
+                    )
+
+                writer.write(
+                    frame.color_frame,
+                    frame.depth_frame_abcy,
+                    frame.timestamp_millis,
+                    frame.depth_age_millis,
+                )
+                del frame
+                with self._cv:
+                    self._stats.num_frames_recorded += 1
+        except Exception as e:
+            self._logger.error(f"Frame recording to {self.recording_dir} failed: {e}")
+            with self._cv:
+                self._is_running = False
+                self._queue.clear()
+        finally:
+            if writer is not None:
+                writer.close()
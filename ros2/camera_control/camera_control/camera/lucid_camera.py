@@ -1,11 +1,14 @@
 import argparse
-import concurrent.futures
 import ctypes
 import logging
+import math
 import os
 import sys
 import time
-from typing import Callable, Optional, Tuple
+import traceback
+import weakref
+from dataclasses import dataclass, replace
+from typing import Callable, List, Optional, Tuple
 
 import cv2
 import numpy as np
@@ -17,13 +20,19 @@ from .calibration import (
     construct_extrinsic_matrix,
     create_blob_detector,
 )
-from .rgbd_camera import RgbdCamera, State
+from .frame_buffer_pool import FrameBufferPool
+from .rgbd_camera import FramePairing, RgbdCamera, State
 from .rgbd_frame import RgbdFrame
-from .lucid_frame import LucidFrame
+from .lucid_frame import LucidCalibration, LucidFrame
 import threading
 
 COLOR_CAMERA_MODEL_PREFIXES = ["ATL", "ATX", "PHX", "TRI", "TRT"]
 DEPTH_CAMERA_MODEL_PREFIXES = ["HTP", "HLT", "HTR", "HTW"]
+# Max time to wait for a buffer from a device before treating the device as disconnected
+GET_BUFFER_TIMEOUT_MS = 5000
+# Interval at which each device's clock is resynchronized with the host's wall clock, to bound the
+# drift between them
+CLOCK_SYNC_INTERVAL_SECS = 10.0
 
 
 def scale_grayscale_image(mono_image: np.ndarray) -> np.ndarray:
@@ -125,6 +134,30 @@ def get_extrinsics(
         return None, None
 
 
+@dataclass
+class AcquisitionStats:
+    color_frames_grabbed: int = 0
+    depth_frames_grabbed: int = 0
+    # Frames that were grabbed but never emitted, either because a newer frame from the same device
+    # replaced it before it could be paired, or because no free buffer was available
+    color_frames_dropped: int = 0
+    depth_frames_dropped: int = 0
+    # Frames among the dropped frames that were dropped because no free buffer was available
+    color_frames_dropped_no_buffer: int = 0
+    depth_frames_dropped_no_buffer: int = 0
+    frames_emitted: int = 0
+    num_color_buffers_in_use: int = 0
+    num_depth_buffers_in_use: int = 0
+    num_frame_buffers: int = 0
+
+
+@dataclass
+class _GrabbedBuffer:
+    buffer: np.ndarray
+    timestamp_millis: float
+    num_times_paired: int = 0
+
+
 class LucidRgbdCamera(RgbdCamera):
     """
     Combined interface for a LUCID color camera (such as the Triton) and depth camera (such as the
@@ -148,6 +181,11 @@ class LucidRgbdCamera(RgbdCamera):
         xyz_to_depth_camera_extrinsic_matrix: np.ndarray,
         color_camera_serial_number: Optional[str] = None,
         depth_camera_serial_number: Optional[str] = None,
+        register_depth_to_color: bool = False,
+        frame_pairing: FramePairing = FramePairing.SYNCHRONIZED,
+        max_frame_pair_skew_ms: float = 50.0,
+        max_depth_age_ms: float = 100.0,
+        num_frame_buffers: int = 8,
         state_change_callback: Optional[Callable[[State], None]] = None,
         logger: Optional[logging.Logger] = None,
     ):
@@ -161,23 +199,31 @@ class LucidRgbdCamera(RgbdCamera):
             xyz_to_color_camera_extrinsic_matrix (np.ndarray): Extrinsic matrix from depth camera's XYZ positions to the depth camera.
             color_camera_serial_number (Optional[str]): Serial number of color camera to connect to. If None, the first available color camera will be used.
             depth_camera_serial_number (Optional[str]): Serial number of depth camera to connect to. If None, the first available depth camera will be used.
+            register_depth_to_color (bool): Whether frames should look up positions using a depth frame registered to the color frame.
+            frame_pairing (FramePairing): Policy for pairing color and depth frames.
+            max_frame_pair_skew_ms (float): Max difference in grab time between a paired color and depth frame when using FramePairing.SYNCHRONIZED.
+            max_depth_age_ms (float): Max age of the depth frame paired with a color frame when using FramePairing.LATEST_DEPTH. Color frames without a fresh enough depth frame are dropped.
+            num_frame_buffers (int): Number of preallocated buffers per device. Frames hold on to their buffers until they are garbage collected, so this bounds the number of frames that can be alive at once. Frames grabbed while all buffers are in use are dropped, which is logged and counted in acquisition_stats.
             state_change_callback (Optional[Callable[[State], None]]): Callback that gets called when the camera device state changes.
             logger (Optional[logging.Logger]): Logger
         """
         self.color_camera_serial_number = color_camera_serial_number
         self.color_frame_size = (0, 0)
-        self._color_camera_intrinsic_matrix = color_camera_intrinsic_matrix
-        self._color_camera_distortion_coeffs = color_camera_distortion_coeffs
         self.depth_camera_serial_number = depth_camera_serial_number
         self.depth_frame_size = (0, 0)
-        self._depth_camera_intrinsic_matrix = depth_camera_intrinsic_matrix
-        self._depth_camera_distortion_coeffs = depth_camera_distortion_coeffs
-        self._xyz_to_color_camera_extrinsic_matrix = (
-            xyz_to_color_camera_extrinsic_matrix
-        )
-        self._xyz_to_depth_camera_extrinsic_matrix = (
-            xyz_to_depth_camera_extrinsic_matrix
+        self._calibration = LucidCalibration(
+            color_camera_intrinsic_matrix,
+            color_camera_distortion_coeffs,
+            depth_camera_intrinsic_matrix,
+            depth_camera_distortion_coeffs,
+            xyz_to_color_camera_extrinsic_matrix,
+            xyz_to_depth_camera_extrinsic_matrix,
         )
+        self._register_depth_to_color = register_depth_to_color
+        self._frame_pairing = frame_pairing
+        self._max_frame_pair_skew_ms = max_frame_pair_skew_ms
+        self._max_depth_age_ms = max_depth_age_ms
+        self._num_frame_buffers = num_frame_buffers
         self._state_change_callback = state_change_callback
         if logger:
             self._logger = logger
@@ -195,6 +241,17 @@ class LucidRgbdCamera(RgbdCamera):
         self._connection_thread = None
         self._acquisition_thread = None
 
+        # Grab threads hand off buffers to the acquisition thread through the latest-buffer slots,
+        # guarded by _frames_cv
+        self._frames_cv = threading.Condition()
+        self._is_grabbing = False
+        self._grab_error = False
+        self._latest_color_buffer: Optional[_GrabbedBuffer] = None
+        self._latest_depth_buffer: Optional[_GrabbedBuffer] = None
+        self._color_buffer_pool: Optional[FrameBufferPool] = None
+        self._depth_buffer_pool: Optional[FrameBufferPool] = None
+        self._acquisition_stats = AcquisitionStats()
+
     @property
     def state(self) -> State:
         """
@@ -209,6 +266,36 @@ class LucidRgbdCamera(RgbdCamera):
             else:
                 return State.DISCONNECTED
 
+    @property
+    def device_id(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Serial numbers of the color and depth cameras, or None if they are not known yet.
+        """
+        if (
+            self.color_camera_serial_number is None
+            or self.depth_camera_serial_number is None
+        ):
+            return None
+        return f"{self.color_camera_serial_number}-{self.depth_camera_serial_number}"
+
+    @property
+    def acquisition_stats(self) -> AcquisitionStats:
+        """
+        Returns:
+            AcquisitionStats: Snapshot of frame acquisition counters and buffer occupancy.
+        """
+        with self._frames_cv:
+            stats = replace(self._acquisition_stats)
+            color_buffer_pool = self._color_buffer_pool
+            depth_buffer_pool = self._depth_buffer_pool
+        stats.num_frame_buffers = self._num_frame_buffers
+        if color_buffer_pool is not None:
+            stats.num_color_buffers_in_use = color_buffer_pool.num_buffers_in_use
+        if depth_buffer_pool is not None:
+            stats.num_depth_buffers_in_use = depth_buffer_pool.num_buffers_in_use
+        return stats
+
     def start(
         self,
         exposure_us: float = -1.0,
@@ -360,51 +447,245 @@ class LucidRgbdCamera(RgbdCamera):
     ):
         with self._cv:
             while self._is_running:
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future_color_frame = executor.submit(self._get_color_frame)
-                    future_depth_frame = executor.submit(self._get_depth_frame)
-
-                    try:
-                        color_frame = future_color_frame.result()
-                        depth_frame = future_depth_frame.result()
-                    except:
-                        self._logger.warn(
-                            f"There was an issue with the camera. Signaling connection thread"
-                        )
-                        self._cv.notify()
-                        self._cv.wait()
-                        continue
-
-                if color_frame is None or depth_frame is None:
+                if self.state == State.STREAMING:
+                    self._run_acquisition(frame_callback)
+                    if not self._is_running:
+                        break
                     self._logger.warn(
-                        f"No frame available. Signaling connection thread"
+                        f"There was an issue with the camera. Signaling connection thread"
                     )
-                    self._cv.notify()
-                    self._cv.wait()
-                    continue
+                self._cv.notify()
+                self._cv.wait()
 
-                # depth_frame is a numpy structured array containing both xyz and intensity data
-                # depth_frame_intensity = (depth_frame["i"] / 256).astype(np.uint8)
-                depth_frame_xyz = np.stack(
-                    [depth_frame["x"], depth_frame["y"], depth_frame["z"]], axis=-1
-                )
+        self._logger.info(f"Terminating acquisition thread")
 
+    def _run_acquisition(
+        self, frame_callback: Optional[Callable[[RgbdFrame], None]] = None
+    ):
+        """
+        Run the acquisition pipeline for the currently connected devices. Each device gets a
+        dedicated grab thread that copies buffers into a pool of preallocated frame buffers, while
+        this thread pairs the grabbed color and depth buffers into frames. Returns when the camera is
+        stopped or a grab thread encounters an error.
+        """
+        color_frame_width, color_frame_height = self.color_frame_size
+        depth_frame_width, depth_frame_height = self.depth_frame_size
+        color_buffer_pool = FrameBufferPool(
+            (color_frame_height, color_frame_width, 3),
+            np.uint8,
+            self._num_frame_buffers,
+        )
+        depth_buffer_pool = FrameBufferPool(
+            (depth_frame_height, depth_frame_width, 4),
+            np.uint16,
+            self._num_frame_buffers,
+        )
+        with self._frames_cv:
+            self._is_grabbing = True
+            self._grab_error = False
+            self._color_buffer_pool = color_buffer_pool
+            self._depth_buffer_pool = depth_buffer_pool
+
+        grab_threads = [
+            threading.Thread(
+                target=self._grab_thread_fn,
+                args=(
+                    self._color_device,
+                    self._get_color_frame,
+                    color_buffer_pool,
+                    True,
+                ),
+                daemon=True,
+            ),
+            threading.Thread(
+                target=self._grab_thread_fn,
+                args=(
+                    self._depth_device,
+                    self._get_depth_frame,
+                    depth_buffer_pool,
+                    False,
+                ),
+                daemon=True,
+            ),
+        ]
+        for grab_thread in grab_threads:
+            grab_thread.start()
+
+        try:
+            while True:
+                with self._frames_cv:
+                    frame_pair = self._pop_frame_pair()
+                    while (
+                        frame_pair is None and self._is_running and not self._grab_error
+                    ):
+                        self._frames_cv.wait(timeout=0.1)
+                        frame_pair = self._pop_frame_pair()
+                    if frame_pair is None:
+                        break
+                    self._acquisition_stats.frames_emitted += 1
+
+                color_buffer, depth_buffer = frame_pair
+                # depth_buffer is the raw Coord3D_ABCY16 data. LucidFrame only converts it to xyz
+                # positions when needed
+                frame = LucidFrame(
+                    color_buffer.buffer,
+                    depth_buffer.buffer,
+                    self._xyz_scale,
+                    self._xyz_offset,
+                    color_buffer.timestamp_millis,
+                    self._calibration,
+                    depth_age_millis=color_buffer.timestamp_millis
+                    - depth_buffer.timestamp_millis,
+                    register_depth_to_color=self._register_depth_to_color,
+                )
+                # Return the buffers to their pools once the frame is no longer referenced
+                weakref.finalize(frame, color_buffer_pool.release, color_buffer.buffer)
+                weakref.finalize(frame, depth_buffer_pool.release, depth_buffer.buffer)
                 if frame_callback is not None:
-                    frame_callback(
-                        LucidFrame(
-                            color_frame,
-                            depth_frame_xyz,  # type: ignore
-                            time.time() * 1000,
-                            self._color_camera_intrinsic_matrix,
-                            self._color_camera_distortion_coeffs,
-                            self._depth_camera_intrinsic_matrix,
-                            self._depth_camera_distortion_coeffs,
-                            self._xyz_to_color_camera_extrinsic_matrix,
-                            self._xyz_to_depth_camera_extrinsic_matrix,
-                        )
-                    )
+                    frame_callback(frame)
+                del frame
+        finally:
+            with self._frames_cv:
+                self._is_grabbing = False
+                self._frames_cv.notify_all()
+            for grab_thread in grab_threads:
+                grab_thread.join()
+            with self._frames_cv:
+                if self._latest_color_buffer is not None:
+                    color_buffer_pool.release(self._latest_color_buffer.buffer)
+                    self._latest_color_buffer = None
+                if self._latest_depth_buffer is not None:
+                    depth_buffer_pool.release(self._latest_depth_buffer.buffer)
+                    self._latest_depth_buffer = None
+
+    def _grab_thread_fn(
+        self,
+        device,
+        get_frame_fn: Callable[[Optional[np.ndarray]], Tuple[np.ndarray, int]],
+        buffer_pool: FrameBufferPool,
+        is_color: bool,
+    ):
+        # Scratch buffer used to drain the device when all pooled buffers are in use
+        scratch_buffer = np.empty(buffer_pool.shape, dtype=buffer_pool.dtype)
+        clock_offset_ns = 0
+        last_clock_sync_time = -math.inf
+        frame_type = "color" if is_color else "depth"
+        pool_exhausted = False
+        while self._is_grabbing:
+            buffer = buffer_pool.acquire()
+            # Only log when the pool becomes exhausted or recovers, rather than on every frame
+            if buffer is None and not pool_exhausted:
+                self._logger.warn(
+                    f"All {buffer_pool.num_buffers} {frame_type} frame buffers are in use. Dropping {frame_type} frames until a frame is released. Consider increasing num_frame_buffers"
+                )
+            elif buffer is not None and pool_exhausted:
+                self._logger.info(
+                    f"A {frame_type} frame buffer was released. Resuming {frame_type} frames"
+                )
+            pool_exhausted = buffer is None
+            try:
+                if time.monotonic() - last_clock_sync_time >= CLOCK_SYNC_INTERVAL_SECS:
+                    clock_offset_ns = _get_device_clock_offset_ns(device)
+                    last_clock_sync_time = time.monotonic()
+                _, device_timestamp_ns = get_frame_fn(
+                    scratch_buffer if buffer is None else buffer
+                )
+            except Exception:
+                # The logger may be an rclpy logger, which has no exception()
+                self._logger.error(
+                    f"Failed to grab {frame_type} frame: {traceback.format_exc()}"
+                )
+                if buffer is not None:
+                    buffer_pool.release(buffer)
+                with self._frames_cv:
+                    self._grab_error = True
+                    self._frames_cv.notify_all()
+                return
+            # Devices latch an image's timestamp at the start of its exposure. Stamping frames with
+            # it, rather than the time the frame was grabbed, excludes the exposure and the transfer
+            # to the host, which can take tens of milliseconds for a full resolution color frame
+            timestamp_millis = (device_timestamp_ns + clock_offset_ns) / 1e6
+
+            with self._frames_cv:
+                stats = self._acquisition_stats
+                if is_color:
+                    stats.color_frames_grabbed += 1
+                else:
+                    stats.depth_frames_grabbed += 1
+                if buffer is None:
+                    # The frame was grabbed into the scratch buffer
+                    if is_color:
+                        stats.color_frames_dropped += 1
+                        stats.color_frames_dropped_no_buffer += 1
+                    else:
+                        stats.depth_frames_dropped += 1
+                        stats.depth_frames_dropped_no_buffer += 1
+                    continue
 
-        self._logger.info(f"Terminating acquisition thread")
+                # Replace any buffer that has not been paired yet
+                grabbed_buffer = _GrabbedBuffer(buffer, timestamp_millis)
+                if is_color:
+                    if self._latest_color_buffer is not None:
+                        self._drop_grabbed_buffer(self._latest_color_buffer, True)
+                    self._latest_color_buffer = grabbed_buffer
+                else:
+                    if self._latest_depth_buffer is not None:
+                        self._drop_grabbed_buffer(self._latest_depth_buffer, False)
+                    self._latest_depth_buffer = grabbed_buffer
+                self._frames_cv.notify_all()
+
+    def _drop_grabbed_buffer(self, grabbed_buffer: _GrabbedBuffer, is_color: bool):
+        # Must be called with _frames_cv held. Only counts as a dropped frame if the buffer was
+        # never paired
+        if is_color:
+            self._color_buffer_pool.release(grabbed_buffer.buffer)
+            if grabbed_buffer.num_times_paired == 0:
+                self._acquisition_stats.color_frames_dropped += 1
+        else:
+            self._depth_buffer_pool.release(grabbed_buffer.buffer)
+            if grabbed_buffer.num_times_paired == 0:
+                self._acquisition_stats.depth_frames_dropped += 1
+
+    def _pop_frame_pair(self) -> Optional[Tuple[_GrabbedBuffer, _GrabbedBuffer]]:
+        # Must be called with _frames_cv held
+        color_buffer = self._latest_color_buffer
+        depth_buffer = self._latest_depth_buffer
+        if color_buffer is None or depth_buffer is None:
+            return None
+
+        if self._frame_pairing == FramePairing.LATEST_DEPTH:
+            self._latest_color_buffer = None
+            if (
+                color_buffer.timestamp_millis - depth_buffer.timestamp_millis
+                > self._max_depth_age_ms
+            ):
+                self._drop_grabbed_buffer(color_buffer, True)
+                return None
+            # The depth buffer stays in its slot so that it can be paired with later color buffers,
+            # so the frame needs its own reference to it
+            self._depth_buffer_pool.retain(depth_buffer.buffer)
+            depth_buffer.num_times_paired += 1
+            return (color_buffer, depth_buffer)
+
+        if (
+            self._frame_pairing == FramePairing.SYNCHRONIZED
+            and abs(color_buffer.timestamp_millis - depth_buffer.timestamp_millis)
+            > self._max_frame_pair_skew_ms
+        ):
+            # The older buffer cannot be paired with any later buffer, so drop it
+            if color_buffer.timestamp_millis < depth_buffer.timestamp_millis:
+                self._drop_grabbed_buffer(color_buffer, True)
+                self._latest_color_buffer = None
+            else:
+                self._drop_grabbed_buffer(depth_buffer, False)
+                self._latest_depth_buffer = None
+            return None
+
+        self._latest_color_buffer = None
+        self._latest_depth_buffer = None
+        color_buffer.num_times_paired += 1
+        depth_buffer.num_times_paired += 1
+        return (color_buffer, depth_buffer)
 
     def _start_stream(
         self,
@@ -601,10 +882,13 @@ class LucidRgbdCamera(RgbdCamera):
         nodemap = self._color_device.nodemap
         return (nodemap["Gain"].min, nodemap["Gain"].max)
 
-    def _get_color_frame(self) -> Optional[np.ndarray]:
+    def _get_color_frame(
+        self, out: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, int]:
+        # Returns the frame and its device timestamp in nanoseconds
         # get_buffer must be called after start_stream and before stop_stream (or
         # system.destroy_device), and buffers must be requeued
-        buffer = self._color_device.get_buffer()
+        buffer = self._color_device.get_buffer(timeout=GET_BUFFER_TIMEOUT_MS)
 
         # Convert to numpy array
         # buffer is a list of (buffer.width * buffer.height * num_channels) uint8s
@@ -616,17 +900,27 @@ class LucidRgbdCamera(RgbdCamera):
             dtype=np.uint8,
             shape=(buffer.height, buffer.width, num_channels),
         )
+        # Copy out of the device buffer, since it is reused once requeued
+        try:
+            if out is None:
+                out = np_array.copy()
+            else:
+                np.copyto(out, np_array)
+            timestamp_ns = buffer.timestamp_ns
+        finally:
+            self._color_device.requeue_buffer(buffer)
 
-        self._color_device.requeue_buffer(buffer)
-
-        return np_array
+        return out, timestamp_ns
 
-    def _get_depth_frame(self) -> Optional[np.ndarray]:
+    def _get_depth_frame(
+        self, out: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, int]:
+        # Returns the frame and its device timestamp in nanoseconds
         # get_buffer must be called after start_stream and before stop_stream (or
         # system.destroy_device), and buffers must be requeued
-        buffer = self._depth_device.get_buffer()
+        buffer = self._depth_device.get_buffer(timeout=GET_BUFFER_TIMEOUT_MS)
 
-        # Convert to numpy structured array
+        # Convert to numpy array
         # buffer is a list of (buffer.width * buffer.height * 8) 1-byte values. The 8 bytes per
         # pixel represent 4 channels, 16 bits each:
         #   - x position
@@ -636,56 +930,55 @@ class LucidRgbdCamera(RgbdCamera):
         # Buffer.pdata is a (uint8, ctypes.c_ubyte) pointer. It is easier to deal with Buffer.pdata
         # if it is cast to 16 bits so each channel value is read/accessed easily.
         # PixelFormat.Coord3D_ABCY16 is unsigned, so we cast to a ctypes.c_uint16 pointer.
+        # The raw values are copied out as-is, since the device buffer is reused once requeued. Conversion to
+        # (x, y, z) positions in mm (using self._xyz_scale and self._xyz_offset) is deferred to
+        # LucidFrame.
         pdata_16bit = ctypes.cast(buffer.pdata, ctypes.POINTER(ctypes.c_uint16))
         num_pixels = buffer.width * buffer.height
         num_channels = 4
         np_array = np.frombuffer(
-            (ctypes.c_int16 * num_pixels * num_channels).from_address(
+            (ctypes.c_uint16 * num_pixels * num_channels).from_address(
                 ctypes.addressof(pdata_16bit.contents)
             ),
-            dtype=np.dtype(
-                [
-                    ("x", np.uint16),
-                    ("y", np.uint16),
-                    ("z", np.uint16),
-                    ("i", np.uint16),
-                ]
-            ),
-        )
-        np_array = np_array.astype(
-            np.dtype(
-                [
-                    ("x", np.float32),
-                    ("y", np.float32),
-                    ("z", np.float32),
-                    ("i", np.uint16),
-                ]
-            )
-        )
+            dtype=np.uint16,
+        ).reshape(buffer.height, buffer.width, num_channels)
+        try:
+            if out is None:
+                out = np_array.copy()
+            else:
+                np.copyto(out, np_array)
+            timestamp_ns = buffer.timestamp_ns
+        finally:
+            self._depth_device.requeue_buffer(buffer)
 
-        # Apply scale and offsets to convert (x, y, z) to mm
-        np_array["x"] = np_array["x"] * self._xyz_scale + self._xyz_offset[0]
-        np_array["y"] = np_array["y"] * self._xyz_scale + self._xyz_offset[1]
-        np_array["z"] = np_array["z"] * self._xyz_scale + self._xyz_offset[2]
+        return out, timestamp_ns
 
-        # In unsigned pixel formats (such as ABCY16), values below the confidence threshold will have
-        # their x, y, z, and intensity values set to 0xFFFF (denoting invalid). For these invalid pixels,
-        # set (x, y, z) to (-1, -1, -1).
-        invalid_pixels = np_array["i"] == 65535
-        np_array["x"][invalid_pixels] = -1.0
-        np_array["y"][invalid_pixels] = -1.0
-        np_array["z"][invalid_pixels] = -1.0
 
-        np_array = np_array.reshape(buffer.height, buffer.width)
+def _get_device_clock_offset_ns(device) -> int:
+    """
+    Measure the offset between a device's clock and the host's wall clock.
 
-        self._depth_device.requeue_buffer(buffer)
+    Args:
+        device: Arena device.
 
-        return np_array
+    Returns:
+        int: Offset to add to the device's timestamps to convert them to wall clock time, in nanoseconds.
+    """
+    # The latch happens somewhere within the round trip, so take its midpoint as the host time
+    host_time_before_ns = time.time_ns()
+    device.nodemap["TimestampLatch"].execute()
+    host_time_after_ns = time.time_ns()
+    device_time_ns = device.nodemap["TimestampLatchValue"].value
+    return (host_time_before_ns + host_time_after_ns) // 2 - device_time_ns
 
 
 def create_lucid_rgbd_camera(
     color_camera_serial_number: Optional[str] = None,
     depth_camera_serial_number: Optional[str] = None,
+    register_depth_to_color: bool = False,
+    frame_pairing: FramePairing = FramePairing.SYNCHRONIZED,
+    max_depth_age_ms: float = 100.0,
+    num_frame_buffers: int = 8,
     state_change_callback: Optional[Callable[[State], None]] = None,
     logger: Optional[logging.Logger] = None,
 ) -> LucidRgbdCamera:
@@ -720,6 +1013,10 @@ def create_lucid_rgbd_camera(
         xyz_to_helios_extrinsic_matrix,  # type: ignore
         color_camera_serial_number=color_camera_serial_number,
         depth_camera_serial_number=depth_camera_serial_number,
+        register_depth_to_color=register_depth_to_color,
+        frame_pairing=frame_pairing,
+        max_depth_age_ms=max_depth_age_ms,
+        num_frame_buffers=num_frame_buffers,
         state_change_callback=state_change_callback,
         logger=logger,
     )
@@ -740,15 +1037,21 @@ def _get_frame(output_dir):
     camera.start()
     time.sleep(1)
 
-    color_frame = camera._get_color_frame()
-    depth_frame = camera._get_depth_frame()
+    color_frame, _ = camera._get_color_frame()
+    depth_frame, _ = camera._get_depth_frame()
 
     if color_frame is not None and depth_frame is not None:
         triton_mono_image = cv2.cvtColor(color_frame, cv2.COLOR_RGB2GRAY)
-        helios_intensity_image = (depth_frame["i"] / 256).astype(np.uint8)
-        helios_xyz = np.stack(
-            [depth_frame["x"], depth_frame["y"], depth_frame["z"]], axis=-1
+        frame = LucidFrame(
+            color_frame,
+            depth_frame,
+            camera._xyz_scale,
+            camera._xyz_offset,
+            time.time() * 1000,
+            camera._calibration,
         )
+        helios_intensity_image = (depth_frame[:, :, 3] / 256).astype(np.uint8)
+        helios_xyz = frame.depth_frame_xyz
 
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -808,16 +1111,23 @@ def _get_position(
 
     triton_image = cv2.cvtColor(triton_mono_image, cv2.COLOR_GRAY2RGB)
 
+    # helios_xyz is already in mm with invalid pixels set to -1, so pass it through with unit scale
+    # and zero offset
+    h, w, _ = helios_xyz.shape
     frame = LucidFrame(
         triton_image,
-        helios_xyz,  # type: ignore
+        np.dstack((helios_xyz, np.zeros((h, w), dtype=helios_xyz.dtype))),
+        1.0,
+        (0.0, 0.0, 0.0),
         time.time() * 1000,
-        triton_intrinsic_matrix,  # type: ignore
-        triton_distortion_coeffs,  # type: ignore
-        helios_intrinsic_matrix,  # type: ignore
-        helios_distortion_coeffs,  # type: ignore
-        xyz_to_triton_extrinsic_matrix,  # type: ignore
-        xyz_to_helios_extrinsic_matrix,  # type: ignore
+        LucidCalibration(
+            triton_intrinsic_matrix,  # type: ignore
+            triton_distortion_coeffs,  # type: ignore
+            helios_intrinsic_matrix,  # type: ignore
+            helios_distortion_coeffs,  # type: ignore
+            xyz_to_triton_extrinsic_matrix,  # type: ignore
+            xyz_to_helios_extrinsic_matrix,  # type: ignore
+        ),
     )
 
     depth_pixel = frame.get_corresponding_depth_pixel(color_pixel)
@@ -1,3 +1,5 @@
+from dataclasses import dataclass, field
+from functools import cached_property
 from typing import Optional, Tuple
 
 import cv2
@@ -10,57 +12,255 @@ from .rgbd_frame import RgbdFrame
 DEPTH_MIN_MM = 500
 DEPTH_MAX_MM = 10000
 
+# Downscale factor of the registered depth frame relative to the color frame
+REGISTERED_DEPTH_DOWNSCALE = 4
+# Max distance (in registered depth frame pixels) to fill holes in the registered depth frame from
+# the nearest valid pixel
+REGISTERED_DEPTH_MAX_FILL_DISTANCE = 2.0
+
+
+@dataclass
+class LucidCalibration:
+    """
+    Calibration params for a LUCID color camera and depth camera pair. Matrix products that are
+    constant for the pair are computed once here rather than for every frame.
+    """
+
+    color_camera_intrinsic_matrix: np.ndarray
+    color_camera_distortion_coeffs: np.ndarray
+    depth_camera_intrinsic_matrix: np.ndarray
+    depth_camera_distortion_coeffs: np.ndarray
+    xyz_to_color_camera_extrinsic_matrix: np.ndarray
+    xyz_to_depth_camera_extrinsic_matrix: np.ndarray
+    color_to_depth_extrinsic_matrix: np.ndarray = field(init=False)
+
+    def __post_init__(self):
+        self.color_to_depth_extrinsic_matrix = (
+            self.xyz_to_depth_camera_extrinsic_matrix
+            @ invert_extrinsic_matrix(self.xyz_to_color_camera_extrinsic_matrix)
+        )
+
 
 class LucidFrame(RgbdFrame):
+    """
+    Note that color_frame and depth_frame_abcy may be backed by pooled buffers that are reused once the
+    frame is garbage collected, so hold a reference to the frame (or copy the data) while using them.
+    """
+
     color_frame: np.ndarray
-    depth_frame: np.ndarray
     timestamp_millis: float
 
     def __init__(
         self,
         color_frame: np.ndarray,
-        depth_frame_xyz: np.ndarray,
+        depth_frame_abcy: np.ndarray,
+        xyz_scale: float,
+        xyz_offset: Tuple[float, float, float],
         timestamp_millis: float,
-        color_camera_intrinsic_matrix: np.ndarray,
-        color_camera_distortion_coeffs: np.ndarray,
-        depth_camera_intrinsic_matrix: np.ndarray,
-        depth_camera_distortion_coeffs: np.ndarray,
-        xyz_to_color_camera_extrinsic_matrix: np.ndarray,
-        xyz_to_depth_camera_extrinsic_matrix: np.ndarray,
+        calibration: LucidCalibration,
+        depth_age_millis: float = 0.0,
+        register_depth_to_color: bool = False,
     ):
         """
         Args:
             color_frame (np.ndarray): The color frame in RGB8 format.
-            depth_frame_xyz (np.ndarray): The depth frame in Coord3D_ABC16 format.
-            timestamp_millis (float): The timestamp of the frame, in milliseconds since the device was started.
-            color_camera_intrinsic_matrix (np.ndarray): Intrinsic matrix of the color camera.
-            color_camera_distortion_coeffs (np.ndarray): Distortion coefficients of the color camera.
-            depth_camera_intrinsic_matrix (np.ndarray): Intrinsic matrix of the depth camera.
-            depth_camera_distortion_coeffs (np.ndarray): Distortion coefficients of the depth camera.
-            xyz_to_color_camera_extrinsic_matrix (np.ndarray): Extrinsic matrix from depth camera's XYZ positions to the color camera.
-            xyz_to_color_camera_extrinsic_matrix (np.ndarray): Extrinsic matrix from depth camera's XYZ positions to the depth camera.
+            depth_frame_abcy (np.ndarray): The raw depth frame as an (h, w, 4) array in Coord3D_ABCY16 layout (x, y, z, intensity). This is the source of truth for all depth data, which is only converted when first accessed.
+            xyz_scale (float): Scale to apply to the raw (x, y, z) values to convert them to mm.
+            xyz_offset (Tuple[float, float, float]): Offsets to apply to the scaled (x, y, z) values to convert them to mm.
+            timestamp_millis (float): Wall clock time at which the exposure of the color frame started, in milliseconds.
+            calibration (LucidCalibration): Calibration params of the color and depth cameras.
+            depth_age_millis (float): Age of the depth frame relative to the color frame, in milliseconds.
+            register_depth_to_color (bool): Whether to look up positions using a depth frame registered to the color frame. The registered depth frame is built once per frame on first use, after which each lookup is a simple array index.
         """
         self.color_frame = color_frame
-        self._depth_frame_xyz = depth_frame_xyz
-        self.depth_frame = np.sqrt(np.sum(np.square(depth_frame_xyz), axis=-1)).astype(
-            np.uint16
-        )  # Represent the depth frame as the L2 norm, and convert to mono16
-
+        self.depth_frame_abcy = depth_frame_abcy
         self.timestamp_millis = timestamp_millis
-        self._color_camera_intrinsic_matrix = color_camera_intrinsic_matrix
-        self._color_camera_distortion_coeffs = color_camera_distortion_coeffs
-        self._depth_camera_intrinsic_matrix = depth_camera_intrinsic_matrix
-        self._depth_camera_distortion_coeffs = depth_camera_distortion_coeffs
+        self.depth_age_millis = depth_age_millis
+        self._xyz_scale = xyz_scale
+        self._xyz_offset = xyz_offset
+        self._calibration = calibration
+        self._color_camera_intrinsic_matrix = calibration.color_camera_intrinsic_matrix
+        self._color_camera_distortion_coeffs = (
+            calibration.color_camera_distortion_coeffs
+        )
+        self._depth_camera_intrinsic_matrix = calibration.depth_camera_intrinsic_matrix
+        self._depth_camera_distortion_coeffs = (
+            calibration.depth_camera_distortion_coeffs
+        )
         self._xyz_to_color_camera_extrinsic_matrix = (
-            xyz_to_color_camera_extrinsic_matrix
+            calibration.xyz_to_color_camera_extrinsic_matrix
         )
         self._xyz_to_depth_camera_extrinsic_matrix = (
-            xyz_to_depth_camera_extrinsic_matrix
+            calibration.xyz_to_depth_camera_extrinsic_matrix
         )
         self._color_to_depth_extrinsic_matrix = (
-            xyz_to_depth_camera_extrinsic_matrix
-            @ invert_extrinsic_matrix(xyz_to_color_camera_extrinsic_matrix)
+            calibration.color_to_depth_extrinsic_matrix
+        )
+        self._register_depth_to_color = register_depth_to_color
+
+    @property
+    def xyz_scale(self) -> float:
+        """
+        Returns:
+            float: Scale applied to the raw (x, y, z) values to convert them to mm.
+        """
+        return self._xyz_scale
+
+    @property
+    def xyz_offset(self) -> Tuple[float, float, float]:
+        """
+        Returns:
+            Tuple[float, float, float]: Offsets applied to the scaled (x, y, z) values to convert them to mm.
+        """
+        return self._xyz_offset
+
+    @property
+    def calibration(self) -> LucidCalibration:
+        """
+        Returns:
+            LucidCalibration: Calibration params of the color and depth cameras.
+        """
+        return self._calibration
+
+    @cached_property
+    def depth_frame_xyz(self) -> np.ndarray:
+        """
+        (x, y, z) positions in mm from the depth camera, computed from the raw depth frame on first access.
+        Invalid pixels are set to (-1, -1, -1).
+
+        Returns:
+            np.ndarray: (h, w, 3) float32 array of (x, y, z) positions.
+        """
+        return self._convert_abcy_to_xyz(self.depth_frame_abcy)
+
+    @cached_property
+    def depth_frame(self) -> np.ndarray:
+        """
+        The depth frame represented as the L2 norm of each (x, y, z) position, in mono16 format. Computed on
+        first access.
+
+        Returns:
+            np.ndarray: (h, w) uint16 array of depths in mm.
+        """
+        return np.linalg.norm(self.depth_frame_xyz, axis=-1).astype(np.uint16)
+
+    def _get_depth_frame_xyz_at(self, depth_pixels: np.ndarray) -> np.ndarray:
+        """
+        Get the (x, y, z) positions at (x, y) coordinates in the depth frame. If the full depth_frame_xyz has
+        not been computed yet, only the requested pixels of the raw depth frame are converted.
+
+        Args:
+            depth_pixels (np.ndarray): (..., 2) array of (x, y) coordinates in the depth frame.
+
+        Returns:
+            np.ndarray: (..., 3) float32 array of (x, y, z) positions. Invalid pixels are set to (-1, -1, -1).
+        """
+        if "depth_frame_xyz" in self.__dict__:
+            return self.depth_frame_xyz[depth_pixels[..., 1], depth_pixels[..., 0]]
+
+        return self._convert_abcy_to_xyz(
+            self.depth_frame_abcy[depth_pixels[..., 1], depth_pixels[..., 0]]
+        )
+
+    def _convert_abcy_to_xyz(self, depth_abcy: np.ndarray) -> np.ndarray:
+        """
+        Convert raw Coord3D_ABCY16 values to (x, y, z) positions in mm.
+
+        Args:
+            depth_abcy (np.ndarray): (..., 4) array of raw (x, y, z, intensity) values.
+
+        Returns:
+            np.ndarray: (..., 3) float32 array of (x, y, z) positions. Invalid pixels are set to (-1, -1, -1).
+        """
+        positions = depth_abcy[..., :3].astype(np.float32)
+        positions *= self._xyz_scale
+        positions += np.asarray(self._xyz_offset, dtype=np.float32)
+
+        # In unsigned pixel formats (such as ABCY16), values below the confidence threshold will have
+        # their x, y, z, and intensity values set to 0xFFFF (denoting invalid). For these invalid pixels,
+        # set (x, y, z) to (-1, -1, -1).
+        positions[depth_abcy[..., 3] == 65535] = -1.0
+        return positions
+
+    @cached_property
+    def registered_depth_frame_xyz(self) -> np.ndarray:
+        """
+        XYZ positions from the depth camera, registered to the color frame at 1/REGISTERED_DEPTH_DOWNSCALE of
+        the color frame resolution. Pixels with no corresponding position are set to -1.
+
+        The registered frame is built by projecting every valid XYZ position onto the color image plane, keeping
+        the position closest to the color camera where multiple positions land on the same pixel, and filling
+        small holes from the nearest valid pixel.
+
+        Returns:
+            np.ndarray: (H, W, 3) array of XYZ positions in the depth camera's XYZ coordinate space.
+        """
+        color_frame_height, color_frame_width = self.color_frame.shape[:2]
+        registered_height = -(-color_frame_height // REGISTERED_DEPTH_DOWNSCALE)
+        registered_width = -(-color_frame_width // REGISTERED_DEPTH_DOWNSCALE)
+        registered_frame_xyz = np.full(
+            (registered_height * registered_width, 3), -1.0, dtype=np.float32
+        )
+
+        positions = self.depth_frame_xyz.reshape(-1, 3)
+        positions = positions[positions[:, 2] >= 0.0].astype(np.float64)
+        if positions.shape[0] == 0:
+            return registered_frame_xyz.reshape(registered_height, registered_width, 3)
+
+        # Project all positions onto the color image plane in a single call
+        rotation = self._xyz_to_color_camera_extrinsic_matrix[:3, :3]
+        translation = self._xyz_to_color_camera_extrinsic_matrix[:3, 3]
+        color_pixels, _ = cv2.projectPoints(
+            positions,
+            rotation,
+            translation,
+            self._color_camera_intrinsic_matrix,
+            self._color_camera_distortion_coeffs,
         )
+        registered_pixels = (
+            np.round(color_pixels.reshape(-1, 2)).astype(np.int64)
+            // REGISTERED_DEPTH_DOWNSCALE
+        )
+        in_bounds = (
+            (registered_pixels[:, 0] >= 0)
+            & (registered_pixels[:, 0] < registered_width)
+            & (registered_pixels[:, 1] >= 0)
+            & (registered_pixels[:, 1] < registered_height)
+        )
+        positions = positions[in_bounds]
+        registered_pixels = registered_pixels[in_bounds]
+
+        # Z-buffer: where multiple positions land on the same pixel, keep the one closest to the
+        # color camera
+        color_camera_depths = positions @ rotation[2] + translation[2]
+        flat_idxs = registered_pixels[:, 1] * registered_width + registered_pixels[:, 0]
+        order = np.lexsort((color_camera_depths, flat_idxs))
+        sorted_flat_idxs = flat_idxs[order]
+        is_closest = np.ones(sorted_flat_idxs.shape[0], dtype=bool)
+        is_closest[1:] = sorted_flat_idxs[1:] != sorted_flat_idxs[:-1]
+        closest_idxs = order[is_closest]
+        registered_frame_xyz[flat_idxs[closest_idxs]] = positions[closest_idxs]
+
+        # Fill small holes from the nearest valid pixel. With DIST_LABEL_PIXEL, each label refers
+        # to a valid pixel by its (1-based) index among valid pixels in row-major order
+        registered_frame_xyz = registered_frame_xyz.reshape(
+            registered_height, registered_width, 3
+        )
+        holes = registered_frame_xyz[:, :, 2] < 0.0
+        if np.any(holes) and not np.all(holes):
+            distances, labels = cv2.distanceTransformWithLabels(
+                holes.astype(np.uint8),
+                cv2.DIST_L2,
+                3,
+                labelType=cv2.DIST_LABEL_PIXEL,
+            )
+            valid_flat_idxs = np.flatnonzero(~holes)
+            fill = holes & (distances <= REGISTERED_DEPTH_MAX_FILL_DISTANCE)
+            registered_frame_xyz[fill] = registered_frame_xyz.reshape(-1, 3)[
+                valid_flat_idxs[labels[fill] - 1]
+            ]
+
+        return registered_frame_xyz
 
     def get_corresponding_depth_pixel_deprecated(
         self, color_pixel: Tuple[int, int]
@@ -132,165 +332,115 @@ class LucidFrame(RgbdFrame):
         """
         Given an (x, y) coordinate in the color frame, return the corresponding (x, y) coordinate in the depth frame.
 
+        Args:
+            color_pixel (Sequence[int]): (x, y) coordinate in the color frame.
+
+        Returns:
+            Tuple[int, int]: (x, y) coordinate in the depth frame.
+        """
+        depth_pixel = self.get_corresponding_depth_pixels(np.array([color_pixel]))[0]
+        return (int(depth_pixel[0]), int(depth_pixel[1]))
+
+    def get_corresponding_depth_pixels(self, color_pixels: np.ndarray) -> np.ndarray:
+        """
+        Given (x, y) coordinates in the color frame, return the corresponding (x, y) coordinates in the depth frame.
+
         The general approach is as follows:
-            1. Deproject the color image pixel coordinate to two positions in the color camera-space: one that corresponds to the
-               position at the minimum depth, and one at the maximum depth.
-            2. Transform the two positions from color camera-space to depth camera-space.
-            3. Project the two positions to their respective depth image pixel coordinates.
-            4. The target lies somewhere along the line formed by the two pixel coordinates found in the previous step. We
-               iteratively move pixel by pixel along this line. For each depth image pixel, we grab the xyz data at the pixel,
-               project it onto the color image plane, and see how far it is from the original color pixel coordinate. We find
-               and return the closest match.
+            1. Deproject each color image pixel coordinate to two positions in the color camera-space: one that corresponds
+               to the position at the minimum depth, and one at the maximum depth.
+            2. Transform the positions from color camera-space to depth camera-space.
+            3. Project the positions to their respective depth image pixel coordinates.
+            4. Each target lies somewhere along the line formed by its two depth pixel coordinates found in the previous
+               step. We sample every depth image pixel along every line, grab the xyz data at those pixels, project all of
+               them onto the color image plane at once, and see how far each is from its original color pixel coordinate.
+               We find and return the closest match for each line.
 
         Note that in order to achieve the above, we require two extrinsic matrices - one for projecting the xyz positions to
         the color camera image plane, and one for projecting the xyz positions to the depth camera image plane.
 
         Args:
-            color_pixel (Sequence[int]): (x, y) coordinate in the color frame.
+            color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
 
         Returns:
-            Tuple[int, int]: (x, y) coordinate in the depth frame.
+            np.ndarray: (N, 2) array of (x, y) coordinates in the depth frame.
         """
-
-        def deproject_pixel(pixel, depth, camera_matrix, distortion_coeffs):
-            # Normalized, undistorted pixel coord
-            pixel = np.array([[[pixel[0], pixel[1]]]], dtype=np.float32)
-            pixel_undistorted = cv2.undistortPoints(
-                pixel,
-                camera_matrix,
-                distortion_coeffs,
-            )
-            return np.array(
-                [
-                    pixel_undistorted[0][0][0] * depth,
-                    pixel_undistorted[0][0][1] * depth,
-                    depth,
-                ]
-            )
-
-        def transform_position(position, extrinsic_matrix):
-            position = np.array(position)
-            homogeneous_position = np.append(position, 1)
-            return np.dot(extrinsic_matrix, homogeneous_position)[:3]
-
-        def project_position(
-            position, camera_matrix, distortion_coeffs, extrinsic_matrix=None
-        ):
-            R = extrinsic_matrix[:3, :3] if extrinsic_matrix is not None else np.eye(3)
-            t = extrinsic_matrix[:3, 3] if extrinsic_matrix is not None else np.zeros(3)
-            pixels, _ = cv2.projectPoints(
-                np.array([[position]]),
-                R,
-                t,
-                camera_matrix,
-                distortion_coeffs,
-            )
-            pixel = pixels[0].flatten()
-            return (int(round(pixel[0])), int(round(pixel[1])))
-
-        def adjust_pixel_to_bounds(pixel, width, height):
-            x = max(0, min(int(round(pixel[0])), width - 1))
-            y = max(0, min(int(round(pixel[1])), height - 1))
-            return (x, y)
-
-        def next_pixel_in_line(curr, start, end):
-            # Move one pixel from curr to end
-            curr = np.array(curr)
-            end = np.array(end)
-            direction = end - curr
-            direction = direction / np.linalg.norm(direction)
-            next = curr + direction
-            return (int(round(next[0])), int(round(next[1])))
-
-        def is_pixel_in_line(curr, start, end):
-            min_x = min(start[0], end[0])
-            max_x = max(start[0], end[0])
-            min_y = min(start[1], end[1])
-            max_y = max(start[1], end[1])
-
-            return min_x <= curr[0] <= max_x and min_y <= curr[1] <= max_y
-
-        # Min-depth and max-depth positions in color camera-space
-        min_depth_position_color_space = deproject_pixel(
-            color_pixel,
-            DEPTH_MIN_MM,
+        color_pixels = np.asarray(color_pixels, dtype=np.float32).reshape(-1, 2)
+        num_pixels = color_pixels.shape[0]
+        if num_pixels == 0:
+            return np.empty((0, 2), dtype=np.int64)
+
+        # Min-depth and max-depth positions in color camera-space. The first N rows are the
+        # min-depth positions and the last N rows are the max-depth positions.
+        normalized_color_pixels = cv2.undistortPoints(
+            color_pixels.reshape(-1, 1, 2),
             self._color_camera_intrinsic_matrix,
             self._color_camera_distortion_coeffs,
+        ).reshape(-1, 2)
+        homogeneous_color_pixels = np.hstack(
+            (normalized_color_pixels, np.ones((num_pixels, 1)))
         )
-        max_depth_position_color_space = deproject_pixel(
-            color_pixel,
-            DEPTH_MAX_MM,
-            self._color_camera_intrinsic_matrix,
-            self._color_camera_distortion_coeffs,
+        positions_color_space = np.vstack(
+            (
+                homogeneous_color_pixels * DEPTH_MIN_MM,
+                homogeneous_color_pixels * DEPTH_MAX_MM,
+            )
         )
 
         # Min-depth and max-depth positions in depth camera-space
-        min_depth_position_depth_space = transform_position(
-            min_depth_position_color_space, self._color_to_depth_extrinsic_matrix
-        )
-        max_depth_position_depth_space = transform_position(
-            max_depth_position_color_space, self._color_to_depth_extrinsic_matrix
+        positions_depth_space = (
+            positions_color_space @ self._color_to_depth_extrinsic_matrix[:3, :3].T
+            + self._color_to_depth_extrinsic_matrix[:3, 3]
         )
 
-        # Project depth camera-space positions to depth pixels
-        min_depth_pixel = project_position(
-            min_depth_position_depth_space,
+        # Project depth camera-space positions to depth pixels, and make sure pixel coords are
+        # in boundary
+        line_endpoints, _ = cv2.projectPoints(
+            positions_depth_space,
+            np.zeros(3),
+            np.zeros(3),
             self._depth_camera_intrinsic_matrix,
             self._depth_camera_distortion_coeffs,
         )
-        max_depth_pixel = project_position(
-            max_depth_position_depth_space,
-            self._depth_camera_intrinsic_matrix,
-            self._depth_camera_distortion_coeffs,
+        depth_frame_height, depth_frame_width = self.depth_frame_abcy.shape[:2]
+        line_endpoints = np.clip(
+            np.round(line_endpoints.reshape(-1, 2)),
+            0,
+            [depth_frame_width - 1, depth_frame_height - 1],
         )
-
-        # Make sure pixel coords are in boundary
-        depth_frame_height, depth_frame_width, depth_channels = (
-            self._depth_frame_xyz.shape
+        min_depth_pixels = line_endpoints[:num_pixels]
+        max_depth_pixels = line_endpoints[num_pixels:]
+
+        # Sample every depth pixel along each line. Lines shorter than the longest line are
+        # padded by repeating their last pixel, which does not affect the closest match.
+        line_deltas = max_depth_pixels - min_depth_pixels
+        line_lengths = np.max(np.abs(line_deltas), axis=1)
+        steps = np.arange(int(np.max(line_lengths)) + 1)
+        line_fractions = np.minimum(
+            steps[np.newaxis, :] / np.maximum(line_lengths, 1)[:, np.newaxis], 1.0
         )
-        min_depth_pixel = adjust_pixel_to_bounds(
-            min_depth_pixel, depth_frame_width, depth_frame_height
+        candidate_depth_pixels = np.round(
+            min_depth_pixels[:, np.newaxis, :]
+            + line_fractions[:, :, np.newaxis] * line_deltas[:, np.newaxis, :]
+        ).astype(np.int64)
+
+        # Project the xyz data at every candidate depth pixel onto the color image plane in a
+        # single call, and find the candidate closest to the target color pixel on each line
+        candidate_positions = self._get_depth_frame_xyz_at(candidate_depth_pixels)
+        candidate_color_pixels, _ = cv2.projectPoints(
+            candidate_positions.reshape(-1, 3).astype(np.float64),
+            self._xyz_to_color_camera_extrinsic_matrix[:3, :3],
+            self._xyz_to_color_camera_extrinsic_matrix[:3, 3],
+            self._color_camera_intrinsic_matrix,
+            self._color_camera_distortion_coeffs,
         )
-        max_depth_pixel = adjust_pixel_to_bounds(
-            max_depth_pixel, depth_frame_width, depth_frame_height
+        candidate_color_pixels = np.round(
+            candidate_color_pixels.reshape(num_pixels, -1, 2)
         )
-
-        # Search along the line for the depth pixel for which its corresponding projected color pixel is the closest
-        # to the target color pixel
-        min_dist = -1
-        closest_depth_pixel = min_depth_pixel
-        curr_depth_pixel = min_depth_pixel
-        while True:
-            xyz_mm = self._depth_frame_xyz[curr_depth_pixel[1]][curr_depth_pixel[0]]
-            curr_color_pixel = project_position(
-                xyz_mm,
-                self._color_camera_intrinsic_matrix,
-                self._color_camera_distortion_coeffs,
-                self._xyz_to_color_camera_extrinsic_matrix,
-            )
-            distance = np.linalg.norm(
-                np.array(curr_color_pixel).astype(float)
-                - np.array(color_pixel).astype(float)
-            )
-            if distance < min_dist or min_dist < 0:
-                min_dist = distance
-                closest_depth_pixel = curr_depth_pixel
-
-            # Stop if we've processed the max_depth_pixel
-            if (
-                curr_depth_pixel[0] == max_depth_pixel[0]
-                and curr_depth_pixel[1] == max_depth_pixel[1]
-            ):
-                break
-
-            # Otherwise, find the next pixel along the line we should try
-            curr_depth_pixel = next_pixel_in_line(
-                curr_depth_pixel, min_depth_pixel, max_depth_pixel
-            )
-            if not is_pixel_in_line(curr_depth_pixel, min_depth_pixel, max_depth_pixel):
-                break
-
-        return closest_depth_pixel
+        distances = np.linalg.norm(
+            candidate_color_pixels - color_pixels[:, np.newaxis, :], axis=-1
+        )
+        closest_idxs = np.argmin(distances, axis=1)
+        return candidate_depth_pixels[np.arange(num_pixels), closest_idxs]
 
     def get_position(
         self, color_pixel: Tuple[int, int]
@@ -304,10 +454,51 @@ class LucidFrame(RgbdFrame):
         Returns:
             Optional[Tuple[float, float, float]]: (x, y, z) position with respect to the camera, or None if the position could not be determined.
         """
-        depth_pixel = self.get_corresponding_depth_pixel(color_pixel)
-        position = self._depth_frame_xyz[depth_pixel[1]][depth_pixel[0]]
-        # Negative depth indicates an invalid position
-        if position[2] < 0.0:
+        position = self.get_positions(np.array([color_pixel]))[0]
+        if np.isnan(position[2]):
             return None
 
         return (float(position[0]), float(position[1]), float(position[2]))
+
+    def get_positions(self, color_pixels: np.ndarray) -> np.ndarray:
+        """
+        Given (x, y) coordinates in the color frame, return the (x, y, z) positions with respect to the camera.
+
+        Args:
+            color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
+
+        Returns:
+            np.ndarray: (N, 3) array of (x, y, z) positions with respect to the camera. Rows for which the position could not be determined are set to NaN.
+        """
+        if self._register_depth_to_color:
+            positions = self._get_registered_positions(color_pixels)
+        else:
+            depth_pixels = self.get_corresponding_depth_pixels(color_pixels)
+            positions = self._get_depth_frame_xyz_at(depth_pixels).astype(np.float64)
+        # Negative depth indicates an invalid position
+        positions[positions[:, 2] < 0.0] = np.nan
+        return positions
+
+    def _get_registered_positions(self, color_pixels: np.ndarray) -> np.ndarray:
+        """
+        Look up the XYZ positions at (x, y) coordinates in the color frame from the registered depth frame.
+
+        Args:
+            color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
+
+        Returns:
+            np.ndarray: (N, 3) array of (x, y, z) positions. Rows with no corresponding position are negative.
+        """
+        registered_frame_xyz = self.registered_depth_frame_xyz
+        registered_height, registered_width = registered_frame_xyz.shape[:2]
+        registered_pixels = np.clip(
+            np.round(np.asarray(color_pixels, dtype=np.float64).reshape(-1, 2)).astype(
+                np.int64
+            )
+            // REGISTERED_DEPTH_DOWNSCALE,
+            0,
+            [registered_width - 1, registered_height - 1],
+        )
+        return registered_frame_xyz[
+            registered_pixels[:, 1], registered_pixels[:, 0]
+        ].astype(np.float64)
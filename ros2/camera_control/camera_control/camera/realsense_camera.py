@@ -1,12 +1,14 @@
 import logging
 import threading
 import time
-from typing import Callable, Optional, Tuple
+from typing import Callable, Dict, Optional, Tuple
 
 import pyrealsense2 as rs
 
+from .realsense_depth_processor import RealSenseDepthProcessor
 from .realsense_frame import RealSenseFrame
-from .rgbd_camera import RgbdCamera, State
+from .realsense_time import enable_global_time, get_exposure_start_millis
+from .rgbd_camera import FramePairing, RgbdCamera, State
 from .rgbd_frame import RgbdFrame
 
 
@@ -14,6 +16,7 @@ class RealSenseCamera(RgbdCamera):
     color_frame_size: Tuple[int, int]
     depth_frame_size: Tuple[int, int]
     fps: int
+    depth_fps: int
     serial_number: Optional[str]
 
     def __init__(
@@ -21,7 +24,11 @@ class RealSenseCamera(RgbdCamera):
         color_frame_size: Tuple[int, int] = (1280, 720),
         depth_frame_size: Tuple[int, int] = (1280, 720),
         fps: int = 30,
+        depth_fps: Optional[int] = None,
         align_depth_to_color_frame: bool = True,
+        lazy_depth_processing: bool = False,
+        frame_pairing: FramePairing = FramePairing.SYNCHRONIZED,
+        max_depth_age_ms: float = 100.0,
         serial_number: Optional[str] = None,
         camera_index: int = 0,
         state_change_callback: Optional[Callable[[State], None]] = None,
@@ -38,7 +45,11 @@ class RealSenseCamera(RgbdCamera):
             color_frame_size (Tuple[int, int]): (width, height) of the color frame.
             depth_frame_size (Tuple[int, int]): (width, height) of the depth frame.
             fps (int): Number of frames per second that the camera should capture.
+            depth_fps (Optional[int]): Number of depth frames per second that the camera should capture. If None, fps will be used.
             align_depth_to_color_frame (bool): Whether the color and depth frames should be aligned.
+            lazy_depth_processing (bool): Whether to hand off unprocessed frames, and only align and filter the depth frame when a frame's depth data is first used. Note that the temporal filter then only sees the depth frames that were actually used.
+            frame_pairing (FramePairing): Policy for pairing color and depth frames. SYNCHRONIZED and LATEST both use the framesets synchronized by the pipeline. LATEST_DEPTH emits every color frame with the most recent processed depth frame.
+            max_depth_age_ms (float): Max age of the depth frame paired with a color frame when using FramePairing.LATEST_DEPTH. Color frames without a fresh enough depth frame are dropped.
             serial_number (Optional[str]): Serial number of device to connect to. If None, camera_index will be used.
             camera_index (int): Index of detected camera to connect to. Will only be used if serial_number is None.
             state_change_callback (Optional[Callable[[State], None]]): Callback that gets called when the camera device state changes.
@@ -47,7 +58,11 @@ class RealSenseCamera(RgbdCamera):
         self.color_frame_size = color_frame_size
         self.depth_frame_size = depth_frame_size
         self.fps = fps
+        self.depth_fps = fps if depth_fps is None else depth_fps
         self._align_depth_to_color_frame = align_depth_to_color_frame
+        self._lazy_depth_processing = lazy_depth_processing
+        self._frame_pairing = frame_pairing
+        self._max_depth_age_ms = max_depth_age_ms
         self.serial_number = serial_number
         self._camera_index = camera_index
         self._state_change_callback = state_change_callback
@@ -58,6 +73,7 @@ class RealSenseCamera(RgbdCamera):
             self._logger.setLevel(logging.INFO)
 
         self._pipeline = None
+        self._depth_processor = None
         self._exposure_us = 0.0
         self._gain_db = 0.0
 
@@ -80,6 +96,14 @@ class RealSenseCamera(RgbdCamera):
             else:
                 return State.DISCONNECTED
 
+    @property
+    def device_id(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Serial number of the device, or None if it is not known yet.
+        """
+        return self.serial_number
+
     def start(
         self,
         exposure_us: float = -1.0,
@@ -192,6 +216,7 @@ class RealSenseCamera(RgbdCamera):
     def _acquisition_thread_fn(
         self, frame_callback: Optional[Callable[[RgbdFrame], None]] = None
     ):
+        latest_depth_frame = None
         with self._cv:
             while self._is_running:
                 try:
@@ -200,6 +225,7 @@ class RealSenseCamera(RgbdCamera):
                     self._logger.warn(
                         f"There was an issue with the camera. Signaling connection thread"
                     )
+                    latest_depth_frame = None
                     self._cv.notify()
                     self._cv.wait()
                     continue
@@ -212,40 +238,65 @@ class RealSenseCamera(RgbdCamera):
                     self._cv.wait()
                     continue
 
-                # Align depth frame to color frame if needed
-                if self._align_depth_to_color_frame:
-                    frames = self._align.process(frames)
-
+                # Align and post-process the depth frame only when the frameset contains a new
+                # one (alignment also needs the color frame). With LATEST_DEPTH pairing, the
+                # processed depth frame is cached and reused for subsequent color frames until it
+                # becomes too stale. With lazy depth processing, the frameset is handed off as-is
+                # and only processed if a consumer uses the depth data
                 color_frame = frames.get_color_frame()
-                depth_frame = frames.get_depth_frame()
-                if not depth_frame or not color_frame:
+                if frames.get_depth_frame() and (
+                    color_frame or not self._align_depth_to_color_frame
+                ):
+                    if self._lazy_depth_processing:
+                        # Keep the frameset alive beyond this iteration
+                        frames.keep()
+                    latest_depth_frame = self._depth_processor.defer(frames)
+                    if not self._lazy_depth_processing:
+                        latest_depth_frame.get()
+                elif self._frame_pairing != FramePairing.LATEST_DEPTH:
                     continue
 
-                # Apply post-processing filters
-                depth_frame = self.temporal_filter.process(depth_frame)
-                depth_frame = self.hole_filling_filter.process(depth_frame)
-
-                # The various post processing functions return a generic frame, so we need
-                # to cast back to depth_frame
-                depth_frame = depth_frame.as_depth_frame()
+                if not color_frame or latest_depth_frame is None:
+                    continue
+                timestamp_millis = get_exposure_start_millis(color_frame)
+                depth_age_millis = (
+                    timestamp_millis - latest_depth_frame.timestamp_millis
+                )
+                if (
+                    self._frame_pairing == FramePairing.LATEST_DEPTH
+                    and depth_age_millis > self._max_depth_age_ms
+                ):
+                    continue
 
                 if frame_callback is not None:
                     frame_callback(
                         RealSenseFrame(
                             color_frame,
-                            depth_frame,
-                            color_frame.get_timestamp(),
+                            latest_depth_frame,
+                            timestamp_millis,
                             self._align_depth_to_color_frame,
                             self._depth_scale,
                             self._depth_intrinsics,
                             self._color_intrinsics,
                             self._depth_to_color_extrinsics,
                             self._color_to_depth_extrinsics,
+                            depth_age_millis=depth_age_millis,
                         )
                     )
 
         self._logger.info(f"Terminating acquisition thread")
 
+    @property
+    def depth_processing_timings_ms(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, Dict[str, float]]: For each depth processing stage (align, temporal_filter, hole_filling_filter), the mean and last durations in milliseconds.
+        """
+        if self._depth_processor is None:
+            return {}
+
+        return self._depth_processor.get_stage_timings_ms()
+
     def _start_stream(
         self, exposure_us: Optional[float] = None, gain_db: Optional[float] = None
     ):
@@ -262,7 +313,7 @@ class RealSenseCamera(RgbdCamera):
             self.depth_frame_size[0],
             self.depth_frame_size[1],
             rs.format.z16,
-            int(self.fps),
+            int(self.depth_fps),
         )
         config.enable_stream(
             rs.stream.color,
@@ -275,6 +326,7 @@ class RealSenseCamera(RgbdCamera):
         # Start pipeline
         self._pipeline = rs.pipeline()
         self._profile = self._pipeline.start(config)
+        enable_global_time(self._profile.get_device(), self._logger)
 
         # Get camera intrinsics and extrinsics
         color_prof = self._profile.get_stream(rs.stream.color)
@@ -289,12 +341,9 @@ class RealSenseCamera(RgbdCamera):
         self._depth_scale = depth_sensor.get_depth_scale()
 
         # Post-processing
-        self._align = (
-            rs.align(rs.stream.color) if self._align_depth_to_color_frame else None
+        self._depth_processor = RealSenseDepthProcessor(
+            align_depth_to_color_frame=self._align_depth_to_color_frame
         )
-        self.temporal_filter = rs.temporal_filter()
-        # self.spatial_filter = rs.spatial_filter()  # Doesn't seem to help much. Disabling for now.
-        self.hole_filling_filter = rs.hole_filling_filter()
 
         # Set exposure and gain
         if exposure_us is not None:
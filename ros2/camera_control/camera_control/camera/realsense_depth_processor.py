@@ -0,0 +1,146 @@
+import threading
+import time
+from typing import Dict, Optional
+
+import pyrealsense2 as rs
+
+from .realsense_time import get_exposure_start_millis
+
+
+class RealSenseDepthProcessor:
+    """
+    Aligns and post-processes depth frames from a RealSense stream. The filters are stateful and not
+    thread-safe, so processing is serialized. Keeps running per-stage timing stats.
+    """
+
+    STAGES = ("align", "temporal_filter", "hole_filling_filter")
+
+    def __init__(self, align_depth_to_color_frame: bool = True):
+        """
+        Args:
+            align_depth_to_color_frame (bool): Whether depth frames should be aligned to the color frame.
+        """
+        self._align = rs.align(rs.stream.color) if align_depth_to_color_frame else None
+        self._temporal_filter = rs.temporal_filter()
+        # self._spatial_filter = rs.spatial_filter()  # Doesn't seem to help much. Disabling for now.
+        self._hole_filling_filter = rs.hole_filling_filter()
+        self._lock = threading.Lock()
+        self._num_processed = 0
+        self._total_stage_durations_ms = {stage: 0.0 for stage in self.STAGES}
+        self._last_stage_durations_ms = {stage: 0.0 for stage in self.STAGES}
+
+    def defer(self, frames: rs.composite_frame) -> "LazyDepthFrame":
+        """
+        Wrap a frameset so that its depth frame is processed on first access.
+
+        Args:
+            frames (rs.composite_frame): Frameset containing a depth frame (and a color frame if aligning).
+
+        Returns:
+            LazyDepthFrame: Handle to the processed depth frame.
+        """
+        return LazyDepthFrame(frames, self)
+
+    def process(self, frames: rs.composite_frame) -> rs.depth_frame:
+        """
+        Align (if enabled) and filter the depth frame of a frameset.
+
+        Args:
+            frames (rs.composite_frame): Frameset containing a depth frame (and a color frame if aligning).
+
+        Returns:
+            rs.depth_frame: The processed depth frame.
+        """
+        with self._lock:
+            stage_durations_ms = {}
+
+            # Align depth frame to color frame if needed
+            start = time.perf_counter()
+            if self._align is not None:
+                frames = self._align.process(frames)
+            depth_frame = frames.get_depth_frame()
+            stage_durations_ms["align"] = (time.perf_counter() - start) * 1000
+
+            # Apply post-processing filters
+            start = time.perf_counter()
+            depth_frame = self._temporal_filter.process(depth_frame)
+            stage_durations_ms["temporal_filter"] = (time.perf_counter() - start) * 1000
+            start = time.perf_counter()
+            depth_frame = self._hole_filling_filter.process(depth_frame)
+            stage_durations_ms["hole_filling_filter"] = (
+                time.perf_counter() - start
+            ) * 1000
+
+            self._num_processed += 1
+            for stage, duration_ms in stage_durations_ms.items():
+                self._total_stage_durations_ms[stage] += duration_ms
+                self._last_stage_durations_ms[stage] = duration_ms
+
+        # The various post processing functions return a generic frame, so we need
+        # to cast back to depth_frame
+        return depth_frame.as_depth_frame()
+
+    @property
+    def num_processed(self) -> int:
+        """
+        Returns:
+            int: Number of depth frames processed.
+        """
+        return self._num_processed
+
+    def get_stage_timings_ms(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, Dict[str, float]]: For each processing stage, the mean and last durations in milliseconds.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "mean": (
+                        self._total_stage_durations_ms[stage] / self._num_processed
+                        if self._num_processed > 0
+                        else 0.0
+                    ),
+                    "last": self._last_stage_durations_ms[stage],
+                }
+                for stage in self.STAGES
+            }
+
+
+class LazyDepthFrame:
+    """
+    Handle to a depth frame that is aligned and filtered at most once, on first access. A single
+    handle may be shared by multiple RealSenseFrames.
+    """
+
+    def __init__(self, frames: rs.composite_frame, processor: RealSenseDepthProcessor):
+        """
+        Args:
+            frames (rs.composite_frame): Frameset containing the unprocessed depth frame.
+            processor (RealSenseDepthProcessor): Processor used to align and filter the depth frame.
+        """
+        self._frames: Optional[rs.composite_frame] = frames
+        self._processor = processor
+        self._depth_frame: Optional[rs.depth_frame] = None
+        self._lock = threading.Lock()
+        self.timestamp_millis = get_exposure_start_millis(frames.get_depth_frame())
+
+    @property
+    def is_processed(self) -> bool:
+        """
+        Returns:
+            bool: Whether the depth frame has been processed.
+        """
+        return self._depth_frame is not None
+
+    def get(self) -> rs.depth_frame:
+        """
+        Returns:
+            rs.depth_frame: The processed depth frame. Processes it if needed.
+        """
+        with self._lock:
+            if self._depth_frame is None:
+                self._depth_frame = self._processor.process(self._frames)
+                # Release the unprocessed frameset back to the pipeline
+                self._frames = None
+            return self._depth_frame
@@ -1,8 +1,17 @@
-from typing import Optional, Tuple
+from functools import cached_property
+from typing import Optional, Tuple, Union
 
 import numpy as np
 import pyrealsense2 as rs
 
+from .realsense_depth_processor import LazyDepthFrame
+from .realsense_projection import (
+    DEPROJECTION_DISTORTION_MODELS,
+    Extrinsics,
+    Intrinsics,
+    deproject_pixels_to_points,
+    project_color_pixels_to_depth_pixels,
+)
 from .rgbd_frame import RgbdFrame
 
 # General min and max possible depths pulled from RealSense examples
@@ -12,14 +21,13 @@ DEPTH_MAX_METERS = 10
 
 class RealSenseFrame(RgbdFrame):
     color_frame: np.ndarray
-    depth_frame: np.ndarray
     timestamp_millis: float
     color_depth_aligned: bool
 
     def __init__(
         self,
         color_frame: rs.frame,
-        depth_frame: rs.frame,
+        depth_frame: Union[rs.frame, LazyDepthFrame],
         timestamp_millis: float,
         color_depth_aligned: bool = False,
         depth_scale: Optional[float] = None,
@@ -27,23 +35,28 @@ class RealSenseFrame(RgbdFrame):
         color_intrinsics: Optional[rs.intrinsics] = None,
         depth_to_color_extrinsics: Optional[rs.extrinsics] = None,
         color_to_depth_extrinsics: Optional[rs.extrinsics] = None,
+        depth_age_millis: float = 0.0,
     ):
         """
         Args:
             color_frame (rs.frame): The color frame.
-            depth_frame (rs.frame): The depth frame.
-            timestamp_millis (float): The timestamp of the frame, in milliseconds since the device was started.
+            depth_frame (Union[rs.frame, LazyDepthFrame]): The depth frame, or a handle to a depth frame that is processed when its data is first used.
+            timestamp_millis (float): Wall clock time at which the exposure of the color frame started, in milliseconds.
             color_depth_aligned (bool): Whether the color and depth frames are aligned.
             depth_scale (Optional[float]): Must be defined if color_depth_aligned is True.
             depth_intrinsics (Optional[rs.intrinsics]): Must be defined if color_depth_aligned is True.
             color_intrinsics (Optional[rs.intrinsics]): Must be defined if color_depth_aligned is True.
             depth_to_color_extrinsics (Optional[rs.extrinsics]): Must be defined if color_depth_aligned is True.
             color_to_depth_extrinsics (Optional[rs.extrinsics]): Must be defined if color_depth_aligned is True.
+            depth_age_millis (float): Age of the depth frame relative to the color frame, in milliseconds.
         """
         self.color_frame = np.asanyarray(color_frame.get_data())
-        self.depth_frame = np.asanyarray(depth_frame.get_data())
-        self._rs_depth_frame = depth_frame
+        if isinstance(depth_frame, LazyDepthFrame):
+            self._lazy_depth_frame = depth_frame
+        else:
+            self._rs_depth_frame = depth_frame
         self.timestamp_millis = timestamp_millis
+        self.depth_age_millis = depth_age_millis
         self.color_depth_aligned = color_depth_aligned
         self._depth_scale = depth_scale
         self._depth_intrinsics = depth_intrinsics
@@ -51,12 +64,136 @@ class RealSenseFrame(RgbdFrame):
         self._depth_to_color_extrinsics = depth_to_color_extrinsics
         self._color_to_depth_extrinsics = color_to_depth_extrinsics
 
+    @cached_property
+    def _rs_depth_frame(self) -> rs.depth_frame:
+        return self._lazy_depth_frame.get()
+
+    @cached_property
+    def depth_frame(self) -> np.ndarray:
+        """
+        Returns:
+            np.ndarray: The depth frame data. Processes the depth frame if needed.
+        """
+        return np.asanyarray(self._rs_depth_frame.get_data())
+
     def get_position(
         self, color_pixel: Tuple[int, int]
     ) -> Optional[Tuple[float, float, float]]:
         """
         Given an (x, y) coordinate in the color frame, return the (x, y, z) position with respect to the camera.
 
+        Args:
+            color_pixel (Sequence[int]): (x, y) coordinate in the color frame.
+
+        Returns:
+            Optional[Tuple[float, float, float]]: (x, y, z) position with respect to the camera, or None if the position could not be determined.
+        """
+        if self._projection_params is None:
+            return self._get_position_rs(color_pixel)
+
+        position = self.get_positions(np.array([color_pixel]))[0]
+        if np.isnan(position[2]):
+            return None
+
+        return (float(position[0]), float(position[1]), float(position[2]))
+
+    def get_positions(self, color_pixels: np.ndarray) -> np.ndarray:
+        """
+        Given (x, y) coordinates in the color frame, return the (x, y, z) positions with respect to the camera.
+        Uses vectorized numpy equivalents of the RealSense projection helpers, so that lookups stay cheap even
+        when the depth frame is not aligned to the color frame.
+
+        Args:
+            color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
+
+        Returns:
+            np.ndarray: (N, 3) array of (x, y, z) positions with respect to the camera. Rows for which the position could not be determined are set to NaN.
+        """
+        if self._projection_params is None:
+            return super().get_positions(color_pixels)
+
+        (
+            depth_intrinsics,
+            color_intrinsics,
+            depth_to_color_extrinsics,
+            color_to_depth_extrinsics,
+        ) = self._projection_params
+        color_pixels = np.asarray(color_pixels, dtype=np.float64).reshape(-1, 2)
+        if self.color_depth_aligned:
+            depth_pixels = color_pixels
+        else:
+            depth_pixels = project_color_pixels_to_depth_pixels(
+                self.depth_frame,
+                self._depth_scale,
+                DEPTH_MIN_METERS,
+                DEPTH_MAX_METERS,
+                depth_intrinsics,
+                color_intrinsics,
+                depth_to_color_extrinsics,
+                color_to_depth_extrinsics,
+                color_pixels,
+            )
+
+        # Look up depths at valid, in-bounds depth pixels
+        depth_frame_height, depth_frame_width = self.depth_frame.shape[:2]
+        depth_pixels = np.round(depth_pixels)
+        valid = (
+            ~np.isnan(depth_pixels[:, 0])
+            & (depth_pixels[:, 0] >= 0)
+            & (depth_pixels[:, 0] < depth_frame_width)
+            & (depth_pixels[:, 1] >= 0)
+            & (depth_pixels[:, 1] < depth_frame_height)
+        )
+        depth_idxs = depth_pixels[valid].astype(np.int64)
+        depths = np.zeros(color_pixels.shape[0])
+        depths[valid] = (
+            self.depth_frame[depth_idxs[:, 1], depth_idxs[:, 0]] * self._depth_scale
+        )
+
+        positions = deproject_pixels_to_points(color_pixels, depths, color_intrinsics)
+        positions[depths <= 0.0] = np.nan
+        return positions
+
+    @cached_property
+    def _projection_params(
+        self,
+    ) -> Optional[Tuple[Intrinsics, Intrinsics, Extrinsics, Extrinsics]]:
+        """
+        Returns:
+            Optional[Tuple[Intrinsics, Intrinsics, Extrinsics, Extrinsics]]: Numpy equivalents of (depth intrinsics, color intrinsics, depth to color extrinsics, color to depth extrinsics), or None if the vectorized projection helpers cannot be used for this frame.
+        """
+        if (
+            self._depth_scale is None
+            or self._depth_intrinsics is None
+            or self._color_intrinsics is None
+            or self._depth_to_color_extrinsics is None
+            or self._color_to_depth_extrinsics is None
+        ):
+            return None
+
+        projection_params = (
+            Intrinsics.from_rs(self._depth_intrinsics),
+            Intrinsics.from_rs(self._color_intrinsics),
+            Extrinsics.from_rs(self._depth_to_color_extrinsics),
+            Extrinsics.from_rs(self._color_to_depth_extrinsics),
+        )
+        # Both the depth and color intrinsics are used to deproject pixels, which supports fewer
+        # models than projecting points
+        if any(
+            intrinsics.model not in DEPROJECTION_DISTORTION_MODELS
+            for intrinsics in projection_params[:2]
+        ):
+            return None
+
+        return projection_params
+
+    def _get_position_rs(
+        self, color_pixel: Tuple[int, int]
+    ) -> Optional[Tuple[float, float, float]]:
+        """
+        Given an (x, y) coordinate in the color frame, return the (x, y, z) position with respect to the camera
+        using the RealSense projection helpers.
+
         Args:
             color_pixel (Sequence[int]): (x, y) coordinate in the color frame.
 
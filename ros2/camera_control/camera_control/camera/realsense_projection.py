@@ -0,0 +1,282 @@
+"""
+Vectorized numpy equivalents of the projection helpers in librealsense's rsutil.h. These operate on
+N points/pixels at once instead of one at a time through the Python bindings.
+"""
+
+from dataclasses import dataclass
+from enum import Enum, auto
+
+import numpy as np
+
+# Number of iterations used to invert the Brown-Conrady distortion when deprojecting, determined
+# empirically by librealsense
+UNDISTORT_ITERATIONS = 10
+
+
+class DistortionModel(Enum):
+    # Mirrors rs2_distortion. See SUPPORTED_DISTORTION_MODELS and DEPROJECTION_DISTORTION_MODELS
+    # for the models supported by the vectorized helpers
+    NONE = auto()
+    MODIFIED_BROWN_CONRADY = auto()
+    INVERSE_BROWN_CONRADY = auto()
+    BROWN_CONRADY = auto()
+    FTHETA = auto()
+    KANNALA_BRANDT4 = auto()
+
+
+SUPPORTED_DISTORTION_MODELS = (
+    DistortionModel.NONE,
+    DistortionModel.MODIFIED_BROWN_CONRADY,
+    DistortionModel.INVERSE_BROWN_CONRADY,
+    DistortionModel.BROWN_CONRADY,
+)
+# Models that deproject_pixels_to_points supports. Modified Brown-Conrady describes a
+# forward-distorted image, which cannot be deprojected
+DEPROJECTION_DISTORTION_MODELS = (
+    DistortionModel.NONE,
+    DistortionModel.INVERSE_BROWN_CONRADY,
+    DistortionModel.BROWN_CONRADY,
+)
+
+
+@dataclass
+class Intrinsics:
+    width: int
+    height: int
+    ppx: float
+    ppy: float
+    fx: float
+    fy: float
+    model: DistortionModel
+    coeffs: np.ndarray  # (5,) distortion coefficients: k1, k2, p1, p2, k3
+
+    @classmethod
+    def from_rs(cls, intrinsics) -> "Intrinsics":
+        """
+        Args:
+            intrinsics (rs.intrinsics): RealSense intrinsics.
+
+        Returns:
+            Intrinsics: Equivalent numpy intrinsics.
+        """
+        return cls(
+            intrinsics.width,
+            intrinsics.height,
+            intrinsics.ppx,
+            intrinsics.ppy,
+            intrinsics.fx,
+            intrinsics.fy,
+            DistortionModel[intrinsics.model.name.upper()],
+            np.array(intrinsics.coeffs, dtype=np.float64),
+        )
+
+
+@dataclass
+class Extrinsics:
+    rotation: np.ndarray  # (3, 3) rotation matrix
+    translation: np.ndarray  # (3,) translation vector
+
+    @classmethod
+    def from_rs(cls, extrinsics) -> "Extrinsics":
+        """
+        Args:
+            extrinsics (rs.extrinsics): RealSense extrinsics.
+
+        Returns:
+            Extrinsics: Equivalent numpy extrinsics.
+        """
+        # rs.extrinsics.rotation is a column-major 3x3 matrix
+        return cls(
+            np.array(extrinsics.rotation, dtype=np.float64).reshape(3, 3).T,
+            np.array(extrinsics.translation, dtype=np.float64),
+        )
+
+    def transform(self, points: np.ndarray) -> np.ndarray:
+        """
+        Transform points from one coordinate space to another.
+
+        Args:
+            points (np.ndarray): (N, 3) array of points.
+
+        Returns:
+            np.ndarray: (N, 3) array of transformed points.
+        """
+        return points @ self.rotation.T + self.translation
+
+
+def project_points_to_pixels(points: np.ndarray, intrinsics: Intrinsics) -> np.ndarray:
+    """
+    Vectorized rs2_project_point_to_pixel.
+
+    Args:
+        points (np.ndarray): (N, 3) array of points in camera-space.
+        intrinsics (Intrinsics): Intrinsics of the camera.
+
+    Returns:
+        np.ndarray: (N, 2) array of (x, y) pixel coordinates.
+    """
+    _check_supported(intrinsics)
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+    x = points[:, 0] / points[:, 2]
+    y = points[:, 1] / points[:, 2]
+
+    if intrinsics.model != DistortionModel.NONE:
+        k1, k2, p1, p2, k3 = intrinsics.coeffs
+        r2 = x * x + y * y
+        f = 1 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+        if intrinsics.model == DistortionModel.BROWN_CONRADY:
+            # Tangential terms are computed from the undistorted coordinates
+            dx = x * f + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+            dy = y * f + 2 * p2 * x * y + p1 * (r2 + 2 * y * y)
+        else:
+            # Modified and inverse Brown-Conrady compute tangential terms from the radially
+            # distorted coordinates
+            x = x * f
+            y = y * f
+            dx = x + 2 * p1 * x * y + p2 * (r2 + 2 * x * x)
+            dy = y + 2 * p2 * x * y + p1 * (r2 + 2 * y * y)
+        x, y = dx, dy
+
+    return np.stack(
+        (x * intrinsics.fx + intrinsics.ppx, y * intrinsics.fy + intrinsics.ppy),
+        axis=-1,
+    )
+
+
+def deproject_pixels_to_points(
+    pixels: np.ndarray, depths: np.ndarray, intrinsics: Intrinsics
+) -> np.ndarray:
+    """
+    Vectorized rs2_deproject_pixel_to_point.
+
+    Args:
+        pixels (np.ndarray): (N, 2) array of (x, y) pixel coordinates.
+        depths (np.ndarray): (N,) array of depths.
+        intrinsics (Intrinsics): Intrinsics of the camera.
+
+    Returns:
+        np.ndarray: (N, 3) array of points in camera-space.
+    """
+    if intrinsics.model not in DEPROJECTION_DISTORTION_MODELS:
+        raise ValueError(f"Cannot deproject with distortion model: {intrinsics.model}")
+
+    pixels = np.asarray(pixels, dtype=np.float64).reshape(-1, 2)
+    depths = np.asarray(depths, dtype=np.float64).reshape(-1)
+    x = (pixels[:, 0] - intrinsics.ppx) / intrinsics.fx
+    y = (pixels[:, 1] - intrinsics.ppy) / intrinsics.fy
+
+    if intrinsics.model != DistortionModel.NONE:
+        k1, k2, p1, p2, k3 = intrinsics.coeffs
+        xo = x
+        yo = y
+        for _ in range(UNDISTORT_ITERATIONS):
+            r2 = x * x + y * y
+            icdist = 1 / (1 + ((k3 * r2 + k2) * r2 + k1) * r2)
+            if intrinsics.model == DistortionModel.INVERSE_BROWN_CONRADY:
+                xq = x / icdist
+                yq = y / icdist
+            else:
+                xq = x
+                yq = y
+            delta_x = 2 * p1 * xq * yq + p2 * (r2 + 2 * xq * xq)
+            delta_y = 2 * p2 * xq * yq + p1 * (r2 + 2 * yq * yq)
+            x = (xo - delta_x) * icdist
+            y = (yo - delta_y) * icdist
+
+    return np.stack((depths * x, depths * y, depths), axis=-1)
+
+
+def project_color_pixels_to_depth_pixels(
+    depth_data: np.ndarray,
+    depth_scale: float,
+    depth_min: float,
+    depth_max: float,
+    depth_intrinsics: Intrinsics,
+    color_intrinsics: Intrinsics,
+    depth_to_color_extrinsics: Extrinsics,
+    color_to_depth_extrinsics: Extrinsics,
+    color_pixels: np.ndarray,
+) -> np.ndarray:
+    """
+    Vectorized rs2_project_color_pixel_to_depth_pixel. For each color pixel, every depth pixel along
+    the line between the projections of the min-depth and max-depth points is tested, and the depth
+    pixel whose point projects closest to the color pixel is chosen.
+
+    Args:
+        depth_data (np.ndarray): (h, w) array of raw depth values.
+        depth_scale (float): Scale to convert raw depth values to meters.
+        depth_min (float): Min possible depth, in meters.
+        depth_max (float): Max possible depth, in meters.
+        depth_intrinsics (Intrinsics): Intrinsics of the depth camera.
+        color_intrinsics (Intrinsics): Intrinsics of the color camera.
+        depth_to_color_extrinsics (Extrinsics): Extrinsics from depth camera to color camera.
+        color_to_depth_extrinsics (Extrinsics): Extrinsics from color camera to depth camera.
+        color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
+
+    Returns:
+        np.ndarray: (N, 2) array of (x, y) coordinates in the depth frame. Rows for which no depth
+        pixel with valid depth was found are set to NaN.
+    """
+    color_pixels = np.asarray(color_pixels, dtype=np.float64).reshape(-1, 2)
+    num_pixels = color_pixels.shape[0]
+    if num_pixels == 0:
+        return np.empty((0, 2))
+
+    # Line start and end pixels in the depth frame. The first N rows are the start pixels and the
+    # last N rows are the end pixels.
+    endpoint_depths = np.concatenate(
+        (np.full(num_pixels, depth_min), np.full(num_pixels, depth_max))
+    )
+    endpoints = deproject_pixels_to_points(
+        np.vstack((color_pixels, color_pixels)), endpoint_depths, color_intrinsics
+    )
+    endpoints = project_points_to_pixels(
+        color_to_depth_extrinsics.transform(endpoints), depth_intrinsics
+    )
+    endpoints = np.clip(
+        endpoints, 0, [depth_intrinsics.width - 1, depth_intrinsics.height - 1]
+    )
+    start_pixels = endpoints[:num_pixels]
+    end_pixels = endpoints[num_pixels:]
+
+    # Step one pixel at a time along the major axis of each line. Lines shorter than the longest
+    # line are padded by repeating their last pixel, which does not affect the closest match.
+    line_deltas = end_pixels - start_pixels
+    line_lengths = np.floor(np.max(np.abs(line_deltas), axis=1))
+    steps = np.arange(int(np.max(line_lengths)) + 1)
+    line_steps = np.minimum(steps[np.newaxis, :], line_lengths[:, np.newaxis])
+    step_sizes = (
+        line_deltas / np.maximum(np.max(np.abs(line_deltas), axis=1), 1)[:, np.newaxis]
+    )
+    candidate_pixels = (
+        start_pixels[:, np.newaxis, :]
+        + line_steps[:, :, np.newaxis] * step_sizes[:, np.newaxis, :]
+    )
+
+    # Deproject every candidate, transform and project them onto the color frame in one pass
+    candidate_idxs = candidate_pixels.astype(np.int64)
+    candidate_depths = (
+        depth_data[candidate_idxs[:, :, 1], candidate_idxs[:, :, 0]] * depth_scale
+    )
+    candidate_points = deproject_pixels_to_points(
+        candidate_pixels.reshape(-1, 2), candidate_depths.reshape(-1), depth_intrinsics
+    )
+    # Candidates without depth project to NaN/inf and are excluded below
+    with np.errstate(divide="ignore", invalid="ignore"):
+        projected_pixels = project_points_to_pixels(
+            depth_to_color_extrinsics.transform(candidate_points), color_intrinsics
+        ).reshape(num_pixels, -1, 2)
+    distances = np.sum(
+        np.square(projected_pixels - color_pixels[:, np.newaxis, :]), axis=-1
+    )
+    distances[(candidate_depths == 0) | np.isnan(distances)] = np.inf
+
+    closest_idxs = np.argmin(distances, axis=1)
+    depth_pixels = candidate_pixels[np.arange(num_pixels), closest_idxs]
+    depth_pixels[np.isinf(distances[np.arange(num_pixels), closest_idxs])] = np.nan
+    return depth_pixels
+
+
+def _check_supported(intrinsics: Intrinsics):
+    if intrinsics.model not in SUPPORTED_DISTORTION_MODELS:
+        raise ValueError(f"Unsupported distortion model: {intrinsics.model}")
@@ -0,0 +1,56 @@
+import logging
+import time
+
+import pyrealsense2 as rs
+
+
+def enable_global_time(device: rs.device, logger: logging.Logger):
+    """
+    Enable global time on all sensors of a device, so that frame timestamps are device timestamps
+    converted to the host's wall clock.
+
+    Args:
+        device (rs.device): RealSense device.
+        logger (logging.Logger): Logger used to warn about sensors without global time.
+    """
+    for sensor in device.query_sensors():
+        if sensor.supports(rs.option.global_time_enabled):
+            sensor.set_option(rs.option.global_time_enabled, 1)
+        else:
+            logger.warn(
+                f"Sensor {sensor.get_info(rs.camera_info.name)} does not support global time. Its frame timestamps are arrival times"
+            )
+
+
+def get_exposure_start_millis(frame: rs.frame) -> float:
+    """
+    Estimate the wall clock time at which the exposure of a frame started.
+
+    With global time, the frame timestamp is taken by the device no earlier than the start of the
+    exposure (at the start of readout for the D400 series), so subtracting the actual exposure time
+    gives a time at or before the start of the exposure. Without it, the timestamp is the time the
+    frame arrived at the host, which also includes the transfer.
+
+    Args:
+        frame (rs.frame): RealSense frame.
+
+    Returns:
+        float: Wall clock time in milliseconds.
+    """
+    if frame.get_frame_timestamp_domain() == rs.timestamp_domain.hardware_clock:
+        # The device clock is unrelated to the wall clock
+        if frame.supports_frame_metadata(rs.frame_metadata_value.time_of_arrival):
+            timestamp_millis = float(
+                frame.get_frame_metadata(rs.frame_metadata_value.time_of_arrival)
+            )
+        else:
+            timestamp_millis = time.time() * 1000
+    else:
+        timestamp_millis = frame.get_timestamp()
+
+    if frame.supports_frame_metadata(rs.frame_metadata_value.actual_exposure):
+        # Actual exposure is in microseconds
+        timestamp_millis -= (
+            frame.get_frame_metadata(rs.frame_metadata_value.actual_exposure) / 1000
+        )
+    return timestamp_millis
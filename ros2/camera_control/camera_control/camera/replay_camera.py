@@ -0,0 +1,276 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from .frame_recording import FrameRecordingReader, lucid_calibration_from_dict
+from .lucid_frame import LucidCalibration, LucidFrame
+from .rgbd_camera import RgbdCamera, State
+from .rgbd_frame import RgbdFrame
+
+
+class ReplayRgbdCamera(RgbdCamera):
+    """
+    Camera that plays back a recording made with FrameRecordingWriter instead of connecting to a
+    device, for benchmarking the frame processing pipeline without hardware. Frames are memory-mapped
+    views into the recording, so playback does not decode or copy frame data.
+    """
+
+    recording_dir: str
+    color_frame_size: Tuple[int, int]
+    depth_frame_size: Tuple[int, int]
+
+    def __init__(
+        self,
+        recording_dir: str,
+        fps: float = 0.0,
+        loop: bool = True,
+        register_depth_to_color: bool = False,
+        state_change_callback: Optional[Callable[[State], None]] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            recording_dir (str): Directory containing the recording.
+            fps (float): Playback rate in frames per second. A non-positive value plays back each frame as soon as the previous one is consumed, as signaled with frame_consumed.
+            loop (bool): Whether to restart from the first frame after the last frame is played back.
+            register_depth_to_color (bool): Whether frames should look up positions using a depth frame registered to the color frame.
+            state_change_callback (Optional[Callable[[State], None]]): Callback that gets called when the camera device state changes.
+            logger (Optional[logging.Logger]): Logger
+        """
+        self.recording_dir = recording_dir
+        self.color_frame_size = (0, 0)
+        self.depth_frame_size = (0, 0)
+        self._fps = fps
+        self._loop = loop
+        self._register_depth_to_color = register_depth_to_color
+        self._state_change_callback = state_change_callback
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = logging.getLogger(__name__)
+            self._logger.setLevel(logging.INFO)
+
+        self._reader: Optional[FrameRecordingReader] = None
+        self._calibration: Optional[LucidCalibration] = None
+        self._exposure_us = 0.0
+        self._gain_db = 0.0
+
+        self._cv = threading.Condition()
+        self._is_running = False
+        self._playback_thread = None
+        self._frame_pending = False
+
+    @property
+    def state(self) -> State:
+        """
+        Returns:
+            State: Current state of the camera device.
+        """
+        if self._reader is not None:
+            return State.STREAMING
+        else:
+            if self._is_running:
+                return State.CONNECTING
+            else:
+                return State.DISCONNECTED
+
+    def start(
+        self,
+        exposure_us: float = -1.0,
+        gain_db: float = -1.0,
+        frame_callback: Optional[Callable[[RgbdFrame], None]] = None,
+    ):
+        """
+        Opens the recording and starts playback.
+
+        Args:
+            exposure_us (float): Exposure time in microseconds. Only stored, as it has no effect on playback.
+            gain_db (float): Gain level in dB. Only stored, as it has no effect on playback.
+            frame_callback (Optional[Callable[[RgbdFrame], None]]): Callback that gets called when a new frame is available.
+        """
+        if self._is_running:
+            return
+
+        self._is_running = True
+        self._call_state_change_callback()
+
+        self._exposure_us = exposure_us
+        self._gain_db = gain_db
+        self._playback_thread = threading.Thread(
+            target=self._playback_thread_fn, args=(frame_callback,), daemon=True
+        )
+        self._playback_thread.start()
+
+    def stop(self):
+        """
+        Stops playback.
+        """
+        if not self._is_running:
+            return
+
+        self._is_running = False
+        with self._cv:
+            self._cv.notify_all()
+
+        if self._playback_thread is not None:
+            self._playback_thread.join()
+
+        self._reader = None
+        self._call_state_change_callback()
+
+    def frame_consumed(self):
+        """
+        Signal that the last frame passed to the frame callback has been consumed. When fps is
+        non-positive, the next frame is only played back after this is called, so that frames are
+        not emitted faster than the consumer can handle them.
+        """
+        with self._cv:
+            self._frame_pending = False
+            self._cv.notify_all()
+
+    def _playback_thread_fn(
+        self, frame_callback: Optional[Callable[[RgbdFrame], None]] = None
+    ):
+        try:
+            self._open_recording()
+        except Exception as e:
+            self._logger.error(f"Failed to open recording {self.recording_dir}: {e}")
+            self._is_running = False
+            self._call_state_change_callback()
+            return
+
+        num_frames = len(self._reader)
+        if num_frames == 0:
+            self._logger.warning(f"Recording {self.recording_dir} has no frames")
+
+        frame_interval_s = 1.0 / self._fps if self._fps > 0.0 else 0.0
+        next_frame_time = time.perf_counter()
+        frame_idx = 0
+        self._frame_pending = False
+        while self._is_running and frame_idx < num_frames:
+            if frame_interval_s <= 0.0:
+                # Wait for the previous frame to be consumed
+                with self._cv:
+                    self._cv.wait_for(
+                        lambda: not self._is_running or not self._frame_pending
+                    )
+                    self._frame_pending = frame_callback is not None
+                if not self._is_running:
+                    break
+            else:
+                with self._cv:
+                    self._cv.wait_for(
+                        lambda: not self._is_running
+                        or time.perf_counter() >= next_frame_time,
+                        timeout=max(next_frame_time - time.perf_counter(), 0.0),
+                    )
+                if not self._is_running:
+                    break
+                # Skip ahead rather than bursting if playback fell behind
+                next_frame_time = max(
+                    next_frame_time + frame_interval_s, time.perf_counter()
+                )
+
+            color_frame, depth_frame_abcy, _, depth_age_millis = self._reader.get_frame(
+                frame_idx
+            )
+            frame = LucidFrame(
+                color_frame,
+                depth_frame_abcy,
+                self._reader.metadata.xyz_scale,
+                self._reader.metadata.xyz_offset,
+                # Frames are stamped with the wall clock time at which they are played back, like
+                # frames from live cameras, rather than their recorded time
+                time.time() * 1000,
+                self._calibration,
+                depth_age_millis=depth_age_millis,
+                register_depth_to_color=self._register_depth_to_color,
+            )
+            if frame_callback is not None:
+                frame_callback(frame)
+
+            frame_idx += 1
+            if self._loop and frame_idx >= num_frames:
+                frame_idx = 0
+
+        if self._is_running:
+            self._logger.info(f"Finished playing back {self.recording_dir}")
+
+    def _open_recording(self):
+        reader = FrameRecordingReader(self.recording_dir)
+        if reader.metadata.camera_type != "lucid":
+            raise ValueError(
+                f"Unsupported recording camera type: {reader.metadata.camera_type}"
+            )
+
+        self._calibration = lucid_calibration_from_dict(reader.calibration)
+        color_frame_height, color_frame_width = reader.metadata.color_frame_shape[:2]
+        depth_frame_height, depth_frame_width = reader.metadata.depth_frame_shape[:2]
+        self.color_frame_size = (color_frame_width, color_frame_height)
+        self.depth_frame_size = (depth_frame_width, depth_frame_height)
+        self._reader = reader
+        self._logger.info(
+            f"Playing back {len(reader)} frames from {self.recording_dir}"
+        )
+        self._call_state_change_callback()
+
+    def _call_state_change_callback(self):
+        if self._state_change_callback is not None:
+            self._state_change_callback(self.state)
+
+    @property
+    def exposure_us(self) -> float:
+        """
+        Returns:
+            float: Exposure time in microseconds.
+        """
+        if self.state != State.STREAMING:
+            return 0.0
+
+        return self._exposure_us
+
+    @exposure_us.setter
+    def exposure_us(self, exposure_us: float):
+        """
+        Set the exposure time. Only stored, as it has no effect on playback.
+
+        Args:
+            exposure_us (float): Exposure time in microseconds.
+        """
+        self._exposure_us = exposure_us
+
+    def get_exposure_us_range(self) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple[float, float]: (min, max) exposure times in microseconds.
+        """
+        return (0.0, 0.0)
+
+    @property
+    def gain_db(self) -> float:
+        """
+        Returns:
+            float: Gain level in dB.
+        """
+        if self.state != State.STREAMING:
+            return 0.0
+
+        return self._gain_db
+
+    @gain_db.setter
+    def gain_db(self, gain_db: float):
+        """
+        Set the gain level. Only stored, as it has no effect on playback.
+
+        Args:
+            gain_db (float): Gain level in dB.
+        """
+        self._gain_db = gain_db
+
+    def get_gain_db_range(self) -> Tuple[float, float]:
+        """
+        Returns:
+            Tuple[float, float]: (min, max) gain levels in dB.
+        """
+        return (0.0, 0.0)
@@ -11,6 +11,20 @@ class State(Enum):
     STREAMING = auto()
 
 
+class FramePairing(Enum):
+    """
+    Policy for pairing color and depth frames from separately clocked sensors.
+    """
+
+    # Only pair color and depth frames that were grabbed within a maximum time skew of each other
+    SYNCHRONIZED = auto()
+    # Pair the newest color frame with the newest depth frame as soon as both have a new frame
+    LATEST = auto()
+    # Emit every color frame at the color sensor's native rate, paired with the most recent depth frame
+    # as long as it is not too stale. A depth frame may be shared by multiple color frames
+    LATEST_DEPTH = auto()
+
+
 class RgbdCamera(ABC):
     @property
     @abstractmethod
@@ -21,6 +35,14 @@ class RgbdCamera(ABC):
         """
         pass
 
+    @property
+    def device_id(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Identifier of the camera device, such as its serial number, or None if it is not known yet.
+        """
+        return None
+
     @abstractmethod
     def start(
         self,
@@ -7,7 +7,11 @@ import numpy as np
 class RgbdFrame(ABC):
     color_frame: np.ndarray
     depth_frame: np.ndarray
+    # Wall clock time at which the exposure of the color frame started
     timestamp_millis: float
+    # Age of the depth frame relative to the color frame. Only non-zero when depth frames are reused
+    # across color frames (see FramePairing.LATEST_DEPTH)
+    depth_age_millis: float = 0.0
     color_depth_aligned: bool
 
     @abstractmethod
@@ -24,3 +28,24 @@ class RgbdFrame(ABC):
             Optional[Tuple[float, float, float]]: (x, y, z) position with respect to the camera, or None if the position could not be determined.
         """
         pass
+
+    def get_positions(self, color_pixels: np.ndarray) -> np.ndarray:
+        """
+        Given x-y coordinates in the color frame, return the x-y-z positions with respect to the camera.
+        Subclasses should override this with a batched implementation when one is available.
+
+        Args:
+            color_pixels (np.ndarray): (N, 2) array of (x, y) coordinates in the color frame.
+
+        Returns:
+            np.ndarray: (N, 3) array of (x, y, z) positions with respect to the camera. Rows for which the position could not be determined are set to NaN.
+        """
+        color_pixels = np.asarray(color_pixels).reshape(-1, 2)
+        positions = np.full((color_pixels.shape[0], 3), np.nan)
+        for idx, color_pixel in enumerate(color_pixels):
+            position = self.get_position(
+                (int(round(color_pixel[0])), int(round(color_pixel[1])))
+            )
+            if position is not None:
+                positions[idx] = position
+        return positions
@@ -1,16 +1,21 @@
 import asyncio
+import dataclasses
 import functools
+import math
 import os
 import time
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import cv2
 import numpy as np
 from ament_index_python.packages import get_package_share_directory
 from cv_bridge import CvBridge
-from ml_utils.mask_center import contour_center
+from diagnostic_msgs.msg import DiagnosticArray, DiagnosticStatus, KeyValue
+from ml_utils.mask_bitmaps import mask_centers, overlay_masks, scale_mask_points
+from ml_utils.mask_center import CENTER_METHODS, contour_centers
 from rcl_interfaces.msg import Log
 from rclpy.qos import QoSDurabilityPolicy, QoSProfile
 from runner_segmentation.yolo import Yolo
@@ -18,21 +23,37 @@ from sensor_msgs.msg import CompressedImage, Image
 from std_srvs.srv import Trigger
 
 from aioros2 import node, params, result, serve_nodes, service, start, topic
+from camera_control.camera.frame_recording import DropPolicy, FrameRecorder
 from camera_control.camera.lucid_camera import create_lucid_rgbd_camera
 from camera_control.camera.realsense_camera import RealSenseCamera
+from camera_control.camera.replay_camera import ReplayRgbdCamera
+from camera_control.camera.rgbd_camera import FramePairing
 from camera_control.camera.rgbd_camera import State as RgbdCameraState
 from camera_control.camera.rgbd_frame import RgbdFrame
+from camera_control.detection_cache import DetectionCache
+from camera_control.encoder_worker import (
+    EncoderWorker,
+    ImageFormat,
+    encode_image,
+    write_image,
+)
+from camera_control.frame_publisher import FramePublisher
+from camera_control.laser_spot_detector import LaserSpotDetection, LaserSpotDetector
+from camera_control.timing_stats import TimingStats
 from camera_control_interfaces.msg import (
     DetectionResult,
     DeviceState,
     ObjectInstance,
+    StageLatency,
     State,
 )
 from camera_control_interfaces.srv import (
     GetDetectionResult,
     GetFrame,
+    GetLaserDetection,
     GetPositions,
     GetState,
+    GetStats,
     SetExposure,
     SetGain,
     SetSaveDirectory,
@@ -44,12 +65,138 @@ from common_interfaces.srv import GetBool
 
 @dataclass
 class CameraControlParams:
-    camera_type: str = "lucid"  # "realsense" or "lucid"
+    camera_type: str = "lucid"  # "realsense", "lucid", or "replay"
     camera_index: int = 0
     exposure_us: float = -1.0
     gain_db: float = -1.0
     save_dir: str = "~/Pictures/runner-cutter-app"
+    # Format of saved images. "png", "jpeg", or "webp"
+    image_format: str = "png"
+    # Quality from 0 to 100 of saved images. For PNG, lower quality means faster compression
+    image_quality: int = 95
+    # Frame rate of recorded videos. Videos are recorded from debug frames
+    video_fps: float = 10.0
+    # Max number of images or video frames waiting to be encoded. When full, the oldest is dropped
+    encoder_queue_size: int = 4
+    # Number of threads used to encode saved images
+    image_encoder_num_threads: int = 1
+    # Interval at which to publish diagnostics. A non-positive value disables diagnostics
+    diagnostics_interval_secs: float = 1.0
+    # Max time to wait for a frame captured after a requested time before giving up
+    frame_wait_timeout_secs: float = 1.0
+    # Number of most recent durations per detection stage that latency percentiles are computed over
+    timing_window_size: int = 1000
     debug_frame_width: int = 640
+    # Max rate at which to publish debug frames. A non-positive value means no limit
+    debug_frame_max_fps: float = 10.0
+    # Max rate at which to publish full resolution color frames. A non-positive value means no limit
+    color_frame_max_fps: float = 1.0
+    # JPEG quality from 0 to 100 of frames published on compressed topics
+    compressed_frame_jpeg_quality: int = 80
+    # Lucid only: look up positions from a depth frame registered to the color frame
+    register_depth_to_color: bool = False
+    # How to pair color and depth frames. "synchronized", "latest", or "latest_depth"
+    frame_pairing: str = "synchronized"
+    # Max age of the depth frame paired with a color frame when frame_pairing is "latest_depth"
+    max_depth_age_ms: float = 100.0
+    # RealSense only: depth stream fps. A non-positive value uses the color stream fps
+    depth_fps: int = 0
+    # RealSense only: align the full depth frame to the color frame on every frame. When disabled,
+    # position lookups map color pixels to depth pixels directly
+    align_depth_to_color_frame: bool = True
+    # RealSense only: only align and filter a frame's depth when its depth data is used
+    lazy_depth_processing: bool = False
+    # Lucid only: number of preallocated frame buffers per device. Frames grabbed while all buffers
+    # are held by frames in use are dropped. A non-positive value sizes the pool from
+    # frame_recording_queue_size, encoder_queue_size and image_encoder_num_threads
+    num_frame_buffers: int = 0
+    # Lucid and replay only: max number of frames waiting to be written when recording frames
+    frame_recording_queue_size: int = 4
+    # Which frame to drop when the frame recording queue is full. "drop_newest" or "drop_oldest"
+    frame_recording_drop_policy: str = "drop_newest"
+    frame_recording_chunk_size: int = 100
+    # Replay only: directory of the recording to play back
+    replay_dir: str = ""
+    # Replay only: playback fps. A non-positive value plays back each frame as soon as the previous
+    # one has been handled by the frame callback
+    replay_fps: float = 0.0
+    # Backend used to run the ML models. "pytorch", "onnx", or "openvino". "onnx" and "openvino" run
+    # models exported with `yolo.py export` on CPU
+    inference_backend: str = "pytorch"
+    # Number of threads per model for the "onnx" and "openvino" backends. 0 lets the backend decide
+    inference_num_threads: int = 0
+    # Whether to run INT8 models quantized with `quantize.py` with the "onnx" and "openvino" backends
+    inference_int8: bool = False
+    # Laser detector. "yolo" runs the laser detection model. "classical" thresholds the full
+    # resolution frame, which is much faster and gives sub-pixel points, but requires frames
+    # captured with laser detection camera settings (minimal exposure and gain)
+    laser_detector: str = "yolo"
+    # Classical laser detector only: run the laser detection model when the result is ambiguous
+    laser_detector_fallback: bool = True
+    # Classical laser detector only: min channel value of a laser spot pixel
+    laser_spot_min_intensity: int = 128
+    # Classical laser detector only: min and max number of pixels in a laser spot
+    laser_spot_min_area: int = 2
+    laser_spot_max_area: int = 2500
+    # Classical laser detector only: spots below this conf make the result ambiguous
+    laser_spot_min_conf: float = 0.5
+    # Classical laser detector only: more spots than this make the result ambiguous. Must be at
+    # least runner_cutter_control's calibration_batch_size when calibrating in batches, otherwise
+    # every batch frame falls back to the laser detection model (or, without the fallback, is
+    # returned as is despite being flagged ambiguous)
+    laser_spot_max_spots: int = 1
+    # Classical laser detector only: max fraction of pixels above the spot threshold. Above this,
+    # the frame is considered not dark enough and the result is ambiguous. Relative to the full
+    # frame, also when detecting within a region of interest
+    laser_spot_max_bright_fraction: float = 0.01
+    # How to find runner centers on the runner mask's medial axis. "skeleton", "distance_transform",
+    # or "medial_axis". See ml_utils.mask_center_benchmark for speed and agreement
+    runner_center_method: str = "skeleton"
+    # Format of runner masks. "polygons" or "bitmaps". "bitmaps" uses the model's mask bitmaps for
+    # runner centers and debug frames directly, skipping polygon extraction and rasterization
+    runner_mask_format: str = "polygons"
+
+
+@dataclass
+class FrameStats:
+    # Frames received from the camera
+    num_frames_received: int = 0
+    # Frames received while the camera was not streaming
+    num_frames_skipped: int = 0
+    # Frames not run through detection because a detection task was already queued. Frames
+    # replaced as the current frame before a queued detection task started are also counted
+    num_frames_dropped: int = 0
+    # Frames run through detection
+    num_frames_detected: int = 0
+
+
+def _scale_points(
+    points: List[Optional[Tuple[int, int]]], scale: float
+) -> List[Optional[Tuple[int, int]]]:
+    return [
+        (
+            (round(point[0] * scale), round(point[1] * scale))
+            if point is not None
+            else None
+        )
+        for point in points
+    ]
+
+
+# Frames that can hold a frame buffer outside of the frame recorder and image encoder queues: the
+# latest grabbed frame waiting to be paired, the current frame, the frame being run through
+# detection, the frame being published, and frames held by detection service requests
+NUM_IN_FLIGHT_FRAMES = 6
+
+
+def _crop(
+    image: np.ndarray, crop_box: Optional[Tuple[int, int, int, int]] = None
+) -> np.ndarray:
+    # crop_box is (left, top, right, bottom). Returns a view of the image
+    if crop_box is None:
+        return image
+    left, top, right, bottom = crop_box
+    return image[top:bottom, left:right]
 
 
 def milliseconds_to_ros_time(milliseconds):
@@ -74,23 +221,73 @@ class CameraControlNode:
     # Increasing queue size for Image topics seems to help prevent web_video_server's subscription
     # from stalling
     color_frame_topic = topic("~/color_frame", Image, qos=5)
+    color_frame_compressed_topic = topic(
+        "~/color_frame/compressed", CompressedImage, qos=5
+    )
     debug_frame_topic = topic("~/debug_frame", Image, qos=5)
+    debug_frame_compressed_topic = topic(
+        "~/debug_frame/compressed", CompressedImage, qos=5
+    )
     laser_detections_topic = topic("~/laser_detections", DetectionResult, qos=5)
     runner_detections_topic = topic("~/runner_detections", DetectionResult, qos=5)
     # ROS publishes logs on /rosout, but as it contains logs from all nodes and also contains
     # every single log message, we create a node-specific topic here for logs that would
     # potentially be displayed on UI
     log_topic = topic("~/log", Log, qos=5)
+    diagnostics_topic = topic("~/diagnostics", DiagnosticArray, qos=5)
 
     @start
     async def start(self):
         self.laser_detection_enabled = False
         self.runner_detection_enabled = False
-        self.video_writer = None
+        self.video_path = None
+        self.frame_recorder = None
         self.interval_capture_task = None
         # For converting numpy array to image msg
         self.cv_bridge = CvBridge()
 
+        # Encoders
+
+        # Image saving and video writing are done on worker threads so that encoding does not
+        # block the event loop. Video frames must be written in order, so the video encoder uses
+        # a single thread. The video writer is only accessed from the video encoder thread.
+        self.image_encoder = EncoderWorker(
+            "image_encoder",
+            max_queue_size=self.camera_control_params.encoder_queue_size,
+            num_threads=self.camera_control_params.image_encoder_num_threads,
+            logger=self.get_logger(),
+        )
+        self.image_encoder.start()
+        self.video_encoder = EncoderWorker(
+            "video_encoder",
+            max_queue_size=self.camera_control_params.encoder_queue_size,
+            num_threads=1,
+            logger=self.get_logger(),
+        )
+        self.video_encoder.start()
+        self._video_writer = None
+        self._video_writer_path = None
+
+        # Frame publishers
+        create_compressed_image_msg = functools.partial(
+            self._get_color_frame_compressed_msg,
+            jpeg_quality=self.camera_control_params.compressed_frame_jpeg_quality,
+        )
+        self.color_frame_publisher = FramePublisher(
+            self.color_frame_topic,
+            self.color_frame_compressed_topic,
+            self._get_color_frame_msg,
+            create_compressed_image_msg,
+            max_fps=self.camera_control_params.color_frame_max_fps,
+        )
+        self.debug_frame_publisher = FramePublisher(
+            self.debug_frame_topic,
+            self.debug_frame_compressed_topic,
+            self._get_color_frame_msg,
+            create_compressed_image_msg,
+            max_fps=self.camera_control_params.debug_frame_max_fps,
+        )
+
         # Camera
 
         # After starting a camera device, when a new frame is available, a callback is called by
@@ -102,6 +299,16 @@ class CameraControlNode:
 
         # We don't need locks for these since read/write only happens on main event loop
         self.current_frame = None
+        # perf_counter time at which the current frame was received
+        self._current_frame_received_time = 0.0
+        self._frame_stats = FrameStats()
+        # Frames dropped for lack of a frame buffer as of the last diagnostics
+        self._last_num_frames_dropped_no_buffer = 0
+        # Notified whenever the current frame changes
+        self._frame_condition = asyncio.Condition()
+        # Detections on the latest frame, shared by the detection task and the detection services
+        # so that the models never run twice on the same frame
+        self.detection_cache = DetectionCache()
         self._detection_task_queue = asyncio.Queue(1)
         self._detection_completed_event = (
             asyncio.Event()
@@ -117,19 +324,44 @@ class CameraControlNode:
 
         loop = asyncio.get_running_loop()
         loop.create_task(process_detection_task_queue())
+        if self.camera_control_params.diagnostics_interval_secs > 0.0:
+            loop.create_task(self._diagnostics_task())
 
         def state_change_callback(state: RgbdCameraState):
             loop.call_soon_threadsafe(self._publish_state)
 
+        frame_pairing = FramePairing[self.camera_control_params.frame_pairing.upper()]
         if self.camera_control_params.camera_type == "realsense":
             self.camera = RealSenseCamera(
+                depth_fps=(
+                    self.camera_control_params.depth_fps
+                    if self.camera_control_params.depth_fps > 0
+                    else None
+                ),
+                align_depth_to_color_frame=self.camera_control_params.align_depth_to_color_frame,
+                lazy_depth_processing=self.camera_control_params.lazy_depth_processing,
+                frame_pairing=frame_pairing,
+                max_depth_age_ms=self.camera_control_params.max_depth_age_ms,
                 camera_index=self.camera_control_params.camera_index,
                 state_change_callback=state_change_callback,
                 logger=self.get_logger(),
             )
         elif self.camera_control_params.camera_type == "lucid":
             self.camera = create_lucid_rgbd_camera(
-                state_change_callback=state_change_callback, logger=self.get_logger()
+                register_depth_to_color=self.camera_control_params.register_depth_to_color,
+                frame_pairing=frame_pairing,
+                max_depth_age_ms=self.camera_control_params.max_depth_age_ms,
+                num_frame_buffers=self._get_num_frame_buffers(),
+                state_change_callback=state_change_callback,
+                logger=self.get_logger(),
+            )
+        elif self.camera_control_params.camera_type == "replay":
+            self.camera = ReplayRgbdCamera(
+                os.path.expanduser(self.camera_control_params.replay_dir),
+                fps=self.camera_control_params.replay_fps,
+                register_depth_to_color=self.camera_control_params.register_depth_to_color,
+                state_change_callback=state_change_callback,
+                logger=self.get_logger(),
             )
         else:
             raise Exception(
@@ -141,13 +373,54 @@ class CameraControlNode:
         runner_weights_path = os.path.join(
             package_share_directory, "models", "RunnerSegYoloV8l.pt"
         )
-        self.runner_seg_model = Yolo(runner_weights_path)
+        self.runner_seg_model = Yolo(
+            runner_weights_path,
+            backend=self.camera_control_params.inference_backend,
+            num_threads=self.camera_control_params.inference_num_threads,
+            int8=self.camera_control_params.inference_int8,
+        )
         self.runner_seg_size = (1024, 768)
+        if self.camera_control_params.runner_center_method not in CENTER_METHODS:
+            raise Exception(
+                f"Unknown runner_center_method: {self.camera_control_params.runner_center_method}"
+            )
+        if self.camera_control_params.runner_mask_format not in ("polygons", "bitmaps"):
+            raise Exception(
+                f"Unknown runner_mask_format: {self.camera_control_params.runner_mask_format}"
+            )
         laser_weights_path = os.path.join(
             package_share_directory, "models", "LaserDetectionYoloV8n.pt"
         )
-        self.laser_detection_model = Yolo(laser_weights_path)
+        self.laser_detection_model = Yolo(
+            laser_weights_path,
+            backend=self.camera_control_params.inference_backend,
+            num_threads=self.camera_control_params.inference_num_threads,
+            int8=self.camera_control_params.inference_int8,
+        )
         self.laser_detection_size = (640, 480)
+        if self.camera_control_params.laser_detector not in ("yolo", "classical"):
+            raise Exception(
+                f"Unknown laser_detector: {self.camera_control_params.laser_detector}"
+            )
+        self.laser_spot_detector = LaserSpotDetector(
+            min_intensity=self.camera_control_params.laser_spot_min_intensity,
+            min_area=self.camera_control_params.laser_spot_min_area,
+            max_area=self.camera_control_params.laser_spot_max_area,
+            max_spots=self.camera_control_params.laser_spot_max_spots,
+            min_conf=self.camera_control_params.laser_spot_min_conf,
+            max_bright_fraction=self.camera_control_params.laser_spot_max_bright_fraction,
+        )
+        # Each model runs on its own single-thread executor, so that the models can run
+        # concurrently while calls to the same model (which may hold tracker state) are serialized
+        self._runner_seg_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="runner_seg"
+        )
+        self._laser_detection_executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="laser_detection"
+        )
+        self.detection_timings = TimingStats(
+            window_size=self.camera_control_params.timing_window_size
+        )
 
         # Publish initial state
         self._publish_state()
@@ -156,8 +429,14 @@ class CameraControlNode:
     async def start_device(self):
         loop = asyncio.get_running_loop()
 
+        # Replay only: signal when a frame has been handled, so that playback without a fixed fps
+        # does not emit frames faster than the event loop handles them
+        frame_consumed = getattr(self.camera, "frame_consumed", None)
+
         def frame_callback(frame: RgbdFrame):
-            asyncio.run_coroutine_threadsafe(self._frame_callback(frame), loop)
+            future = asyncio.run_coroutine_threadsafe(self._frame_callback(frame), loop)
+            if frame_consumed is not None:
+                future.add_done_callback(lambda _: frame_consumed())
 
         self.camera.start(
             exposure_us=self.camera_control_params.exposure_us,
@@ -189,13 +468,15 @@ class CameraControlNode:
         if frame is None:
             return result()
 
+        # May align and filter the depth frame if it has not been processed yet
+        depth_frame = await asyncio.get_running_loop().run_in_executor(
+            None, lambda: frame.depth_frame
+        )
         return result(
             color_frame=self._get_color_frame_msg(
                 frame.color_frame, frame.timestamp_millis
             ),
-            depth_frame=self._get_depth_frame_msg(
-                frame.depth_frame, frame.timestamp_millis
-            ),
+            depth_frame=self._get_depth_frame_msg(depth_frame, frame.timestamp_millis),
         )
 
     @service("~/set_exposure", SetExposure)
@@ -226,14 +507,32 @@ class CameraControlNode:
         self._publish_state()
         return result(success=True)
 
-    @service("~/get_laser_detection", GetDetectionResult)
-    async def get_laser_detection(self):
-        frame = self.current_frame
+    @service("~/get_laser_detection", GetLaserDetection)
+    async def get_laser_detection(self, roi_center, roi_radius, not_before_timestamp):
+        if not_before_timestamp > 0.0:
+            frame = await self._wait_for_frame(not_before_timestamp * 1000)
+        else:
+            frame = self.current_frame
         if frame is None:
             return result()
 
-        laser_points, conf = await self._get_laser_points(frame.color_frame)
-        return result(result=self._create_detection_result_msg(laser_points, frame))
+        if roi_radius > 0.0:
+            laser_points, conf = await self.detection_cache.get(
+                ("laser_roi", roi_center.x, roi_center.y, roi_radius),
+                frame.timestamp_millis,
+                lambda: self._get_laser_points_in_roi(
+                    frame, (roi_center.x, roi_center.y), roi_radius
+                ),
+            )
+        else:
+            laser_points, conf = await self.detection_cache.get(
+                "laser",
+                frame.timestamp_millis,
+                lambda: self._get_laser_points(frame),
+            )
+        return result(
+            result=await self._create_detection_result_msg(laser_points, frame)
+        )
 
     @service("~/get_runner_detection", GetDetectionResult)
     async def get_runner_detection(self):
@@ -241,11 +540,15 @@ class CameraControlNode:
         if frame is None:
             return result()
 
-        runner_masks, confs, track_ids = await self._get_runner_masks(frame.color_frame)
-        runner_centers = await self._get_runner_centers(runner_masks)
-        runner_centers = [center for center in runner_centers if center is not None]
+        _, runner_centers, confs, track_ids = await self.detection_cache.get(
+            "runner",
+            frame.timestamp_millis,
+            lambda: self._get_runner_detection(frame),
+        )
         return result(
-            result=self._create_detection_result_msg(runner_centers, frame, track_ids)
+            result=await self._create_detection_result_msg(
+                runner_centers, frame, track_ids
+            )
         )
 
     @service("~/start_laser_detection", Trigger)
@@ -280,27 +583,70 @@ class CameraControlNode:
         datetime_obj = datetime.fromtimestamp(ts)
         datetime_string = datetime_obj.strftime("%Y%m%d%H%M%S")
         video_name = f"{datetime_string}.avi"
-        video_path = os.path.join(save_dir, video_name)
-        self.video_writer = cv2.VideoWriter(
-            video_path,
-            cv2.VideoWriter_fourcc(*"XVID"),
-            self.camera_control_params.fps,
-            (
-                self.camera_control_params.rgb_size[0],
-                self.camera_control_params.rgb_size[1],
-            ),
-        )
+        # The video writer is created on the video encoder thread when the first frame is written,
+        # as the frame size is only known then
+        self.video_path = os.path.join(save_dir, video_name)
         self._publish_state()
-        self._publish_log_message(f"Started recording video: {video_path}")
+        self._publish_log_message(f"Started recording video: {self.video_path}")
         return result(success=True)
 
     @service("~/stop_recording_video", Trigger)
     async def stop_recording_video(self):
-        self.video_writer = None
+        self.video_path = None
+        # Queued after any pending frames so that they are written before the writer is released.
+        # Must not be dropped, otherwise the writer would stay open and the video unfinished
+        self.video_encoder.submit(self._release_video_writer, droppable=False)
         self._publish_state()
         self._publish_log_message("Stopped recording video")
         return result(success=True)
 
+    @service("~/start_recording_frames", Trigger)
+    async def start_recording_frames(self):
+        if self.camera_control_params.camera_type not in ("lucid", "replay"):
+            self._publish_log_message(
+                f"Frame recording is not supported for camera_type: {self.camera_control_params.camera_type}"
+            )
+            return result(success=False)
+
+        if self.frame_recorder is not None and self.frame_recorder.is_running:
+            return result(success=False)
+
+        save_dir = os.path.expanduser(self.camera_control_params.save_dir)
+        os.makedirs(save_dir, exist_ok=True)
+        ts = time.time()
+        datetime_obj = datetime.fromtimestamp(ts)
+        datetime_string = datetime_obj.strftime("%Y%m%d%H%M%S")
+        recording_path = os.path.join(save_dir, f"{datetime_string}_frames")
+        self.frame_recorder = FrameRecorder(
+            recording_path,
+            chunk_size=self.camera_control_params.frame_recording_chunk_size,
+            max_queue_size=self.camera_control_params.frame_recording_queue_size,
+            drop_policy=DropPolicy[
+                self.camera_control_params.frame_recording_drop_policy.upper()
+            ],
+            logger=self.get_logger(),
+        )
+        self.frame_recorder.start()
+        self._publish_state()
+        self._publish_log_message(f"Started recording frames: {recording_path}")
+        return result(success=True)
+
+    @service("~/stop_recording_frames", Trigger)
+    async def stop_recording_frames(self):
+        frame_recorder = self.frame_recorder
+        if frame_recorder is None:
+            return result(success=False)
+
+        self.frame_recorder = None
+        # Stopping blocks until all queued frames are written, so run it off the event loop
+        await asyncio.get_running_loop().run_in_executor(None, frame_recorder.stop)
+        stats = frame_recorder.stats
+        self._publish_state()
+        self._publish_log_message(
+            f"Stopped recording frames: {stats.num_frames_recorded} recorded, {stats.num_frames_dropped} dropped"
+        )
+        return result(success=True)
+
     @service("~/save_image", Trigger)
     async def save_image(self):
         if (await self._save_image()) is None:
@@ -355,19 +701,55 @@ class CameraControlNode:
         ts = time.time()
         datetime_obj = datetime.fromtimestamp(ts)
         datetime_string = datetime_obj.strftime("%Y%m%d%H%M%S")
-        image_name = f"{datetime_string}.png"
+        image_format = ImageFormat[self.camera_control_params.image_format.upper()]
+        image_name = f"{datetime_string}{image_format.extension}"
         image_path = os.path.join(save_dir, image_name)
-        cv2.imwrite(
-            image_path,
-            cv2.cvtColor(frame.color_frame, cv2.COLOR_RGB2BGR),
-        )
-        self._publish_log_message(f"Saved image: {image_path}")
+        loop = asyncio.get_running_loop()
+
+        def save_image_job():
+            # The job holds a reference to the frame, so that its color frame buffer is not reused
+            # while encoding
+            write_image(
+                image_path,
+                frame.color_frame,
+                image_format,
+                self.camera_control_params.image_quality,
+            )
+            loop.call_soon_threadsafe(
+                self._publish_log_message, f"Saved image: {image_path}"
+            )
+
+        if not self.image_encoder.submit(save_image_job):
+            return None
+
         return image_path
 
     @service("~/get_state", GetState)
     async def get_state(self):
         return result(state=self._get_state())
 
+    @service("~/get_stats", GetStats)
+    async def get_stats(self):
+        timings_ms = self.detection_timings.get_timings_ms()
+        # Stages are never removed, so the counts include every stage in the timings
+        counts = self.detection_timings.get_counts()
+        stage_latencies = [
+            StageLatency(
+                stage=stage,
+                count=counts[stage],
+                mean_ms=stage_timings_ms["mean"],
+                last_ms=stage_timings_ms["last"],
+                p50_ms=stage_timings_ms["p50"],
+                p95_ms=stage_timings_ms["p95"],
+                p99_ms=stage_timings_ms["p99"],
+            )
+            for stage, stage_timings_ms in timings_ms.items()
+        ]
+        return result(
+            stage_latencies=stage_latencies,
+            **dataclasses.asdict(self._frame_stats),
+        )
+
     @service("~/get_positions", GetPositions)
     async def get_positions(self, normalized_pixel_coords):
         frame = self.current_frame
@@ -376,26 +758,96 @@ class CameraControlNode:
 
         h, w, _ = frame.color_frame.shape
 
-        positions = []
-        for normalized_pixel_coord in normalized_pixel_coords:
-            x = round(min(max(0.0, normalized_pixel_coord.x), 1.0) * w)
-            y = round(min(max(0.0, normalized_pixel_coord.y), 1.0) * h)
-            position = frame.get_position((x, y))
-            positions.append(
-                Vector3(x=position[0], y=position[1], z=position[2])
-                if position is not None
+        normalized_pixels = np.array(
+            [
+                (normalized_pixel_coord.x, normalized_pixel_coord.y)
+                for normalized_pixel_coord in normalized_pixel_coords
+            ]
+        ).reshape(-1, 2)
+        pixels = np.round(np.clip(normalized_pixels, 0.0, 1.0) * [w, h])
+        # May align and filter the depth frame if it has not been processed yet
+        frame_positions = await asyncio.get_running_loop().run_in_executor(
+            None, frame.get_positions, pixels
+        )
+        positions = [
+            (
+                Vector3(
+                    x=float(position[0]), y=float(position[1]), z=float(position[2])
+                )
+                if not np.isnan(position).any()
                 else Vector3(x=-1.0, y=-1.0, z=-1.0)
             )
+            for position in frame_positions
+        ]
         return result(positions=positions)
 
     async def _frame_callback(self, frame: RgbdFrame):
+        self._frame_stats.num_frames_received += 1
         if not self._camera_started or self.camera.state != RgbdCameraState.STREAMING:
+            self._frame_stats.num_frames_skipped += 1
             return
 
+        received_time = time.perf_counter()
+        # Time from the start of the exposure to the frame reaching the node, including the
+        # exposure and the transfer from the device. Frame timestamps are wall clock times
+        self.detection_timings.record(
+            "frame_age", time.time() * 1000 - frame.timestamp_millis
+        )
         self.current_frame = frame
+        self._current_frame_received_time = received_time
+        async with self._frame_condition:
+            self._frame_condition.notify_all()
+
+        if self.frame_recorder is not None:
+            self.frame_recorder.record(frame)
+
+        if self.color_frame_publisher.should_publish():
+            asyncio.create_task(self._publish_color_frame(frame))
 
         if self._detection_task_queue.empty():
             await self._detection_task_queue.put(self._detection_task)
+        else:
+            # The queued detection task runs on the latest frame, so this frame or the one it
+            # replaced as the current frame is never run through detection
+            self._frame_stats.num_frames_dropped += 1
+
+    async def _wait_for_frame(
+        self, not_before_timestamp_millis: float
+    ) -> Optional[RgbdFrame]:
+        """
+        Wait for the first frame whose exposure started at or after a given time.
+
+        Args:
+            not_before_timestamp_millis (float): Wall clock time in milliseconds.
+
+        Returns:
+            Optional[RgbdFrame]: The frame, or None if no such frame arrived within frame_wait_timeout_secs.
+        """
+
+        def is_fresh() -> bool:
+            return (
+                self.current_frame is not None
+                and self.current_frame.timestamp_millis >= not_before_timestamp_millis
+            )
+
+        async with self._frame_condition:
+            try:
+                # The condition is notified on every new frame, so the predicate is checked before
+                # the current frame can be replaced by a later one
+                await asyncio.wait_for(
+                    self._frame_condition.wait_for(is_fresh),
+                    self.camera_control_params.frame_wait_timeout_secs,
+                )
+            except asyncio.TimeoutError:
+                return None
+            return self.current_frame
+
+    async def _publish_color_frame(self, frame: RgbdFrame):
+        # Holds a reference to the frame until published, so that its color frame buffer is not
+        # reused while building messages
+        await self.color_frame_publisher.publish(
+            frame.color_frame, frame.timestamp_millis
+        )
 
     async def _detection_task(self):
         if not self._camera_started or self.camera.state != RgbdCameraState.STREAMING:
@@ -408,66 +860,262 @@ class CameraControlNode:
             if frame is None:
                 return
 
-            debug_frame = np.copy(frame.color_frame)
+            detection_start = time.perf_counter()
+            frame_received_time = self._current_frame_received_time
+            # Time from the frame being received to detection starting on it
+            self.detection_timings.record(
+                "queue_wait", (detection_start - frame_received_time) * 1000
+            )
+            # Models run concurrently on their own executors. Inputs are resized once per input
+            # size and shared by the models that use that size. Detections already computed or in
+            # flight on this frame (e.g. requested through a detection service) are reused, so
+            # their model inputs are not needed
+            model_input_sizes = []
+            # The classical laser detector runs on the full resolution frame, and only needs the
+            # model input on fallback, in which case it is resized on the model's executor
+            if (
+                self.laser_detection_enabled
+                and self.camera_control_params.laser_detector == "yolo"
+                and not self.detection_cache.contains("laser", frame.timestamp_millis)
+            ):
+                model_input_sizes.append(self.laser_detection_size)
+            if self.runner_detection_enabled and not self.detection_cache.contains(
+                "runner", frame.timestamp_millis
+            ):
+                model_input_sizes.append(self.runner_seg_size)
+            model_inputs = await self._prepare_model_inputs(frame, model_input_sizes)
+            laser_detection_task = (
+                self.detection_cache.get(
+                    "laser",
+                    frame.timestamp_millis,
+                    lambda: self._get_laser_points(
+                        frame,
+                        model_input=model_inputs.get(self.laser_detection_size),
+                    ),
+                )
+                if self.laser_detection_enabled
+                else None
+            )
+            runner_detection_task = (
+                self.detection_cache.get(
+                    "runner",
+                    frame.timestamp_millis,
+                    lambda: self._get_runner_detection(
+                        frame,
+                        model_input=model_inputs.get(self.runner_seg_size),
+                    ),
+                )
+                if self.runner_detection_enabled
+                else None
+            )
 
-            if self.laser_detection_enabled:
-                laser_points, confs = await self._get_laser_points(frame.color_frame)
-                debug_frame = self._debug_draw_lasers(debug_frame, laser_points, confs)
-                msg = self._create_detection_result_msg(laser_points, frame)
+            laser_detection = None
+            if laser_detection_task is not None:
+                laser_detection = await laser_detection_task
+                laser_points, confs = laser_detection
+                msg = await self._create_detection_result_msg(
+                    laser_points, frame, timing_stage="laser_result_msg"
+                )
                 asyncio.create_task(
-                    self.laser_detections_topic(
-                        timestamp=msg.timestamp,
-                        instances=msg.instances,
-                        invalid_points=msg.invalid_points,
+                    self._publish_timed(
+                        "laser_publish_wall", self.laser_detections_topic, msg
                     )
                 )
 
-            if self.runner_detection_enabled:
-                runner_masks, confs, track_ids = await self._get_runner_masks(
-                    frame.color_frame
-                )
-                runner_centers = await self._get_runner_centers(runner_masks)
-                debug_frame = self._debug_draw_runners(
-                    debug_frame, runner_masks, runner_centers, confs, track_ids
-                )
-                msg = self._create_detection_result_msg(
-                    runner_centers, frame, track_ids
+            runner_detection = None
+            if runner_detection_task is not None:
+                runner_detection = await runner_detection_task
+                runner_masks, runner_centers, confs, track_ids = runner_detection
+                msg = await self._create_detection_result_msg(
+                    runner_centers, frame, track_ids, timing_stage="runner_result_msg"
                 )
                 asyncio.create_task(
-                    self.runner_detections_topic(
-                        timestamp=msg.timestamp,
-                        instances=msg.instances,
-                        invalid_points=msg.invalid_points,
+                    self._publish_timed(
+                        "runner_publish_wall", self.runner_detections_topic, msg
                     )
                 )
 
-            # Downscale debug_frame using INTER_NEAREST for best performance
-            h, w, _ = debug_frame.shape
+            if laser_detection_task is not None or runner_detection_task is not None:
+                self._frame_stats.num_frames_detected += 1
+                detection_end = time.perf_counter()
+                self.detection_timings.record(
+                    "total", (detection_end - detection_start) * 1000
+                )
+                # Time from the frame being received to its detection results being built
+                self.detection_timings.record(
+                    "end_to_end", (detection_end - frame_received_time) * 1000
+                )
+
+            # Only build the debug frame if it will be published or recorded
+            publish_debug_frame = self.debug_frame_publisher.should_publish()
+            if not publish_debug_frame and self.video_path is None:
+                return
+
+            # Downscale before drawing, so that drawing and publishing operate on the small frame.
+            # Use INTER_NEAREST for best performance
+            h, w, _ = frame.color_frame.shape
             aspect_ratio = h / w
             new_width = self.camera_control_params.debug_frame_width
             new_height = int(new_width * aspect_ratio)
             debug_frame = cv2.resize(
-                debug_frame, (new_width, new_height), interpolation=cv2.INTER_NEAREST
+                frame.color_frame,
+                (new_width, new_height),
+                interpolation=cv2.INTER_NEAREST,
             )
-            msg = self._get_color_frame_msg(debug_frame, frame.timestamp_millis)
-            asyncio.create_task(
-                self.debug_frame_topic(
-                    header=msg.header,
-                    height=msg.height,
-                    width=msg.width,
-                    encoding=msg.encoding,
-                    is_bigendian=msg.is_bigendian,
-                    step=msg.step,
-                    data=msg.data,
+            scale = new_width / w
+            if laser_detection is not None:
+                laser_points, confs = laser_detection
+                debug_frame = self._debug_draw_lasers(
+                    debug_frame, _scale_points(laser_points, scale), confs
+                )
+            if runner_detection is not None:
+                runner_masks, runner_centers, confs, track_ids = runner_detection
+                if self.camera_control_params.runner_mask_format == "polygons":
+                    # Bitmaps are resized to the debug frame when drawn
+                    runner_masks = [mask * scale for mask in runner_masks]
+                debug_frame = self._debug_draw_runners(
+                    debug_frame,
+                    runner_masks,
+                    _scale_points(runner_centers, scale),
+                    confs,
+                    track_ids,
                 )
-            )
 
-            if self.video_writer is not None:
-                self.video_writer.write(cv2.cvtColor(debug_frame, cv2.COLOR_RGB2BGR))
+            if publish_debug_frame:
+                asyncio.create_task(
+                    self.debug_frame_publisher.publish(
+                        debug_frame, frame.timestamp_millis
+                    )
+                )
+
+            if self.video_path is not None:
+                self.video_encoder.submit(
+                    functools.partial(
+                        self._write_video_frame, self.video_path, debug_frame
+                    )
+                )
 
         finally:
             self._detection_completed_event.set()
 
+    async def _publish_timed(self, stage: str, publish: Callable, msg: Any):
+        # Publishing runs on an executor inside aioros2, so this is a wall clock span that includes
+        # waiting for the executor and the event loop, not just the time spent publishing
+        with self.detection_timings.time(stage):
+            await publish(msg)
+
+    def _write_video_frame(self, video_path: str, frame: np.ndarray):
+        # Runs on the video encoder thread
+        if self._video_writer is None or self._video_writer_path != video_path:
+            self._release_video_writer()
+            h, w, _ = frame.shape
+            self._video_writer = cv2.VideoWriter(
+                video_path,
+                cv2.VideoWriter_fourcc(*"XVID"),
+                self.camera_control_params.video_fps,
+                (w, h),
+            )
+            self._video_writer_path = video_path
+        self._video_writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    def _release_video_writer(self):
+        # Runs on the video encoder thread
+        if self._video_writer is not None:
+            self._video_writer.release()
+        self._video_writer = None
+        self._video_writer_path = None
+
+    async def _diagnostics_task(self):
+        while True:
+            await asyncio.sleep(self.camera_control_params.diagnostics_interval_secs)
+            self._publish_diagnostics()
+
+    def _publish_diagnostics(self):
+        msg = DiagnosticArray()
+        sec, nanosec = milliseconds_to_ros_time(time.time() * 1000)
+        msg.header.stamp.sec = sec
+        msg.header.stamp.nanosec = nanosec
+        for encoder in (self.image_encoder, self.video_encoder):
+            msg.status.append(
+                self._create_diagnostic_status_msg(
+                    encoder.name, dataclasses.asdict(encoder.stats)
+                )
+            )
+        if self.frame_recorder is not None:
+            msg.status.append(
+                self._create_diagnostic_status_msg(
+                    "frame_recorder", dataclasses.asdict(self.frame_recorder.stats)
+                )
+            )
+        # Lucid only: frame acquisition counters and buffer occupancy. Warns while frames are being
+        # dropped because all frame buffers are in use
+        acquisition_stats = getattr(self.camera, "acquisition_stats", None)
+        if acquisition_stats is not None:
+            num_frames_dropped_no_buffer = (
+                acquisition_stats.color_frames_dropped_no_buffer
+                + acquisition_stats.depth_frames_dropped_no_buffer
+            )
+            msg.status.append(
+                self._create_diagnostic_status_msg(
+                    "acquisition",
+                    dataclasses.asdict(acquisition_stats),
+                    level=(
+                        DiagnosticStatus.WARN
+                        if num_frames_dropped_no_buffer
+                        > self._last_num_frames_dropped_no_buffer
+                        else DiagnosticStatus.OK
+                    ),
+                )
+            )
+            self._last_num_frames_dropped_no_buffer = num_frames_dropped_no_buffer
+        # RealSense only: depth processing stage timings
+        depth_processing_timings_ms = getattr(
+            self.camera, "depth_processing_timings_ms", None
+        )
+        if depth_processing_timings_ms:
+            msg.status.append(
+                self._create_timings_diagnostic_status_msg(
+                    "depth_processing", depth_processing_timings_ms
+                )
+            )
+        detection_timings_ms = self.detection_timings.get_timings_ms()
+        if detection_timings_ms:
+            msg.status.append(
+                self._create_timings_diagnostic_status_msg(
+                    "detection", detection_timings_ms
+                )
+            )
+        msg.status.append(
+            self._create_diagnostic_status_msg(
+                "frames", dataclasses.asdict(self._frame_stats)
+            )
+        )
+        msg.status.append(
+            self._create_diagnostic_status_msg(
+                "detection_cache", dataclasses.asdict(self.detection_cache.stats)
+            )
+        )
+        asyncio.create_task(self.diagnostics_topic(msg))
+
+    def _get_num_frame_buffers(self) -> int:
+        # Every frame queued or being written by the frame recorder or image encoder holds a
+        # buffer, in addition to the frames in flight
+        params = self.camera_control_params
+        num_required = (
+            params.frame_recording_queue_size
+            + 1
+            + params.encoder_queue_size
+            + params.image_encoder_num_threads
+            + NUM_IN_FLIGHT_FRAMES
+        )
+        if params.num_frame_buffers <= 0:
+            return num_required
+        if params.num_frame_buffers < num_required:
+            self.log_warn(
+                f"num_frame_buffers ({params.num_frame_buffers}) is less than the {num_required} frames the node can hold at once. Frames will be dropped when all buffers are in use"
+            )
+        return params.num_frame_buffers
+
     def _get_device_state(self) -> DeviceState:
         if self.camera is None:
             return DeviceState.DISCONNECTED
@@ -486,7 +1134,10 @@ class CameraControlNode:
         state.device_state = device_state
         state.laser_detection_enabled = self.laser_detection_enabled
         state.runner_detection_enabled = self.runner_detection_enabled
-        state.recording_video = self.video_writer is not None
+        state.recording_video = self.video_path is not None
+        state.recording_frames = (
+            self.frame_recorder is not None and self.frame_recorder.is_running
+        )
         state.interval_capture_active = self.interval_capture_task is not None
         state.exposure_us = self.camera.exposure_us
         exposure_us_range = self.camera.get_exposure_us_range()
@@ -497,6 +1148,7 @@ class CameraControlNode:
         gain_db_range = self.camera.get_gain_db_range()
         state.gain_db_range = Vector2(x=gain_db_range[0], y=gain_db_range[1])
         state.save_directory = self.camera_control_params.save_dir
+        state.device_id = self.camera.device_id or ""
         return state
 
     def _publish_state(self):
@@ -507,12 +1159,14 @@ class CameraControlNode:
                 laser_detection_enabled=state.laser_detection_enabled,
                 runner_detection_enabled=state.runner_detection_enabled,
                 recording_video=state.recording_video,
+                recording_frames=state.recording_frames,
                 interval_capture_active=state.interval_capture_active,
                 exposure_us=state.exposure_us,
                 exposure_us_range=state.exposure_us_range,
                 gain_db=state.gain_db,
                 gain_db_range=state.gain_db_range,
                 save_directory=state.save_directory,
+                device_id=state.device_id,
             )
         )
 
@@ -528,23 +1182,146 @@ class CameraControlNode:
             self.log_topic(stamp=log_message.stamp, msg=log_message.msg)
         )
 
+    async def _prepare_model_inputs(
+        self, frame: RgbdFrame, sizes: List[Tuple[int, int]]
+    ) -> Dict[Tuple[int, int], np.ndarray]:
+        """
+        Resize a frame once for each distinct model input size, concurrently.
+        """
+        sizes = list(dict.fromkeys(sizes))
+        loop = asyncio.get_running_loop()
+        model_inputs = await asyncio.gather(
+            *[
+                loop.run_in_executor(None, self._resize_model_input, frame, size)
+                for size in sizes
+            ]
+        )
+        return dict(zip(sizes, model_inputs))
+
+    # Executor jobs take the frame rather than its color frame, so that the frame, and with it its
+    # color frame buffer, stays alive until the job has run. A pooled buffer is reused once the
+    # frame holding it is garbage collected, which can happen before the job runs if it only holds
+    # the color frame array
+    def _resize_model_input(
+        self,
+        frame: RgbdFrame,
+        size: Tuple[int, int],
+        crop_box: Optional[Tuple[int, int, int, int]] = None,
+    ) -> np.ndarray:
+        with self.detection_timings.time("input_prep"):
+            return cv2.resize(
+                _crop(frame.color_frame, crop_box),
+                size,
+                interpolation=cv2.INTER_LINEAR,
+            )
+
+    def _run_model(
+        self,
+        stage: str,
+        predict_fn: Callable[[np.ndarray], dict],
+        frame: RgbdFrame,
+        size: Tuple[int, int],
+        model_input: Optional[np.ndarray] = None,
+        crop_box: Optional[Tuple[int, int, int, int]] = None,
+    ) -> dict:
+        # Runs on the model's executor
+        if model_input is None:
+            model_input = self._resize_model_input(frame, size, crop_box)
+        with self.detection_timings.time(stage):
+            return predict_fn(model_input)
+
+    def _detect_laser_spots(
+        self,
+        frame: RgbdFrame,
+        crop_box: Optional[Tuple[int, int, int, int]] = None,
+    ) -> LaserSpotDetection:
+        # Runs on the laser detection executor. Bright fractions of crops are relative to the full
+        # frame
+        color_frame = frame.color_frame
+        reference_area = (
+            color_frame.shape[0] * color_frame.shape[1]
+            if crop_box is not None
+            else None
+        )
+        with self.detection_timings.time("laser_spot_detection"):
+            return self.laser_spot_detector.detect(
+                _crop(color_frame, crop_box), reference_area
+            )
+
     async def _get_laser_points(
-        self, color_frame: np.ndarray, conf_threshold: float = 0.0
-    ) -> Tuple[List[Tuple[int, int]], List[float]]:
+        self,
+        frame: RgbdFrame,
+        conf_threshold: float = 0.0,
+        model_input: Optional[np.ndarray] = None,
+        crop_box: Optional[Tuple[int, int, int, int]] = None,
+    ) -> Tuple[List[Tuple[float, float]], List[float]]:
+        """
+        Detect lasers in a frame, or in the (left, top, right, bottom) crop_box of a frame, in which
+        case points are relative to the crop. Crops are held to the same scale as full frames: the
+        laser detection model runs on the crop resized by the factor full frames are resized by,
+        padded rather than upscaled to the model input, and the classical detector's
+        max_bright_fraction is relative to the full frame.
+        """
+        if self.camera_control_params.laser_detector == "classical":
+            detection = await asyncio.get_running_loop().run_in_executor(
+                self._laser_detection_executor,
+                self._detect_laser_spots,
+                frame,
+                crop_box,
+            )
+            if (
+                not detection.ambiguous
+                or not self.camera_control_params.laser_detector_fallback
+            ):
+                self.log(f"Laser spot detection found {len(detection.spots)} objects.")
+                laser_points = []
+                confs = []
+                for spot in detection.spots:
+                    if spot.conf >= conf_threshold:
+                        laser_points.append(spot.point)
+                        confs.append(spot.conf)
+                    else:
+                        self.log(
+                            f"Laser spot detection ignored due to low confidence: {spot.conf} < {conf_threshold}"
+                        )
+                return laser_points, confs
+
+            self.log(
+                f"Laser spot detection is ambiguous ({detection.reason}). Falling back to the laser detection model."
+            )
+
         # Scale image before prediction to improve accuracy
-        frame_width = color_frame.shape[1]
-        frame_height = color_frame.shape[0]
-        result_width = self.laser_detection_size[0]
-        result_height = self.laser_detection_size[1]
-        color_frame = cv2.resize(
-            color_frame, self.laser_detection_size, interpolation=cv2.INTER_LINEAR
-        )
+        full_frame_height, full_frame_width, _ = frame.color_frame.shape
+        if crop_box is None:
+            frame_width = full_frame_width
+            frame_height = full_frame_height
+        else:
+            frame_width = crop_box[2] - crop_box[0]
+            frame_height = crop_box[3] - crop_box[1]
+        predict_fn = self.laser_detection_model.predict
+        if crop_box is None:
+            model_input_size = self.laser_detection_size
+        else:
+            scale_x = self.laser_detection_size[0] / full_frame_width
+            scale_y = self.laser_detection_size[1] / full_frame_height
+            model_input_size = (
+                max(1, round(frame_width * scale_x)),
+                max(1, round(frame_height * scale_y)),
+            )
+            predict_fn = functools.partial(predict_fn, scale_up=False)
+        result_width = model_input_size[0]
+        result_height = model_input_size[1]
 
         result = await asyncio.get_running_loop().run_in_executor(
-            None,
+            self._laser_detection_executor,
             functools.partial(
-                self.laser_detection_model.predict,
-                color_frame,
+                self._run_model,
+                "laser_detection",
+                predict_fn,
+                frame,
+                model_input_size,
+                model_input,
+                crop_box,
             ),
         )
         result_conf = result["conf"]
@@ -571,22 +1348,79 @@ class CameraControlNode:
                 )
         return laser_points, confs
 
+    async def _get_laser_points_in_roi(
+        self,
+        frame: RgbdFrame,
+        roi_center: Tuple[float, float],
+        roi_radius: float,
+        conf_threshold: float = 0.0,
+    ) -> Tuple[List[Tuple[float, float]], List[float]]:
+        """
+        Detect lasers within roi_radius of roi_center. Detection runs on a crop of the frame, at
+        the same scale as full frame detection, so that detections elsewhere in the frame are
+        ignored. The laser detection model runs on a smaller input than the full frame with the
+        PyTorch backend. Exported models have a fixed input size, so the crop is padded to it.
+        """
+        frame_height, frame_width, _ = frame.color_frame.shape
+        left = max(0, math.floor(roi_center[0] - roi_radius))
+        top = max(0, math.floor(roi_center[1] - roi_radius))
+        right = min(frame_width, math.ceil(roi_center[0] + roi_radius) + 1)
+        bottom = min(frame_height, math.ceil(roi_center[1] + roi_radius) + 1)
+        if left >= right or top >= bottom:
+            return [], []
+
+        crop_points, crop_confs = await self._get_laser_points(
+            frame, conf_threshold, crop_box=(left, top, right, bottom)
+        )
+
+        laser_points = []
+        confs = []
+        for crop_point, conf in zip(crop_points, crop_confs):
+            point = (crop_point[0] + left, crop_point[1] + top)
+            if math.dist(point, roi_center) <= roi_radius:
+                laser_points.append(point)
+                confs.append(conf)
+        return laser_points, confs
+
+    async def _get_runner_detection(
+        self,
+        frame: RgbdFrame,
+        conf_threshold: float = 0.0,
+        model_input: Optional[np.ndarray] = None,
+    ) -> Tuple[
+        List[np.ndarray], List[Optional[Tuple[int, int]]], List[float], List[int]
+    ]:
+        runner_masks, confs, track_ids = await self._get_runner_masks(
+            frame, conf_threshold, model_input
+        )
+        runner_centers = await self._get_runner_centers(
+            runner_masks, (frame.color_frame.shape[1], frame.color_frame.shape[0])
+        )
+        return runner_masks, runner_centers, confs, track_ids
+
     async def _get_runner_masks(
-        self, color_frame: np.ndarray, conf_threshold: float = 0.0
+        self,
+        frame: RgbdFrame,
+        conf_threshold: float = 0.0,
+        model_input: Optional[np.ndarray] = None,
     ) -> Tuple[List[np.ndarray], List[float], List[int]]:
         # Scale image before prediction to improve accuracy
-        frame_width = color_frame.shape[1]
-        frame_height = color_frame.shape[0]
+        frame_width = frame.color_frame.shape[1]
+        frame_height = frame.color_frame.shape[0]
         result_width = self.runner_seg_size[0]
         result_height = self.runner_seg_size[1]
-        color_frame = cv2.resize(
-            color_frame, self.runner_seg_size, interpolation=cv2.INTER_LINEAR
-        )
         result = await asyncio.get_running_loop().run_in_executor(
-            None,
+            self._runner_seg_executor,
             functools.partial(
-                self.runner_seg_model.track,
-                color_frame,
+                self._run_model,
+                "runner_seg",
+                functools.partial(
+                    self.runner_seg_model.track,
+                    mask_format=self.camera_control_params.runner_mask_format,
+                ),
+                frame,
+                self.runner_seg_size,
+                model_input,
             ),
         )
         result_conf = result["conf"]
@@ -599,9 +1433,10 @@ class CameraControlNode:
             conf = result_conf[idx]
             if conf >= conf_threshold:
                 mask = result["masks"][idx]
-                # Scale the result coords to frame coords
-                mask[:, 0] *= frame_width / result_width
-                mask[:, 1] *= frame_height / result_height
+                if self.camera_control_params.runner_mask_format == "polygons":
+                    # Scale the result coords to frame coords. Bitmaps stay at the model scale
+                    mask[:, 0] *= frame_width / result_width
+                    mask[:, 1] *= frame_height / result_height
                 runner_masks.append(mask)
                 confs.append(conf)
                 track_ids.append(
@@ -614,36 +1449,78 @@ class CameraControlNode:
         return runner_masks, confs, track_ids
 
     async def _get_runner_centers(
-        self, runner_masks: List[np.ndarray]
-    ) -> List[Tuple[int, int]]:
-        runner_centers = []
-        for mask in runner_masks:
-            runner_center = await asyncio.get_running_loop().run_in_executor(
-                None,
-                functools.partial(
-                    contour_center,
-                    mask,
-                ),
-            )
-            runner_centers.append(
-                (runner_center[0], runner_center[1]) if runner_center else None
-            )
-        return runner_centers
+        self, runner_masks: List[np.ndarray], frame_size: Tuple[int, int]
+    ) -> List[Optional[Tuple[float, float]]]:
+        def get_runner_centers():
+            with self.detection_timings.time("runner_centers"):
+                if self.camera_control_params.runner_mask_format == "bitmaps":
+                    return get_runner_centers_from_bitmaps()
+                return [
+                    (
+                        (runner_center[0], runner_center[1])
+                        if runner_center is not None
+                        else None
+                    )
+                    for runner_center in contour_centers(
+                        runner_masks, self.camera_control_params.runner_center_method
+                    )
+                ]
+
+        def get_runner_centers_from_bitmaps():
+            if not runner_masks:
+                return []
+            masks = np.stack(runner_masks)
+            mask_size = (masks.shape[2], masks.shape[1])
+            return [
+                (
+                    tuple(scale_mask_points([runner_center], mask_size, frame_size)[0])
+                    if runner_center is not None
+                    else None
+                )
+                for runner_center in mask_centers(
+                    masks, self.camera_control_params.runner_center_method
+                )
+            ]
+
+        # Computed in one pass on the runner segmentation executor, which is idle at this point
+        return await asyncio.get_running_loop().run_in_executor(
+            self._runner_seg_executor, get_runner_centers
+        )
 
     ## region Message builders
 
-    def _create_detection_result_msg(
+    async def _create_detection_result_msg(
         self,
-        points: List[Tuple[int, int]],
+        points: List[Optional[Tuple[float, float]]],
         frame: RgbdFrame,
         track_ids: Optional[List[int]] = None,
+        timing_stage: Optional[str] = None,
     ) -> DetectionResult:
+        # When timing_stage is given, the time spent building the msg is recorded under it. It
+        # excludes the position lookup, which is timed on its executor as "positions"
+
+        # Skip points that could not be found (e.g. runners without a center), keeping track IDs
+        # aligned with the points
+        if track_ids is not None:
+            track_ids = [
+                track_id
+                for point, track_id in zip(points, track_ids)
+                if point is not None
+            ]
+        points = [point for point in points if point is not None]
+
+        # Off the event loop, as the lookup may align and filter the depth frame if it has not been
+        # processed yet
+        positions = await asyncio.get_running_loop().run_in_executor(
+            None, self._get_positions, frame, np.array(points).reshape(-1, 2)
+        )
+
+        build_start = time.perf_counter()
         msg = DetectionResult()
         msg.timestamp = frame.timestamp_millis / 1000
-        for idx, point in enumerate(points):
+        for idx, (point, position) in enumerate(zip(points, positions)):
             point_msg = Vector2(x=float(point[0]), y=float(point[1]))
-            position = frame.get_position(point)
-            if position is not None:
+            if not np.isnan(position).any():
                 object_instance = ObjectInstance()
                 object_instance.track_id = (
                     track_ids[idx]
@@ -651,17 +1528,53 @@ class CameraControlNode:
                     else -1
                 )
                 object_instance.position = Vector3(
-                    x=position[0], y=position[1], z=position[2]
+                    x=float(position[0]), y=float(position[1]), z=float(position[2])
                 )
                 object_instance.point = point_msg
                 msg.instances.append(object_instance)
             else:
                 msg.invalid_points.append(point_msg)
+        if timing_stage is not None:
+            self.detection_timings.record(
+                timing_stage, (time.perf_counter() - build_start) * 1000
+            )
         self.log(
             f"{len(msg.instances)} instances had valid positions, out of {len(points)} total detected"
         )
         return msg
 
+    def _get_positions(self, frame: RgbdFrame, pixels: np.ndarray) -> np.ndarray:
+        # Runs on the default executor
+        with self.detection_timings.time("positions"):
+            return frame.get_positions(pixels)
+
+    def _create_diagnostic_status_msg(
+        self, name: str, values: Dict[str, Any], level: bytes = DiagnosticStatus.OK
+    ) -> DiagnosticStatus:
+        msg = DiagnosticStatus()
+        msg.level = level
+        msg.name = f"{self.get_name()}: {name}"
+        msg.values = [
+            KeyValue(
+                key=key,
+                value=f"{value:.3f}" if isinstance(value, float) else str(value),
+            )
+            for key, value in values.items()
+        ]
+        return msg
+
+    def _create_timings_diagnostic_status_msg(
+        self, name: str, timings_ms: Dict[str, Dict[str, float]]
+    ) -> DiagnosticStatus:
+        return self._create_diagnostic_status_msg(
+            name,
+            {
+                f"{stage}_{stat}_ms": value
+                for stage, stage_timings in timings_ms.items()
+                for stat, value in stage_timings.items()
+            },
+        )
+
     def _get_color_frame_msg(
         self, color_frame: np.ndarray, timestamp_millis: float
     ) -> Image:
@@ -681,12 +1594,10 @@ class CameraControlNode:
         return msg
 
     def _get_color_frame_compressed_msg(
-        self, color_frame: np.ndarray, timestamp_millis: float
+        self, color_frame: np.ndarray, timestamp_millis: float, jpeg_quality: int = 95
     ) -> CompressedImage:
         sec, nanosec = milliseconds_to_ros_time(timestamp_millis)
-        _, jpeg_data = cv2.imencode(
-            ".jpg", cv2.cvtColor(color_frame, cv2.COLOR_RGB2BGR)
-        )
+        jpeg_data = encode_image(color_frame, ImageFormat.JPEG, jpeg_quality)
         msg = CompressedImage()
         msg.format = "jpeg"
         msg.data = jpeg_data.tobytes()
@@ -729,14 +1640,18 @@ class CameraControlNode:
         draw_conf=True,
         draw_track_id=True,
     ):
+        draw_bitmaps = self.camera_control_params.runner_mask_format == "bitmaps"
+        if draw_bitmaps and runner_masks:
+            debug_frame = overlay_masks(debug_frame, np.stack(runner_masks), mask_color)
         for runner_mask, runner_center, conf, track_id in zip(
             runner_masks, runner_centers, confs, track_ids
         ):
-            debug_frame = cv2.fillPoly(
-                debug_frame,
-                pts=[np.array(runner_mask, dtype=np.int32)],
-                color=mask_color,
-            )
+            if not draw_bitmaps:
+                debug_frame = cv2.fillPoly(
+                    debug_frame,
+                    pts=[np.array(runner_mask, dtype=np.int32)],
+                    color=mask_color,
+                )
             if runner_center is not None:
                 pos = [int(runner_center[0]), int(runner_center[1])]
                 debug_frame = cv2.drawMarker(
@@ -747,6 +1662,8 @@ class CameraControlNode:
                     thickness=3,
                     markerSize=20,
                 )
+            if runner_center is None:
+                continue
             if draw_conf:
                 pos = [int(runner_center[0]) + 15, int(runner_center[1]) - 5]
                 font = cv2.FONT_HERSHEY_SIMPLEX
@@ -0,0 +1,93 @@
+import asyncio
+from dataclasses import dataclass, replace
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+
+@dataclass
+class DetectionCacheStats:
+    # Detections served from a computed or in-flight result
+    num_hits: int = 0
+    # Detections that had to be computed
+    num_misses: int = 0
+
+
+class DetectionCache:
+    """
+    Detection results for the latest frame, keyed by frame timestamp and detection key (e.g. which
+    model ran). Results are stored as tasks as soon as a detection starts, so that a caller asking
+    for a detection that is still in flight waits for it instead of running the models on the same
+    frame again. Results of older frames are evicted when a newer frame is requested. Must only be
+    used from the event loop.
+    """
+
+    def __init__(self):
+        self._timestamp_millis: Optional[float] = None
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self._stats = DetectionCacheStats()
+
+    @property
+    def stats(self) -> DetectionCacheStats:
+        """
+        Returns:
+            DetectionCacheStats: Snapshot of the cache counters.
+        """
+        return replace(self._stats)
+
+    def contains(self, key: Hashable, timestamp_millis: float) -> bool:
+        """
+        Args:
+            key (Hashable): Detection key.
+            timestamp_millis (float): Timestamp of the frame.
+
+        Returns:
+            bool: Whether the detection for the frame has been computed or is in flight.
+        """
+        return timestamp_millis == self._timestamp_millis and key in self._tasks
+
+    def get(
+        self,
+        key: Hashable,
+        timestamp_millis: float,
+        detect: Callable[[], Awaitable[Any]],
+    ) -> Awaitable[Any]:
+        """
+        Get the detection for a frame, starting it if it has not been computed and is not in flight.
+
+        Args:
+            key (Hashable): Detection key.
+            timestamp_millis (float): Timestamp of the frame.
+            detect (Callable[[], Awaitable[Any]]): Function that starts the detection on the frame.
+
+        Returns:
+            Awaitable[Any]: Detection result. Cancelling it does not cancel the detection, which other callers may be waiting for.
+        """
+        if (
+            self._timestamp_millis is not None
+            and timestamp_millis < self._timestamp_millis
+        ):
+            # Do not evict results of a newer frame for an older one
+            self._stats.num_misses += 1
+            return detect()
+
+        if timestamp_millis != self._timestamp_millis:
+            self._timestamp_millis = timestamp_millis
+            self._tasks = {}
+
+        task = self._tasks.get(key)
+        if task is None:
+            self._stats.num_misses += 1
+            task = asyncio.ensure_future(detect())
+            task.add_done_callback(
+                lambda task: self._on_done(key, timestamp_millis, task)
+            )
+            self._tasks[key] = task
+        else:
+            self._stats.num_hits += 1
+        return asyncio.shield(task)
+
+    def _on_done(self, key: Hashable, timestamp_millis: float, task: asyncio.Task):
+        # Do not cache failures, so that the next caller retries the detection
+        if not task.cancelled() and task.exception() is None:
+            return
+        if timestamp_millis == self._timestamp_millis and self._tasks.get(key) is task:
+            del self._tasks[key]
@@ -0,0 +1,228 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from enum import Enum
+from typing import Callable, Deque, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class ImageFormat(Enum):
+    PNG = "png"
+    JPEG = "jpg"
+    WEBP = "webp"
+
+    @property
+    def extension(self) -> str:
+        return f".{self.value}"
+
+
+def encode_image(
+    image: np.ndarray, image_format: ImageFormat, quality: int = 95
+) -> np.ndarray:
+    """
+    Encode an RGB image.
+
+    Args:
+        image (np.ndarray): RGB image.
+        image_format (ImageFormat): Format to encode the image in.
+        quality (int): Quality from 0 to 100 for lossy formats. For PNG, quality is mapped to the compression level, where lower quality means faster, larger output.
+
+    Returns:
+        np.ndarray: 1D uint8 array of the encoded image.
+    """
+    if image_format == ImageFormat.JPEG:
+        params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+    elif image_format == ImageFormat.WEBP:
+        params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+    else:
+        params = [cv2.IMWRITE_PNG_COMPRESSION, round((100 - quality) * 9 / 100)]
+
+    success, data = cv2.imencode(
+        image_format.extension, cv2.cvtColor(image, cv2.COLOR_RGB2BGR), params
+    )
+    if not success:
+        raise RuntimeError(f"Failed to encode image as {image_format.name}")
+    return data
+
+
+def write_image(
+    path: str, image: np.ndarray, image_format: ImageFormat, quality: int = 95
+):
+    """
+    Encode an RGB image and write it to disk.
+
+    Args:
+        path (str): Path to write the image to.
+        image (np.ndarray): RGB image.
+        image_format (ImageFormat): Format to encode the image in.
+        quality (int): Quality from 0 to 100. See encode_image.
+    """
+    data = encode_image(image, image_format, quality)
+    with open(path, "wb") as f:
+        f.write(data.tobytes())
+
+
+@dataclass
+class EncoderWorkerStats:
+    num_jobs_completed: int = 0
+    num_jobs_dropped: int = 0
+    num_jobs_failed: int = 0
+    queue_depth: int = 0
+    last_encode_ms: float = 0.0
+    mean_encode_ms: float = 0.0
+
+
+class EncoderWorker:
+    """
+    Runs encoding jobs (image saves, video frame writes) on background threads so that they do not
+    block the event loop. Jobs wait in a bounded queue. When the queue is full, the oldest waiting
+    droppable job is dropped to make room, as the newest frames are the most relevant. Control jobs
+    (e.g. releasing a video writer) are submitted as non-droppable and are always run.
+
+    Jobs are started in submission order. With a single thread, they also complete in submission
+    order, which is required for stateful jobs such as writing frames to a video.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_queue_size: int = 4,
+        num_threads: int = 1,
+        logger: Optional[logging.Logger] = None,
+    ):
+        """
+        Args:
+            name (str): Name of the worker, used for thread names and logging.
+            max_queue_size (int): Max number of jobs waiting to be run.
+            num_threads (int): Number of worker threads.
+            logger (Optional[logging.Logger]): Logger
+        """
+        self.name = name
+        self._max_queue_size = max_queue_size
+        self._num_threads = num_threads
+        if logger:
+            self._logger = logger
+        else:
+            self._logger = logging.getLogger(__name__)
+            self._logger.setLevel(logging.INFO)
+
+        self._cv = threading.Condition()
+        # (job, droppable)
+        self._queue: Deque[Tuple[Callable[[], None], bool]] = deque()
+        self._is_running = False
+        self._threads: List[threading.Thread] = []
+        self._stats = EncoderWorkerStats()
+        self._total_encode_ms = 0.0
+
+    @property
+    def stats(self) -> EncoderWorkerStats:
+        """
+        Returns:
+            EncoderWorkerStats: Snapshot of the job counters and encode times.
+        """
+        with self._cv:
+            return EncoderWorkerStats(
+                num_jobs_completed=self._stats.num_jobs_completed,
+                num_jobs_dropped=self._stats.num_jobs_dropped,
+                num_jobs_failed=self._stats.num_jobs_failed,
+                queue_depth=len(self._queue),
+                last_encode_ms=self._stats.last_encode_ms,
+                mean_encode_ms=(
+                    self._total_encode_ms / self._stats.num_jobs_completed
+                    if self._stats.num_jobs_completed > 0
+                    else 0.0
+                ),
+            )
+
+    def start(self):
+        """
+        Start the worker threads.
+        """
+        if self._is_running:
+            return
+
+        self._is_running = True
+        self._threads = [
+            threading.Thread(
+                target=self._worker_thread_fn, name=f"{self.name}_{idx}", daemon=True
+            )
+            for idx in range(self._num_threads)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self):
+        """
+        Stop accepting jobs, and block until all queued jobs have been run.
+        """
+        if not self._is_running:
+            return
+
+        with self._cv:
+            self._is_running = False
+            self._cv.notify_all()
+
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, job: Callable[[], None], droppable: bool = True) -> bool:
+        """
+        Queue a job. Never blocks on the job itself.
+
+        Args:
+            job (Callable[[], None]): Job to run on a worker thread.
+            droppable (bool): Whether the job may be dropped to make room for newer jobs. Non-droppable jobs are queued even when the queue is full.
+
+        Returns:
+            bool: Whether the job was queued.
+        """
+        with self._cv:
+            if not self._is_running:
+                return False
+
+            if len(self._queue) >= self._max_queue_size:
+                drop_idx = next(
+                    (
+                        idx
+                        for idx, (_, queued_droppable) in enumerate(self._queue)
+                        if queued_droppable
+                    ),
+                    None,
+                )
+                if drop_idx is not None:
+                    del self._queue[drop_idx]
+                    self._stats.num_jobs_dropped += 1
+
+            self._queue.append((job, droppable))
+            self._cv.notify()
+            return True
+
+    def _worker_thread_fn(self):
+        while True:
+            with self._cv:
+                while self._is_running and not self._queue:
+                    self._cv.wait()
+                if not self._queue:
+                    # Stopped and fully drained
+                    return
+                job, _ = self._queue.popleft()
+
+            start = time.perf_counter()
+            try:
+                job()
+            except Exception as e:
+                self._logger.error(f"{self.name} job failed: {e}")
+                with self._cv:
+                    self._stats.num_jobs_failed += 1
+                continue
+            encode_ms = (time.perf_counter() - start) * 1000
+
+            with self._cv:
+                self._stats.num_jobs_completed += 1
+                self._stats.last_encode_ms = encode_ms
+                self._total_encode_ms += encode_ms
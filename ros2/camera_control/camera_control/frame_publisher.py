@@ -0,0 +1,107 @@
+import asyncio
+import time
+from typing import Callable
+
+import numpy as np
+from sensor_msgs.msg import CompressedImage, Image
+
+
+class RateLimiter:
+    """
+    Allows an event at most once per interval.
+    """
+
+    def __init__(self, max_rate_hz: float):
+        """
+        Args:
+            max_rate_hz (float): Max rate of events. A non-positive value means no limit.
+        """
+        self._min_interval_secs = 1.0 / max_rate_hz if max_rate_hz > 0.0 else 0.0
+        self._last_event_time = None
+
+    def try_acquire(self) -> bool:
+        """
+        Returns:
+            bool: Whether an event is allowed now. If so, the event is counted against the limit.
+        """
+        now = time.monotonic()
+        if (
+            self._last_event_time is not None
+            and now - self._last_event_time < self._min_interval_secs
+        ):
+            return False
+
+        self._last_event_time = now
+        return True
+
+
+class FramePublisher:
+    """
+    Publishes frames to an Image topic and its CompressedImage variant. Publishing is rate limited,
+    messages are only built for topics that have subscribers, and messages are built off the event
+    loop and published as-is.
+    """
+
+    def __init__(
+        self,
+        image_topic,
+        compressed_image_topic,
+        create_image_msg: Callable[[np.ndarray, float], Image],
+        create_compressed_image_msg: Callable[[np.ndarray, float], CompressedImage],
+        max_fps: float = 0.0,
+    ):
+        """
+        Args:
+            image_topic: Publisher for the Image topic.
+            compressed_image_topic: Publisher for the CompressedImage topic.
+            create_image_msg (Callable[[np.ndarray, float], Image]): Builds an Image message from an RGB frame and its timestamp in milliseconds.
+            create_compressed_image_msg (Callable[[np.ndarray, float], CompressedImage]): Builds a CompressedImage message from an RGB frame and its timestamp in milliseconds.
+            max_fps (float): Max rate at which to publish frames. A non-positive value means no limit.
+        """
+        self._image_topic = image_topic
+        self._compressed_image_topic = compressed_image_topic
+        self._create_image_msg = create_image_msg
+        self._create_compressed_image_msg = create_compressed_image_msg
+        self._rate_limiter = RateLimiter(max_fps)
+
+    @property
+    def has_subscribers(self) -> bool:
+        """
+        Returns:
+            bool: Whether either topic has subscribers.
+        """
+        return (
+            self._image_topic.pub.get_subscription_count() > 0
+            or self._compressed_image_topic.pub.get_subscription_count() > 0
+        )
+
+    def should_publish(self) -> bool:
+        """
+        Check whether a frame should be published now, so that callers can skip preparing frames
+        that would not be published. A True result is counted against the rate limit.
+
+        Returns:
+            bool: Whether a frame should be published now.
+        """
+        return self.has_subscribers and self._rate_limiter.try_acquire()
+
+    async def publish(self, frame: np.ndarray, timestamp_millis: float):
+        """
+        Build and publish messages for the topics that have subscribers. The frame must not be
+        modified until this returns.
+
+        Args:
+            frame (np.ndarray): RGB frame.
+            timestamp_millis (float): Timestamp of the frame, in milliseconds.
+        """
+        loop = asyncio.get_running_loop()
+        if self._image_topic.pub.get_subscription_count() > 0:
+            msg = await loop.run_in_executor(
+                None, self._create_image_msg, frame, timestamp_millis
+            )
+            await self._image_topic(msg)
+        if self._compressed_image_topic.pub.get_subscription_count() > 0:
+            msg = await loop.run_in_executor(
+                None, self._create_compressed_image_msg, frame, timestamp_millis
+            )
+            await self._compressed_image_topic(msg)
@@ -0,0 +1,213 @@
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@dataclass
+class LaserSpot:
+    # Intensity-weighted centroid of the spot in frame pixel coords, with sub-pixel precision
+    point: Tuple[float, float]
+    conf: float
+    # Number of pixels above the threshold
+    area: int
+    # Max channel value in the spot
+    peak_intensity: int
+
+
+@dataclass
+class LaserSpotDetection:
+    # Spots sorted by descending conf
+    spots: List[LaserSpot] = field(default_factory=list)
+    # Whether the result should not be trusted, in which case a model-based detector should be used
+    ambiguous: bool = False
+    # Why the result is ambiguous
+    reason: Optional[str] = None
+
+
+def _find_runs(values: np.ndarray) -> List[Tuple[int, int]]:
+    """
+    Args:
+        values (np.ndarray): 1D bool array.
+
+    Returns:
+        List[Tuple[int, int]]: [start, end) index ranges of consecutive True values.
+    """
+    padded = np.concatenate(([False], values, [False])).astype(np.int8)
+    changes = np.flatnonzero(np.diff(padded))
+    return list(zip(changes[::2].tolist(), changes[1::2].tolist()))
+
+
+class LaserSpotDetector:
+    """
+    Classical laser spot detector for frames captured with laser detection camera settings (minimal
+    exposure and gain), in which the laser spot is the only bright object. Thresholds the frame,
+    finds connected components, and computes each component's intensity-weighted centroid. Runs
+    in a few milliseconds on a full resolution frame, as the full frame is only scanned with
+    vectorized operations and per-pixel work is limited to the bright regions.
+    """
+
+    def __init__(
+        self,
+        min_intensity: int = 128,
+        relative_threshold: float = 0.5,
+        min_area: int = 2,
+        max_area: int = 2500,
+        max_spots: int = 1,
+        min_conf: float = 0.5,
+        max_bright_fraction: float = 0.01,
+    ):
+        """
+        Args:
+            min_intensity (int): Min channel value of a laser spot pixel.
+            relative_threshold (float): Min channel value of a laser spot pixel as a fraction of the frame's max channel value. Adapts the threshold to the spot's brightness so that its halo is excluded.
+            min_area (int): Min number of pixels in a spot. Filters out hot pixels and noise.
+            max_area (int): Max number of pixels in a spot. Filters out reflections and lit surfaces.
+            max_spots (int): Max number of spots expected in a frame. More spots make the result ambiguous.
+            min_conf (float): Spots below this conf make the result ambiguous.
+            max_bright_fraction (float): Max fraction of pixels above the threshold. Above this, the frame is considered not dark enough for the classical detector and the result is ambiguous.
+        """
+        self.min_intensity = min_intensity
+        self.relative_threshold = relative_threshold
+        self.min_area = min_area
+        self.max_area = max_area
+        self.max_spots = max_spots
+        self.min_conf = min_conf
+        self.max_bright_fraction = max_bright_fraction
+
+    def detect(
+        self, color_frame: np.ndarray, reference_area: Optional[int] = None
+    ) -> LaserSpotDetection:
+        """
+        Detect laser spots in a frame.
+
+        Args:
+            color_frame (np.ndarray): (height, width, channels) uint8 frame.
+            reference_area (Optional[int]): Number of pixels that max_bright_fraction is relative to. Defaults to the area of color_frame. When color_frame is a crop, pass the area of the full frame so that the crop is allowed the same number of bright pixels as the full frame.
+
+        Returns:
+            LaserSpotDetection: Detected spots and whether the result is ambiguous.
+        """
+        height, width, num_channels = color_frame.shape
+        # View channels as interleaved columns so that full frame operations run on all channels
+        # at once, without computing a per-pixel max over channels
+        interleaved = color_frame.reshape(height, width * num_channels)
+
+        _, peak_intensity, _, _ = cv2.minMaxLoc(interleaved)
+        if peak_intensity < self.min_intensity:
+            # Nothing bright in the frame, e.g. the laser is off
+            return LaserSpotDetection()
+
+        threshold = max(self.min_intensity, peak_intensity * self.relative_threshold)
+        _, binary = cv2.threshold(interleaved, threshold, 255, cv2.THRESH_BINARY)
+        if reference_area is None:
+            reference_area = height * width
+        bright_fraction = cv2.countNonZero(binary) / (reference_area * num_channels)
+        if bright_fraction > self.max_bright_fraction:
+            return LaserSpotDetection(
+                ambiguous=True,
+                reason=f"{bright_fraction:.2%} of pixels are bright, frame is not dark enough",
+            )
+
+        # Split the bright pixels into regions: bands of consecutive rows with bright pixels, then
+        # runs of consecutive columns with bright pixels within each band. A connected component
+        # lies entirely within one region, so components can be found per region
+        spots = []
+        num_candidates = 0
+        for row_start, row_end in _find_runs(binary.any(axis=1)):
+            band = binary[row_start:row_end].reshape(
+                row_end - row_start, width, num_channels
+            )
+            for col_start, col_end in _find_runs(band.any(axis=(0, 2))):
+                region_spots, region_num_candidates = self._detect_in_region(
+                    color_frame[row_start:row_end, col_start:col_end],
+                    threshold,
+                    (col_start, row_start),
+                )
+                spots.extend(region_spots)
+                num_candidates += region_num_candidates
+
+        spots.sort(key=lambda spot: spot.conf, reverse=True)
+        if not spots:
+            return LaserSpotDetection(
+                ambiguous=True,
+                reason=f"None of {num_candidates} bright regions look like a laser spot",
+            )
+        if len(spots) > self.max_spots:
+            return LaserSpotDetection(
+                spots,
+                ambiguous=True,
+                reason=f"Found {len(spots)} spots, expected at most {self.max_spots}",
+            )
+        if spots[-1].conf < self.min_conf:
+            return LaserSpotDetection(
+                spots,
+                ambiguous=True,
+                reason=f"Spot conf {spots[-1].conf:.2f} is below {self.min_conf}",
+            )
+        return LaserSpotDetection(spots)
+
+    def _detect_in_region(
+        self, region: np.ndarray, threshold: float, offset: Tuple[int, int]
+    ) -> Tuple[List[LaserSpot], int]:
+        """
+        Args:
+            region (np.ndarray): (height, width, channels) region of the frame.
+            threshold (float): Channel value above which a pixel is bright.
+            offset (Tuple[int, int]): (x, y) of the region's top left pixel in the frame.
+
+        Returns:
+            Tuple[List[LaserSpot], int]: Spots in the region, and number of connected components in the region.
+        """
+        intensity = region.max(axis=2)
+        mask = (intensity > threshold).astype(np.uint8)
+        num_labels, labels, stats, _ = cv2.connectedComponentsWithStats(
+            mask, connectivity=8
+        )
+
+        spots = []
+        # Label 0 is the background
+        for label in range(1, num_labels):
+            left, top, bbox_width, bbox_height, area = stats[label]
+            if area < self.min_area or area > self.max_area:
+                continue
+
+            ys, xs = np.nonzero(
+                labels[top : top + bbox_height, left : left + bbox_width] == label
+            )
+            values = intensity[top + ys, left + xs]
+            # Subtract the threshold so that the centroid is weighted towards the spot's core
+            # rather than its edges
+            weights = values.astype(np.float64) - threshold
+            total_weight = weights.sum()
+            center_x = left + np.dot(weights, xs) / total_weight
+            center_y = top + np.dot(weights, ys) / total_weight
+
+            peak_intensity = int(values.max())
+            spots.append(
+                LaserSpot(
+                    point=(float(offset[0] + center_x), float(offset[1] + center_y)),
+                    conf=self._get_conf(peak_intensity, area, bbox_width, bbox_height),
+                    area=int(area),
+                    peak_intensity=peak_intensity,
+                )
+            )
+        return spots, num_labels - 1
+
+    def _get_conf(
+        self, peak_intensity: int, area: int, bbox_width: int, bbox_height: int
+    ) -> float:
+        """
+        Heuristic conf of a spot in [0, 1], based on how bright, compact, and round it is. A laser
+        spot at minimal exposure is a small, bright, round blob, whereas reflections and lit
+        surfaces tend to be dimmer, irregular, or elongated.
+        """
+        brightness = peak_intensity / 255.0
+        # Ratio of the area to that of the ellipse inscribed in the bbox
+        compactness = min(1.0, area / (np.pi / 4.0 * bbox_width * bbox_height))
+        # Offset by 1 so that a spot a few pixels in size is not penalized for pixel quantization
+        roundness = (min(bbox_width, bbox_height) + 1) / (
+            max(bbox_width, bbox_height) + 1
+        )
+        return float((brightness * compactness * roundness) ** (1.0 / 3.0))
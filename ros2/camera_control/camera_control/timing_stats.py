@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict
+
+import numpy as np
+
+PERCENTILES = (50, 95, 99)
+
+
+class TimingStats:
+    """
+    Running duration stats per named stage. Thread-safe, so stages may be timed from worker threads.
+    Besides the mean and last durations, percentiles are computed over a rolling window of the most
+    recent durations of each stage. Recording is O(1); percentiles are only computed on read.
+    """
+
+    def __init__(self, window_size: int = 1000):
+        """
+        Args:
+            window_size (int): Number of most recent durations per stage that percentiles are computed over.
+        """
+        self._window_size = window_size
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+        self._total_durations_ms: Dict[str, float] = {}
+        self._last_durations_ms: Dict[str, float] = {}
+        self._recent_durations_ms: Dict[str, Deque[float]] = {}
+
+    def record(self, stage: str, duration_ms: float):
+        """
+        Record a duration for a stage.
+
+        Args:
+            stage (str): Name of the stage.
+            duration_ms (float): Duration in milliseconds.
+        """
+        with self._lock:
+            self._counts[stage] = self._counts.get(stage, 0) + 1
+            self._total_durations_ms[stage] = (
+                self._total_durations_ms.get(stage, 0.0) + duration_ms
+            )
+            self._last_durations_ms[stage] = duration_ms
+            recent_durations_ms = self._recent_durations_ms.get(stage)
+            if recent_durations_ms is None:
+                recent_durations_ms = deque(maxlen=self._window_size)
+                self._recent_durations_ms[stage] = recent_durations_ms
+            recent_durations_ms.append(duration_ms)
+
+    @contextmanager
+    def time(self, stage: str):
+        """
+        Context manager that records the duration of its body for a stage.
+
+        Args:
+            stage (str): Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - start) * 1000)
+
+    def get_counts(self) -> Dict[str, int]:
+        """
+        Returns:
+            Dict[str, int]: For each stage, the number of durations recorded.
+        """
+        with self._lock:
+            return dict(self._counts)
+
+    def get_timings_ms(self) -> Dict[str, Dict[str, float]]:
+        """
+        Returns:
+            Dict[str, Dict[str, float]]: For each stage, the mean and last durations, and the p50, p95, and p99 durations over the rolling window, in milliseconds.
+        """
+        with self._lock:
+            snapshot = {
+                stage: (
+                    self._total_durations_ms[stage] / count,
+                    self._last_durations_ms[stage],
+                    list(self._recent_durations_ms[stage]),
+                )
+                for stage, count in self._counts.items()
+            }
+
+        # Compute percentiles outside of the lock so that recording is not blocked
+        timings_ms = {}
+        for stage, (mean, last, recent_durations_ms) in snapshot.items():
+            percentiles = np.percentile(recent_durations_ms, PERCENTILES)
+            timings_ms[stage] = {"mean": mean, "last": last}
+            for percentile, value in zip(PERCENTILES, percentiles):
+                timings_ms[stage][f"p{percentile}"] = float(value)
+        return timings_ms
@@ -0,0 +1,138 @@
+import asyncio
+
+import pytest
+
+from camera_control.detection_cache import DetectionCache
+
+
+class FakeDetector:
+    """
+    Detection that counts its runs and completes when released, so that tests control when
+    detections are in flight.
+    """
+
+    def __init__(self, result="detection", fail_times: int = 0):
+        self._result = result
+        self._fail_times = fail_times
+        self.num_runs = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.num_runs += 1
+        await self.release.wait()
+        if self.num_runs <= self._fail_times:
+            raise RuntimeError("Detection failed")
+        return self._result
+
+
+def test_dedupes_in_flight_detections():
+    async def run():
+        cache = DetectionCache()
+        detector = FakeDetector()
+
+        first = cache.get("laser", 1.0, detector)
+        second = cache.get("laser", 1.0, detector)
+        assert cache.contains("laser", 1.0)
+        detector.release.set()
+
+        assert await asyncio.gather(first, second) == ["detection", "detection"]
+        assert detector.num_runs == 1
+        # Completed detections are served from the cache
+        assert await cache.get("laser", 1.0, detector) == "detection"
+        assert detector.num_runs == 1
+        stats = cache.stats
+        assert stats.num_misses == 1
+        assert stats.num_hits == 2
+
+    asyncio.run(run())
+
+
+def test_keys_are_independent():
+    async def run():
+        cache = DetectionCache()
+        laser_detector = FakeDetector("laser")
+        runner_detector = FakeDetector("runner")
+        laser_detector.release.set()
+        runner_detector.release.set()
+
+        assert await cache.get("laser", 1.0, laser_detector) == "laser"
+        assert await cache.get("runner", 1.0, runner_detector) == "runner"
+        assert not cache.contains("laser_roi", 1.0)
+
+    asyncio.run(run())
+
+
+def test_newer_frame_evicts_older_results():
+    async def run():
+        cache = DetectionCache()
+        detector = FakeDetector()
+        detector.release.set()
+
+        await cache.get("laser", 1.0, detector)
+        await cache.get("laser", 2.0, detector)
+
+        assert not cache.contains("laser", 1.0)
+        assert cache.contains("laser", 2.0)
+        assert detector.num_runs == 2
+
+    asyncio.run(run())
+
+
+def test_older_frame_does_not_evict_newer_results():
+    async def run():
+        cache = DetectionCache()
+        detector = FakeDetector()
+        detector.release.set()
+        await cache.get("laser", 2.0, detector)
+
+        # Detection on an older frame runs without being cached
+        assert await cache.get("laser", 1.0, detector) == "detection"
+
+        assert cache.contains("laser", 2.0)
+        assert not cache.contains("laser", 1.0)
+        assert detector.num_runs == 2
+        assert cache.stats.num_misses == 2
+
+    asyncio.run(run())
+
+
+def test_evicts_failed_detections():
+    async def run():
+        cache = DetectionCache()
+        detector = FakeDetector(fail_times=1)
+
+        first = cache.get("laser", 1.0, detector)
+        # Waits on the in-flight detection, which fails for every waiter
+        second = cache.get("laser", 1.0, detector)
+        detector.release.set()
+        results = await asyncio.gather(first, second, return_exceptions=True)
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert detector.num_runs == 1
+        assert not cache.contains("laser", 1.0)
+        # The next caller retries the detection
+        assert await cache.get("laser", 1.0, detector) == "detection"
+        assert detector.num_runs == 2
+        assert cache.contains("laser", 1.0)
+
+    asyncio.run(run())
+
+
+def test_cancelling_a_waiter_does_not_cancel_the_detection():
+    async def run():
+        cache = DetectionCache()
+        detector = FakeDetector()
+
+        first = asyncio.ensure_future(cache.get("laser", 1.0, detector))
+        second = cache.get("laser", 1.0, detector)
+        await asyncio.sleep(0)
+        first.cancel()
+        detector.release.set()
+
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        assert await second == "detection"
+        assert detector.num_runs == 1
+        assert cache.contains("laser", 1.0)
+
+    asyncio.run(run())
@@ -0,0 +1,142 @@
+import threading
+
+import cv2
+import numpy as np
+import pytest
+
+from camera_control.encoder_worker import (
+    EncoderWorker,
+    ImageFormat,
+    encode_image,
+    write_image,
+)
+
+
+def _block_worker(worker: EncoderWorker) -> threading.Event:
+    # Occupy the single worker thread until the returned event is set, so that submitted jobs stay
+    # queued
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking_job():
+        started.set()
+        release.wait()
+
+    assert worker.submit(blocking_job, droppable=False)
+    assert started.wait(5.0)
+    return release
+
+
+def test_drops_oldest_droppable_job_when_full():
+    worker = EncoderWorker("test", max_queue_size=3, num_threads=1)
+    worker.start()
+    release = _block_worker(worker)
+    run_job_ids = []
+
+    for job_id in range(5):
+        assert worker.submit(lambda job_id=job_id: run_job_ids.append(job_id))
+    stats = worker.stats
+    release.set()
+    worker.stop()
+
+    assert stats.queue_depth == 3
+    assert stats.num_jobs_dropped == 2
+    assert run_job_ids == [2, 3, 4]
+    stats = worker.stats
+    # Includes the blocking job
+    assert stats.num_jobs_completed == 4
+    assert stats.num_jobs_dropped == 2
+    assert stats.queue_depth == 0
+
+
+def test_never_drops_control_jobs():
+    worker = EncoderWorker("test", max_queue_size=3, num_threads=1)
+    worker.start()
+    release = _block_worker(worker)
+    run_job_ids = []
+
+    def submit(job_id, droppable=True):
+        assert worker.submit(lambda: run_job_ids.append(job_id), droppable=droppable)
+
+    submit("frame_0")
+    submit("release_writer", droppable=False)
+    submit("frame_1")
+    # Each of these drops the oldest droppable job, skipping the control job
+    submit("frame_2")
+    submit("frame_3")
+    release.set()
+    worker.stop()
+
+    assert run_job_ids == ["release_writer", "frame_2", "frame_3"]
+    assert worker.stats.num_jobs_dropped == 2
+
+
+def test_queues_control_jobs_beyond_max_queue_size():
+    worker = EncoderWorker("test", max_queue_size=2, num_threads=1)
+    worker.start()
+    release = _block_worker(worker)
+    run_job_ids = []
+
+    for job_id in range(3):
+        assert worker.submit(
+            lambda job_id=job_id: run_job_ids.append(job_id), droppable=False
+        )
+    stats = worker.stats
+    release.set()
+    worker.stop()
+
+    assert stats.queue_depth == 3
+    assert stats.num_jobs_dropped == 0
+    assert run_job_ids == [0, 1, 2]
+
+
+def test_counts_failed_jobs():
+    worker = EncoderWorker("test", num_threads=1)
+    worker.start()
+
+    def failing_job():
+        raise RuntimeError("Encoding failed")
+
+    assert worker.submit(failing_job)
+    assert worker.submit(lambda: None)
+    worker.stop()
+
+    stats = worker.stats
+    assert stats.num_jobs_failed == 1
+    assert stats.num_jobs_completed == 1
+
+
+def test_rejects_jobs_when_not_running():
+    worker = EncoderWorker("test")
+
+    assert not worker.submit(lambda: None)
+
+    worker.start()
+    worker.stop()
+    assert not worker.submit(lambda: None)
+
+
+@pytest.mark.parametrize("image_format", list(ImageFormat))
+def test_encode_image(image_format):
+    image = np.zeros((16, 24, 3), dtype=np.uint8)
+    image[:, :12] = (255, 0, 0)
+
+    data = encode_image(image, image_format, quality=100)
+    decoded = cv2.cvtColor(cv2.imdecode(data, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+
+    assert decoded.shape == image.shape
+    # Lossy formats blur the edge between the halves, so only compare away from it. Checks that
+    # channels are not swapped
+    np.testing.assert_allclose(decoded[:, :8], image[:, :8], atol=16)
+    np.testing.assert_allclose(decoded[:, 16:], image[:, 16:], atol=16)
+
+
+def test_write_image(tmp_path):
+    image = np.full((8, 8, 3), (0, 128, 255), dtype=np.uint8)
+    path = str(tmp_path / f"image{ImageFormat.PNG.extension}")
+
+    write_image(path, image, ImageFormat.PNG)
+
+    np.testing.assert_array_equal(
+        cv2.cvtColor(cv2.imread(path), cv2.COLOR_BGR2RGB), image
+    )
@@ -0,0 +1,248 @@
+import json
+import os
+
+import numpy as np
+import pytest
+
+from camera_control.camera.frame_recording import (
+    METADATA_FILENAME,
+    DropPolicy,
+    FrameRecorder,
+    FrameRecordingReader,
+    FrameRecordingWriter,
+    RecordingMetadata,
+    get_chunk_dir,
+    lucid_calibration_from_dict,
+    lucid_calibration_to_dict,
+)
+from camera_control.camera.lucid_frame import LucidCalibration, LucidFrame
+
+COLOR_FRAME_SHAPE = (6, 8, 3)
+DEPTH_FRAME_SHAPE = (3, 4, 4)
+
+
+def _make_calibration() -> LucidCalibration:
+    return LucidCalibration(
+        color_camera_intrinsic_matrix=np.array(
+            [[100.0, 0.0, 4.0], [0.0, 100.0, 3.0], [0.0, 0.0, 1.0]]
+        ),
+        color_camera_distortion_coeffs=np.array([0.1, -0.2, 0.0, 0.0, 0.05]),
+        depth_camera_intrinsic_matrix=np.array(
+            [[50.0, 0.0, 2.0], [0.0, 50.0, 1.5], [0.0, 0.0, 1.0]]
+        ),
+        depth_camera_distortion_coeffs=np.zeros(5),
+        xyz_to_color_camera_extrinsic_matrix=np.eye(4),
+        xyz_to_depth_camera_extrinsic_matrix=np.eye(4),
+    )
+
+
+def _make_frames(idx: int):
+    # Frame contents encode the frame index, so that frames read back can be identified
+    color_frame = np.full(COLOR_FRAME_SHAPE, idx, dtype=np.uint8)
+    depth_frame = np.full(DEPTH_FRAME_SHAPE, idx * 10, dtype=np.uint16)
+    return color_frame, depth_frame
+
+
+def _make_lucid_frame(idx: int, calibration: LucidCalibration) -> LucidFrame:
+    color_frame, depth_frame = _make_frames(idx)
+    return LucidFrame(
+        color_frame,
+        depth_frame,
+        0.25,
+        (-100.0, -200.0, 0.0),
+        1000.0 + idx,
+        calibration,
+        depth_age_millis=float(idx) / 10,
+    )
+
+
+def _make_metadata(chunk_size: int) -> RecordingMetadata:
+    return RecordingMetadata(
+        camera_type="lucid",
+        color_frame_shape=COLOR_FRAME_SHAPE,
+        depth_frame_shape=DEPTH_FRAME_SHAPE,
+        depth_dtype=np.dtype(np.uint16).str,
+        chunk_size=chunk_size,
+        xyz_scale=0.25,
+        xyz_offset=(-100.0, -200.0, 0.0),
+        extra={"note": "test"},
+    )
+
+
+def test_writer_rolls_over_chunks(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    writer = FrameRecordingWriter(recording_dir, _make_metadata(chunk_size=3), {})
+    for idx in range(7):
+        writer.write(*_make_frames(idx), 1000.0 + idx, float(idx) / 10)
+    writer.close()
+
+    for chunk_idx in range(3):
+        assert os.path.isdir(get_chunk_dir(recording_dir, chunk_idx))
+    assert not os.path.exists(get_chunk_dir(recording_dir, 3))
+
+    reader = FrameRecordingReader(recording_dir)
+    assert len(reader) == 7
+    for idx in range(7):
+        color_frame, depth_frame, timestamp_millis, depth_age_millis = reader.get_frame(
+            idx
+        )
+        expected_color_frame, expected_depth_frame = _make_frames(idx)
+        np.testing.assert_array_equal(color_frame, expected_color_frame)
+        np.testing.assert_array_equal(depth_frame, expected_depth_frame)
+        assert timestamp_millis == 1000.0 + idx
+        assert depth_age_millis == pytest.approx(idx / 10)
+    np.testing.assert_array_equal(reader.get_timestamps_millis(), 1000.0 + np.arange(7))
+    with pytest.raises(IndexError):
+        reader.get_frame(7)
+
+
+def test_reader_skips_empty_chunk(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    writer = FrameRecordingWriter(recording_dir, _make_metadata(chunk_size=2), {})
+    for idx in range(2):
+        writer.write(*_make_frames(idx), 1000.0 + idx)
+    writer.close()
+    # A chunk that was opened but never written to, e.g. after a crash
+    os.makedirs(get_chunk_dir(recording_dir, 1))
+    empty_timestamps = np.full((2, 2), np.nan)
+    np.save(
+        os.path.join(get_chunk_dir(recording_dir, 1), "timestamps.npy"),
+        empty_timestamps,
+    )
+
+    reader = FrameRecordingReader(recording_dir)
+
+    assert len(reader) == 2
+    np.testing.assert_array_equal(reader.get_timestamps_millis(), [1000.0, 1001.0])
+
+
+def test_metadata_and_calibration_round_trip(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    metadata = _make_metadata(chunk_size=4)
+    calibration = _make_calibration()
+    writer = FrameRecordingWriter(
+        recording_dir, metadata, lucid_calibration_to_dict(calibration)
+    )
+    writer.close()
+
+    reader = FrameRecordingReader(recording_dir)
+
+    assert reader.metadata == metadata
+    assert len(reader) == 0
+    assert reader.get_timestamps_millis().size == 0
+    read_calibration = lucid_calibration_from_dict(reader.calibration)
+    for name, value in lucid_calibration_to_dict(calibration).items():
+        np.testing.assert_array_equal(getattr(read_calibration, name), value)
+    # Derived fields are recomputed rather than stored
+    assert "color_to_depth_extrinsic_matrix" not in reader.calibration
+    np.testing.assert_allclose(
+        read_calibration.color_to_depth_extrinsic_matrix,
+        calibration.color_to_depth_extrinsic_matrix,
+    )
+
+
+def test_writer_refuses_existing_recording(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    FrameRecordingWriter(recording_dir, _make_metadata(chunk_size=2), {}).close()
+
+    with pytest.raises(FileExistsError):
+        FrameRecordingWriter(recording_dir, _make_metadata(chunk_size=2), {})
+
+
+def test_reader_rejects_unsupported_format_version(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    FrameRecordingWriter(recording_dir, _make_metadata(chunk_size=2), {}).close()
+    metadata_path = os.path.join(recording_dir, METADATA_FILENAME)
+    with open(metadata_path) as f:
+        metadata = json.load(f)
+    metadata["format_version"] += 1
+    with open(metadata_path, "w") as f:
+        json.dump(metadata, f)
+
+    with pytest.raises(ValueError):
+        FrameRecordingReader(recording_dir)
+
+
+def _record_while_writer_is_blocked(
+    recorder: FrameRecorder, num_frames: int, calibration: LucidCalibration
+):
+    # The writer thread cannot take frames off the queue while the recorder's lock is held, so the
+    # queue fills deterministically
+    with recorder._cv:
+        queued = [
+            recorder.record(_make_lucid_frame(idx, calibration))
+            for idx in range(num_frames)
+        ]
+        stats = recorder.stats
+    return queued, stats
+
+
+@pytest.mark.parametrize(
+    "drop_policy, expected_recorded_idxs",
+    [
+        (DropPolicy.DROP_NEWEST, [0, 1, 2]),
+        (DropPolicy.DROP_OLDEST, [3, 4, 5]),
+    ],
+)
+def test_recorder_drop_policy(tmp_path, drop_policy, expected_recorded_idxs):
+    recording_dir = str(tmp_path / "recording")
+    calibration = _make_calibration()
+    recorder = FrameRecorder(
+        recording_dir, chunk_size=2, max_queue_size=3, drop_policy=drop_policy
+    )
+    recorder.start()
+
+    queued, stats = _record_while_writer_is_blocked(recorder, 6, calibration)
+    recorder.stop()
+
+    if drop_policy == DropPolicy.DROP_NEWEST:
+        assert queued == [True, True, True, False, False, False]
+    else:
+        assert queued == [True] * 6
+    assert stats.num_frames_queued == 3
+    assert stats.num_frames_dropped == 3
+    stats = recorder.stats
+    assert stats.num_frames_recorded == 3
+    assert stats.num_frames_dropped == 3
+    assert stats.num_frames_queued == 0
+
+    reader = FrameRecordingReader(recording_dir)
+    np.testing.assert_array_equal(
+        reader.get_timestamps_millis(), 1000.0 + np.array(expected_recorded_idxs)
+    )
+    for idx, frame_idx in enumerate(expected_recorded_idxs):
+        color_frame, depth_frame, _, depth_age_millis = reader.get_frame(idx)
+        np.testing.assert_array_equal(color_frame, _make_frames(frame_idx)[0])
+        np.testing.assert_array_equal(depth_frame, _make_frames(frame_idx)[1])
+        assert depth_age_millis == pytest.approx(frame_idx / 10)
+
+
+def test_recorder_takes_metadata_from_first_frame(tmp_path):
+    recording_dir = str(tmp_path / "recording")
+    calibration = _make_calibration()
+    recorder = FrameRecorder(recording_dir, chunk_size=5)
+    recorder.start()
+    assert recorder.record(_make_lucid_frame(0, calibration))
+    recorder.stop()
+
+    reader = FrameRecordingReader(recording_dir)
+
+    assert reader.metadata.color_frame_shape == COLOR_FRAME_SHAPE
+    assert reader.metadata.depth_frame_shape == DEPTH_FRAME_SHAPE
+    assert np.dtype(reader.metadata.depth_dtype) == np.uint16
+    assert reader.metadata.chunk_size == 5
+    assert reader.metadata.xyz_scale == 0.25
+    assert reader.metadata.xyz_offset == (-100.0, -200.0, 0.0)
+    np.testing.assert_array_equal(
+        reader.calibration["color_camera_intrinsic_matrix"],
+        calibration.color_camera_intrinsic_matrix,
+    )
+
+
+def test_recorder_rejects_frames_when_stopped(tmp_path):
+    calibration = _make_calibration()
+    recorder = FrameRecorder(str(tmp_path / "recording"))
+
+    assert not recorder.record(_make_lucid_frame(0, calibration))
+    with pytest.raises(TypeError):
+        recorder.record(object())
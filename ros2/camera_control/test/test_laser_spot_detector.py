@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+
+from camera_control.laser_spot_detector import LaserSpotDetector
+
+FRAME_SIZE = (640, 480)
+
+
+def _make_frame(noise_seed: int = 0) -> np.ndarray:
+    # Dark frame with low sensor noise, as captured with laser detection camera settings
+    rng = np.random.default_rng(noise_seed)
+    return rng.integers(0, 20, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+
+def _draw_spot(
+    frame: np.ndarray,
+    center: tuple,
+    sigma: float = 2.0,
+    peak: int = 255,
+    channel: int = 0,
+):
+    # Gaussian spot, brightest in one channel, as a red or green laser
+    height, width, _ = frame.shape
+    ys, xs = np.mgrid[0:height, 0:width]
+    spot = peak * np.exp(
+        -((xs - center[0]) ** 2 + (ys - center[1]) ** 2) / (2 * sigma**2)
+    )
+    frame[:, :, channel] = np.maximum(frame[:, :, channel], spot.astype(np.uint8))
+
+
+def test_detects_spot_with_subpixel_precision():
+    frame = _make_frame()
+    center = (321.3, 187.6)
+    _draw_spot(frame, center)
+
+    detection = LaserSpotDetector().detect(frame)
+
+    assert not detection.ambiguous
+    assert len(detection.spots) == 1
+    spot = detection.spots[0]
+    assert spot.point == pytest.approx(center, abs=0.25)
+    assert spot.peak_intensity >= 240
+    assert spot.conf >= 0.5
+
+
+@pytest.mark.parametrize("channel", [0, 1, 2])
+def test_detects_spot_in_any_channel(channel):
+    frame = _make_frame()
+    _draw_spot(frame, (100.0, 400.0), channel=channel)
+
+    detection = LaserSpotDetector().detect(frame)
+
+    assert not detection.ambiguous
+    assert detection.spots[0].point == pytest.approx((100.0, 400.0), abs=0.25)
+
+
+def test_dark_frame_has_no_spots():
+    detection = LaserSpotDetector().detect(_make_frame())
+
+    assert not detection.ambiguous
+    assert detection.spots == []
+
+
+def test_too_many_spots_is_ambiguous():
+    frame = _make_frame()
+    _draw_spot(frame, (100.0, 100.0))
+    _draw_spot(frame, (500.0, 300.0))
+
+    detection = LaserSpotDetector(max_spots=1).detect(frame)
+    assert detection.ambiguous
+    assert len(detection.spots) == 2
+
+    detection = LaserSpotDetector(max_spots=2).detect(frame)
+    assert not detection.ambiguous
+    assert sorted(spot.point[0] for spot in detection.spots) == pytest.approx(
+        [100.0, 500.0], abs=0.25
+    )
+
+
+def test_bright_frame_is_ambiguous():
+    frame = _make_frame()
+    # A lit surface covering a large part of the frame
+    frame[100:300, 100:400] = 240
+    _draw_spot(frame, (50.0, 50.0))
+
+    detection = LaserSpotDetector(max_area=100000).detect(frame)
+
+    assert detection.ambiguous
+    assert detection.spots == []
+
+
+def test_bright_fraction_of_crop_is_relative_to_reference_area():
+    frame = _make_frame()
+    _draw_spot(frame, (320.0, 240.0), sigma=3.0)
+    crop = frame[230:251, 310:331]
+    detector = LaserSpotDetector()
+
+    # The spot covers a large fraction of the crop, but a small fraction of the full frame
+    assert detector.detect(crop).ambiguous
+    detection = detector.detect(crop, reference_area=FRAME_SIZE[0] * FRAME_SIZE[1])
+    assert not detection.ambiguous
+    assert detection.spots[0].point == pytest.approx((10.0, 10.0), abs=0.25)
+
+
+def test_elongated_region_is_not_a_spot():
+    frame = _make_frame()
+    # A thin line, e.g. a reflection off an edge
+    frame[200:202, 100:300, 0] = 255
+
+    detection = LaserSpotDetector().detect(frame)
+
+    assert detection.ambiguous
+    assert all(spot.conf < 0.5 for spot in detection.spots)
+
+
+def test_regions_outside_area_limits_are_filtered():
+    frame = _make_frame()
+    # Hot pixel
+    frame[10, 10, 0] = 255
+    _draw_spot(frame, (400.0, 300.0))
+
+    detection = LaserSpotDetector(min_area=2).detect(frame)
+
+    assert not detection.ambiguous
+    assert len(detection.spots) == 1
+    assert detection.spots[0].point == pytest.approx((400.0, 300.0), abs=0.25)
@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+
+from camera_control.camera.realsense_projection import (
+    DEPROJECTION_DISTORTION_MODELS,
+    SUPPORTED_DISTORTION_MODELS,
+    DistortionModel,
+    Extrinsics,
+    Intrinsics,
+    deproject_pixels_to_points,
+    project_color_pixels_to_depth_pixels,
+    project_points_to_pixels,
+)
+
+# Distortion coefficients (k1, k2, p1, p2, k3) in the range of those reported by RealSense devices
+COEFFS = np.array([0.12, -0.25, 0.001, -0.002, 0.1])
+
+
+def _make_intrinsics(model: DistortionModel) -> Intrinsics:
+    return Intrinsics(
+        width=1280,
+        height=720,
+        ppx=640.5,
+        ppy=362.25,
+        fx=910.0,
+        fy=908.0,
+        model=model,
+        coeffs=np.zeros(5) if model == DistortionModel.NONE else COEFFS,
+    )
+
+
+def _random_points(num_points: int, seed: int = 0) -> np.ndarray:
+    # Points within the field of view, between 0.3m and 3m away
+    rng = np.random.default_rng(seed)
+    depths = rng.uniform(0.3, 3.0, num_points)
+    x = rng.uniform(-0.6, 0.6, num_points) * depths
+    y = rng.uniform(-0.35, 0.35, num_points) * depths
+    return np.stack((x, y, depths), axis=-1)
+
+
+@pytest.mark.parametrize("model", DEPROJECTION_DISTORTION_MODELS)
+def test_deproject_inverts_project(model):
+    intrinsics = _make_intrinsics(model)
+    points = _random_points(1000)
+
+    pixels = project_points_to_pixels(points, intrinsics)
+    deprojected_points = deproject_pixels_to_points(pixels, points[:, 2], intrinsics)
+
+    np.testing.assert_allclose(deprojected_points, points, atol=1e-4)
+
+
+def test_deproject_rejects_forward_distortion_model():
+    intrinsics = _make_intrinsics(DistortionModel.MODIFIED_BROWN_CONRADY)
+
+    with pytest.raises(ValueError):
+        deproject_pixels_to_points(np.zeros((1, 2)), np.ones(1), intrinsics)
+
+
+def test_project_rejects_unsupported_model():
+    intrinsics = _make_intrinsics(DistortionModel.FTHETA)
+
+    with pytest.raises(ValueError):
+        project_points_to_pixels(np.ones((1, 3)), intrinsics)
+
+
+def test_project_color_pixels_to_depth_pixels_with_aligned_cameras():
+    # With identical intrinsics and no offset between the cameras, every color pixel maps to the
+    # depth pixel at the same coordinates
+    intrinsics = _make_intrinsics(DistortionModel.NONE)
+    identity = Extrinsics(np.eye(3), np.zeros(3))
+    depth_data = np.full((intrinsics.height, intrinsics.width), 1000, dtype=np.uint16)
+    rng = np.random.default_rng(0)
+    color_pixels = rng.uniform(
+        [10, 10], [intrinsics.width - 10, intrinsics.height - 10], (50, 2)
+    )
+
+    depth_pixels = project_color_pixels_to_depth_pixels(
+        depth_data,
+        0.001,
+        0.1,
+        10.0,
+        intrinsics,
+        intrinsics,
+        identity,
+        identity,
+        color_pixels,
+    )
+
+    np.testing.assert_allclose(depth_pixels, color_pixels, atol=1.0)
+
+
+def test_project_color_pixels_to_depth_pixels_without_depth():
+    intrinsics = _make_intrinsics(DistortionModel.NONE)
+    identity = Extrinsics(np.eye(3), np.zeros(3))
+    depth_data = np.zeros((intrinsics.height, intrinsics.width), dtype=np.uint16)
+
+    depth_pixels = project_color_pixels_to_depth_pixels(
+        depth_data,
+        0.001,
+        0.1,
+        10.0,
+        intrinsics,
+        intrinsics,
+        identity,
+        identity,
+        np.array([[640.0, 360.0]]),
+    )
+
+    assert np.isnan(depth_pixels).all()
+
+
+@pytest.mark.parametrize("model", SUPPORTED_DISTORTION_MODELS)
+def test_project_matches_librealsense(model):
+    rs = pytest.importorskip("pyrealsense2")
+    intrinsics = _make_intrinsics(model)
+    rs_intrinsics = _to_rs_intrinsics(rs, intrinsics)
+    points = _random_points(200)
+
+    pixels = project_points_to_pixels(points, intrinsics)
+    rs_pixels = np.array(
+        [rs.rs2_project_point_to_pixel(rs_intrinsics, list(point)) for point in points]
+    )
+
+    # librealsense computes in single precision
+    np.testing.assert_allclose(pixels, rs_pixels, atol=1e-2)
+
+
+@pytest.mark.parametrize("model", DEPROJECTION_DISTORTION_MODELS)
+def test_deproject_matches_librealsense(model):
+    rs = pytest.importorskip("pyrealsense2")
+    intrinsics = _make_intrinsics(model)
+    rs_intrinsics = _to_rs_intrinsics(rs, intrinsics)
+    rng = np.random.default_rng(0)
+    pixels = rng.uniform([0, 0], [intrinsics.width, intrinsics.height], (200, 2))
+    depths = rng.uniform(0.3, 3.0, 200)
+
+    points = deproject_pixels_to_points(pixels, depths, intrinsics)
+    rs_points = np.array(
+        [
+            rs.rs2_deproject_pixel_to_point(rs_intrinsics, list(pixel), depth)
+            for pixel, depth in zip(pixels, depths)
+        ]
+    )
+
+    np.testing.assert_allclose(points, rs_points, atol=1e-4)
+
+
+def _to_rs_intrinsics(rs, intrinsics: Intrinsics):
+    rs_intrinsics = rs.intrinsics()
+    rs_intrinsics.width = intrinsics.width
+    rs_intrinsics.height = intrinsics.height
+    rs_intrinsics.ppx = intrinsics.ppx
+    rs_intrinsics.ppy = intrinsics.ppy
+    rs_intrinsics.fx = intrinsics.fx
+    rs_intrinsics.fy = intrinsics.fy
+    rs_intrinsics.model = getattr(rs.distortion, intrinsics.model.name.lower())
+    rs_intrinsics.coeffs = [float(coeff) for coeff in intrinsics.coeffs]
+    return rs_intrinsics
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from camera_control.timing_stats import TimingStats
+
+
+def test_mean_last_and_percentiles():
+    timing_stats = TimingStats()
+    durations_ms = np.arange(1, 101, dtype=np.float64)
+    for duration_ms in durations_ms:
+        timing_stats.record("stage", duration_ms)
+
+    timings_ms = timing_stats.get_timings_ms()["stage"]
+
+    assert timings_ms["mean"] == pytest.approx(50.5)
+    assert timings_ms["last"] == 100.0
+    assert timings_ms["p50"] == pytest.approx(np.percentile(durations_ms, 50))
+    assert timings_ms["p95"] == pytest.approx(np.percentile(durations_ms, 95))
+    assert timings_ms["p99"] == pytest.approx(np.percentile(durations_ms, 99))
+    assert timing_stats.get_counts() == {"stage": 100}
+
+
+def test_percentiles_over_rolling_window():
+    timing_stats = TimingStats(window_size=10)
+    # An early outlier falls out of the window, but stays in the mean
+    timing_stats.record("stage", 1000.0)
+    for _ in range(10):
+        timing_stats.record("stage", 5.0)
+
+    timings_ms = timing_stats.get_timings_ms()["stage"]
+
+    assert timings_ms["p50"] == 5.0
+    assert timings_ms["p99"] == 5.0
+    assert timings_ms["mean"] == pytest.approx((1000.0 + 50.0) / 11)
+    assert timing_stats.get_counts()["stage"] == 11
+
+
+def test_tail_percentiles_catch_outliers():
+    timing_stats = TimingStats()
+    for _ in range(95):
+        timing_stats.record("stage", 10.0)
+    for _ in range(5):
+        timing_stats.record("stage", 100.0)
+
+    timings_ms = timing_stats.get_timings_ms()["stage"]
+
+    assert timings_ms["p50"] == 10.0
+    assert timings_ms["p99"] == 100.0
+
+
+def test_stages_are_independent():
+    timing_stats = TimingStats()
+    timing_stats.record("a", 1.0)
+    timing_stats.record("b", 2.0)
+    timing_stats.record("b", 4.0)
+
+    timings_ms = timing_stats.get_timings_ms()
+
+    assert timings_ms["a"]["mean"] == 1.0
+    assert timings_ms["b"]["mean"] == 3.0
+    assert timing_stats.get_counts() == {"a": 1, "b": 2}
+
+
+def test_no_stages():
+    timing_stats = TimingStats()
+
+    assert timing_stats.get_timings_ms() == {}
+    assert timing_stats.get_counts() == {}
+
+
+def test_time_records_duration_even_on_error():
+    timing_stats = TimingStats()
+
+    with timing_stats.time("stage"):
+        time.sleep(0.01)
+    with pytest.raises(RuntimeError):
+        with timing_stats.time("stage"):
+            raise RuntimeError()
+
+    assert timing_stats.get_counts()["stage"] == 2
+    timings_ms = timing_stats.get_timings_ms()["stage"]
+    assert timings_ms["p99"] >= 10.0
+    assert timings_ms["last"] < 10.0
+
+
+def test_concurrent_recording():
+    timing_stats = TimingStats(window_size=100)
+    num_threads = 8
+    num_records = 1000
+
+    def record():
+        for _ in range(num_records):
+            timing_stats.record("stage", 1.0)
+
+    threads = [threading.Thread(target=record) for _ in range(num_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert timing_stats.get_counts()["stage"] == num_threads * num_records
+    assert timing_stats.get_timings_ms()["stage"]["mean"] == pytest.approx(1.0)
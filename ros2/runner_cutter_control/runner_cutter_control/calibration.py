@@ -1,16 +1,31 @@
 import asyncio
 import functools
 import logging
+import os
+import time
 from typing import List, Optional, Tuple
 
 import numpy as np
 from scipy.optimize import least_squares, minimize
 
 from camera_control.camera_control_node import CameraControlNode
+from camera_control_interfaces.msg import ObjectInstance
 from common_interfaces.msg import Vector2
 from laser_control.laser_control_node import LaserControlNode
 from runner_cutter_control.camera_context import CameraContext
 
+# Added to a frame's timestamp to request a later frame
+NEXT_FRAME_SECS = 0.001
+# Max distance in pixels between detections of the same laser point in different frames of a batch
+BATCH_MATCH_RADIUS_PX = 8.0
+# Number of times a batch is captured before its laser coords are calibrated one at a time instead
+BATCH_NUM_ATTEMPTS = 3
+# Residual, in laser coords, above which the Huber loss of the robust nonlinear fit grows linearly
+# rather than quadratically, so that bad laser detections have a bounded influence on the transform
+HUBER_LOSS_SCALE = 0.01
+# Max number of residual evaluations per robust nonlinear fit, which bounds the cost of an update
+MAX_FIT_EVALUATIONS = 100
+
 
 class Calibration:
     is_calibrated: bool
@@ -22,12 +37,37 @@ class Calibration:
         laser_node: LaserControlNode,
         camera_node: CameraControlNode,
         laser_color: Tuple[float, float, float],
+        laser_detection_roi_radius: float = 0.0,
+        laser_settle_time_secs: float = 0.0,
+        batch_size: int = 1,
+        batch_exposure_us: float = 40000.0,
+        max_correspondences: int = 200,
+        outlier_threshold: float = 0.05,
         logger: Optional[logging.Logger] = None,
     ):
+        """
+        Args:
+            laser_node (LaserControlNode): Laser control node client.
+            camera_node (CameraControlNode): Camera control node client.
+            laser_color (Tuple[float, float, float]): (r, g, b) color of the laser when detecting it.
+            laser_detection_roi_radius (float): Radius in pixels around the expected laser pixel in which to detect the laser. A non-positive value searches the whole frame.
+            laser_settle_time_secs (float): Time for the galvos to settle after the laser is moved.
+            batch_size (int): Number of calibration points rendered at once during calibration. Values above 1 identify the points in a batch with a temporal binary code, so that a batch takes 1 + ceil(log2(batch_size + 1)) frames instead of one frame per point.
+            batch_exposure_us (float): Camera exposure used when rendering batches. The DAC renders the points of a batch one after another, so the exposure must cover at least one DAC frame for every point to be captured.
+            max_correspondences (int): Max number of point correspondences kept in addition to those found by calibrate(). When exceeded, the oldest of them are dropped, which bounds the cost of updating the transform as correspondences are gathered. Correspondences found by calibrate() are always kept, so that the transform stays constrained over the whole calibration grid.
+            outlier_threshold (float): Max reprojection error, in laser coords, of a correspondence added with reject_outlier against the current transform. A non-positive value accepts all correspondences.
+            logger (Optional[logging.Logger]): Logger
+        """
         self._laser_node = laser_node
         self._camera_node = camera_node
         self._camera_context = CameraContext(camera_node)
         self._laser_color = laser_color
+        self._laser_detection_roi_radius = laser_detection_roi_radius
+        self._laser_settle_time_secs = laser_settle_time_secs
+        self._batch_size = batch_size
+        self._batch_exposure_us = batch_exposure_us
+        self._max_correspondences = max_correspondences
+        self._outlier_threshold = outlier_threshold
         if logger:
             self._logger = logger
         else:
@@ -36,6 +76,10 @@ class Calibration:
 
         self._calibration_laser_coords = []
         self._calibration_camera_points = []
+        # The first _num_pinned_correspondences correspondences were found by calibrate() and are
+        # never dropped
+        self._num_pinned_correspondences = 0
+        self._is_calibrating = False
         self.is_calibrated = False
         self.camera_to_laser_transform = np.zeros((4, 3))
         self.camera_frame_size = (0, 0)
@@ -44,6 +88,7 @@ class Calibration:
         self.camera_to_laser_transform = np.zeros((4, 3))
         self._calibration_laser_coords = []
         self._calibration_camera_points = []
+        self._num_pinned_correspondences = 0
         self.is_calibrated = False
 
     async def calibrate(self, grid_size: Tuple[int, int] = (5, 5)) -> bool:
@@ -80,9 +125,18 @@ class Calibration:
                 y = j * y_step
                 pending_calibration_laser_coords.append((x, y))
 
-        # Get image correspondences
+        # Get image correspondences. They are pinned as they are added
         self._logger.info("Get image correspondences")
-        await self.add_calibration_points(pending_calibration_laser_coords)
+        self._is_calibrating = True
+        try:
+            if self._batch_size > 1:
+                await self.add_calibration_points_batched(
+                    pending_calibration_laser_coords, self._batch_size
+                )
+            else:
+                await self.add_calibration_points(pending_calibration_laser_coords)
+        finally:
+            self._is_calibrating = False
 
         self._logger.info(
             f"{len(self._calibration_laser_coords)} out of {len(pending_calibration_laser_coords)} point correspondences found."
@@ -94,16 +148,21 @@ class Calibration:
             )
             return False
 
-        # Use linear least squares for an initial estimate, then refine using nonlinear least squares
+        # Use linear least squares for an initial estimate, then refine using nonlinear least
+        # squares. The linear estimate can be far off, so the refinement is a full fit rather than
+        # the robust, capped fit used for incremental updates
         self._update_transform_linear_least_squares()
-        await self._update_transform_nonlinear_least_squares()
+        await self._update_transform_nonlinear_least_squares(robust=False)
 
         self.is_calibrated = True
         return True
 
     async def add_calibration_points(
-        self, laser_coords: List[Tuple[float, float]], update_transform: bool = False
-    ):
+        self,
+        laser_coords: List[Tuple[float, float]],
+        update_transform: bool = False,
+        camera_pixels: Optional[List[Tuple[float, float]]] = None,
+    ) -> List[Tuple[Tuple[float, float], Tuple[float, float, float]]]:
         """
         Find and add additional point correspondences by shooting the laser at each laser_coords
         and then optionally recalculate the transform.
@@ -111,7 +170,11 @@ class Calibration:
         Args:
             laser_coords (List[Tuple[float, float]]): Laser coordinates to find point correspondences with
             update_transform (bool): Whether to recalculate the camera-space position to laser coord transform
+            camera_pixels (Optional[List[Tuple[float, float]]]): Expected camera pixel of the laser for each laser coord. When provided, the laser is only searched for around the expected pixel
+        Returns:
+            List[Tuple[Tuple[float, float], Tuple[float, float, float]]]: (laser coord, camera-space position) of each point correspondence added.
         """
+        added_correspondences = []
 
         # TODO: set exposure/gain on camera node automatically when detecting laser
         async with self._camera_context.laser_detection_settings():
@@ -119,7 +182,7 @@ class Calibration:
             await self._laser_node.set_color(r=0.0, g=0.0, b=0.0, i=0.0)
             try:
                 await self._laser_node.play()
-                for laser_coord in laser_coords:
+                for idx, laser_coord in enumerate(laser_coords):
                     await self._laser_node.set_points(
                         points=[Vector2(x=laser_coord[0], y=laser_coord[1])]
                     )
@@ -129,12 +192,22 @@ class Calibration:
                         b=self._laser_color[2],
                         i=0.0,
                     )
-                    # Wait for galvo to settle and for camera frame capture
-                    # TODO: optimize the frame callback time and reduce this
-                    await asyncio.sleep(0.5)
-                    camera_point = await self._find_point_correspondence(laser_coord)
-                    if camera_point is not None:
-                        await self.add_point_correspondence(laser_coord, camera_point)
+                    # Detect the laser on the first frame whose exposure started after the galvo
+                    # has settled
+                    camera_point = await self._find_point_correspondence(
+                        laser_coord,
+                        camera_pixel=(
+                            camera_pixels[idx] if camera_pixels is not None else None
+                        ),
+                        not_before_timestamp=time.time() + self._laser_settle_time_secs,
+                    )
+                    if (
+                        camera_point is not None
+                        and await self.add_point_correspondence(
+                            laser_coord, camera_point
+                        )
+                    ):
+                        added_correspondences.append((laser_coord, camera_point))
                     # We use set_color() instead of stop() as it is faster to temporarily turn off the laser
                     await self._laser_node.set_color(r=0.0, g=0.0, b=0.0, i=0.0)
             finally:
@@ -142,6 +215,300 @@ class Calibration:
 
         if update_transform:
             await self._update_transform_nonlinear_least_squares()
+        return added_correspondences
+
+    async def add_calibration_points_batched(
+        self,
+        laser_coords: List[Tuple[float, float]],
+        batch_size: int,
+        update_transform: bool = False,
+    ):
+        """
+        Find and add additional point correspondences by shooting the laser at batches of
+        laser_coords at once, and then optionally recalculate the transform.
+
+        The detections in a frame with all points of a batch rendered are associated with laser
+        coords using a temporal binary code: the point at index i in the batch is assigned the code
+        i + 1, and for each bit of the code, a frame is captured with only the points whose code has
+        that bit set. Each detection's code is then read from which of those frames it appears in.
+        As a missed detection in any frame would corrupt the codes, a batch is only decoded when
+        every frame has at least as many detections as points rendered. Batches that fail to do so
+        after a few attempts are calibrated one laser coord at a time.
+
+        Args:
+            laser_coords (List[Tuple[float, float]]): Laser coordinates to find point correspondences with
+            batch_size (int): Max number of laser coords rendered at once
+            update_transform (bool): Whether to recalculate the camera-space position to laser coord transform
+        """
+        failed_laser_coords = []
+        async with self._camera_context.laser_detection_settings(
+            exposure_us=self._batch_exposure_us
+        ):
+            await self._laser_node.clear_points()
+            await self._laser_node.set_color(r=0.0, g=0.0, b=0.0, i=0.0)
+            try:
+                await self._laser_node.play()
+                await self._laser_node.set_color(
+                    r=self._laser_color[0],
+                    g=self._laser_color[1],
+                    b=self._laser_color[2],
+                    i=0.0,
+                )
+                for batch_start in range(0, len(laser_coords), batch_size):
+                    batch_laser_coords = laser_coords[
+                        batch_start : batch_start + batch_size
+                    ]
+                    for _ in range(BATCH_NUM_ATTEMPTS):
+                        if await self._add_calibration_point_batch(batch_laser_coords):
+                            break
+                    else:
+                        failed_laser_coords.extend(batch_laser_coords)
+            finally:
+                await self._laser_node.stop()
+
+        if failed_laser_coords:
+            self._logger.info(
+                f"Calibrating {len(failed_laser_coords)} laser coords of failed batches one at a time."
+            )
+            await self.add_calibration_points(failed_laser_coords)
+
+        if update_transform:
+            await self._update_transform_nonlinear_least_squares()
+
+    async def _add_calibration_point_batch(
+        self, laser_coords: List[Tuple[float, float]]
+    ) -> bool:
+        """
+        Find and add the point correspondences of a batch of laser coords rendered at once. See
+        add_calibration_points_batched.
+
+        Args:
+            laser_coords (List[Tuple[float, float]]): Laser coordinates of the batch
+        Returns:
+            bool: Whether the batch was decoded. No point correspondences are added otherwise.
+        """
+        instances = await self._detect_lasers(laser_coords)
+        if len(instances) < len(laser_coords):
+            self._logger.info(
+                f"{len(instances)} lasers detected for batch of {len(laser_coords)}. Dropping batch."
+            )
+            return False
+
+        pixels = np.array(
+            [(instance.point.x, instance.point.y) for instance in instances]
+        )
+        codes = np.zeros(len(instances), dtype=int)
+        # Codes are 1-based so that every point is rendered in at least one code frame
+        for bit in range(len(laser_coords).bit_length()):
+            code_laser_coords = [
+                laser_coord
+                for idx, laser_coord in enumerate(laser_coords)
+                if (idx + 1) >> bit & 1
+            ]
+            code_instances = await self._detect_lasers(code_laser_coords)
+            if len(code_instances) < len(code_laser_coords):
+                self._logger.info(
+                    f"{len(code_instances)} lasers detected for code frame of {len(code_laser_coords)}. Dropping batch."
+                )
+                return False
+            code_pixels = np.array(
+                [(instance.point.x, instance.point.y) for instance in code_instances]
+            )
+            distances = np.linalg.norm(
+                pixels[:, np.newaxis, :] - code_pixels[np.newaxis, :, :], axis=2
+            )
+            codes[distances.min(axis=1) <= BATCH_MATCH_RADIUS_PX] |= 1 << bit
+
+        # Only keep codes that identify exactly one detection
+        unique_codes, code_counts = np.unique(codes, return_counts=True)
+        for code, count in zip(unique_codes, code_counts):
+            if code < 1 or code > len(laser_coords) or count > 1:
+                continue
+            instance = instances[int(np.flatnonzero(codes == code)[0])]
+            laser_coord = laser_coords[code - 1]
+            self._logger.info(
+                f"Found point correspondence: laser_coord = {laser_coord}, pixel = {instance.point}, position = {instance.position}."
+            )
+            await self.add_point_correspondence(
+                laser_coord,
+                (instance.position.x, instance.position.y, instance.position.z),
+            )
+        self._logger.info(
+            f"Batch of {len(laser_coords)} laser coords: {len(instances)} lasers detected. {len(self._calibration_laser_coords)} total correspondences."
+        )
+        return True
+
+    async def _detect_lasers(
+        self, laser_coords: List[Tuple[float, float]]
+    ) -> List[ObjectInstance]:
+        """
+        Render laser coords at once and detect the lasers on the first frame whose exposure started
+        after they are rendered and the galvos have settled.
+
+        Args:
+            laser_coords (List[Tuple[float, float]]): Laser coordinates to render
+        Returns:
+            List[ObjectInstance]: Detected lasers.
+        """
+        await self._laser_node.set_points(
+            points=[
+                Vector2(x=laser_coord[0], y=laser_coord[1])
+                for laser_coord in laser_coords
+            ]
+        )
+        # Frames are stamped with the start of their exposure, so the whole exposure of the
+        # detected frame comes after the galvos have settled
+        result = await self._camera_node.get_laser_detection(
+            not_before_timestamp=time.time() + self._laser_settle_time_secs
+        )
+        return result.result.instances
+
+    async def verify(
+        self, laser_coords: List[Tuple[float, float]], max_error: float
+    ) -> bool:
+        """
+        Check the transform against new point correspondences, and refine it if their reprojection
+        error is too high. Much faster than recalibrating when only a few laser coords are used.
+        The new point correspondences are kept either way.
+
+        Args:
+            laser_coords (List[Tuple[float, float]]): Laser coordinates to find new point correspondences with
+            max_error (float): Max mean reprojection error, in laser coords, of the new point correspondences
+        Returns:
+            bool: Whether the transform is accurate, possibly after refinement. If not, the calibration is reset to uncalibrated and a full calibration is needed.
+        """
+        # Use the correspondences as returned, since the oldest correspondences may be dropped
+        # when new ones are added
+        new_correspondences = await self.add_calibration_points(laser_coords)
+        if not new_correspondences:
+            self._logger.warning(
+                "Calibration verification failed: no point correspondences found. Full calibration needed."
+            )
+            self.is_calibrated = False
+            return False
+
+        new_laser_coords = np.array(
+            [laser_coord for laser_coord, _ in new_correspondences]
+        )
+        new_camera_points = np.array(
+            [camera_point for _, camera_point in new_correspondences]
+        )
+
+        error = self._get_reprojection_error(
+            new_camera_points, new_laser_coords, self.camera_to_laser_transform
+        )
+        if error <= max_error:
+            self._logger.info(f"Calibration verified: error = {error}")
+            return True
+
+        self._logger.info(
+            f"Calibration error {error} exceeds {max_error}. Refining transform."
+        )
+        await self._update_transform_nonlinear_least_squares()
+        error = self._get_reprojection_error(
+            new_camera_points, new_laser_coords, self.camera_to_laser_transform
+        )
+        if error <= max_error:
+            self._logger.info(f"Calibration refined: error = {error}")
+            return True
+
+        self._logger.warning(
+            f"Calibration error {error} still exceeds {max_error} after refinement. Full calibration needed."
+        )
+        self.is_calibrated = False
+        return False
+
+    def save(self, file_path: str, camera_id: str, laser_id: str):
+        """
+        Save the transform and point correspondences, including which are pinned.
+
+        Args:
+            file_path (str): Path of the .npz file to save to.
+            camera_id (str): Identifier of the camera device the calibration is for.
+            laser_id (str): Identifier of the laser DAC the calibration is for.
+        """
+        camera_points = np.array(self._calibration_camera_points).reshape(-1, 3)
+        laser_coords = np.array(self._calibration_laser_coords).reshape(-1, 2)
+        reprojection_error = (
+            self._get_reprojection_error(
+                camera_points, laser_coords, self.camera_to_laser_transform
+            )
+            if len(laser_coords) > 0
+            else float("nan")
+        )
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        # Write to a temporary file first so that a crash while saving does not leave a corrupt
+        # calibration behind
+        temp_file_path = f"{file_path}.tmp"
+        with open(temp_file_path, "wb") as f:
+            np.savez(
+                f,
+                camera_to_laser_transform=self.camera_to_laser_transform,
+                camera_points=camera_points,
+                laser_coords=laser_coords,
+                num_pinned_correspondences=np.array(self._num_pinned_correspondences),
+                camera_frame_size=np.array(self.camera_frame_size),
+                camera_id=np.array(camera_id),
+                laser_id=np.array(laser_id),
+                timestamp=np.array(time.time()),
+                reprojection_error=np.array(reprojection_error),
+            )
+        os.replace(temp_file_path, file_path)
+        self._logger.info(f"Saved calibration to {file_path}")
+
+    def load(self, file_path: str, camera_id: str, laser_id: str) -> bool:
+        """
+        Load a transform and point correspondences saved with save, and mark the calibration as
+        calibrated.
+
+        Args:
+            file_path (str): Path of the .npz file to load from.
+            camera_id (str): Identifier of the current camera device. Must match the saved one.
+            laser_id (str): Identifier of the current laser DAC. Must match the saved one.
+        Returns:
+            bool: Whether the calibration was loaded.
+        """
+        if not os.path.exists(file_path):
+            return False
+
+        try:
+            with np.load(file_path) as data:
+                saved_camera_id = str(data["camera_id"])
+                saved_laser_id = str(data["laser_id"])
+                if saved_camera_id != camera_id or saved_laser_id != laser_id:
+                    self._logger.warning(
+                        f"Calibration {file_path} is for camera {saved_camera_id} and laser {saved_laser_id}, not camera {camera_id} and laser {laser_id}"
+                    )
+                    return False
+                camera_to_laser_transform = data["camera_to_laser_transform"]
+                camera_points = data["camera_points"]
+                laser_coords = data["laser_coords"]
+                # Calibrations saved before correspondences were pinned have none pinned
+                num_pinned_correspondences = (
+                    int(data["num_pinned_correspondences"])
+                    if "num_pinned_correspondences" in data
+                    else 0
+                )
+                camera_frame_size = data["camera_frame_size"]
+                timestamp = float(data["timestamp"])
+                reprojection_error = float(data["reprojection_error"])
+        except Exception as e:
+            self._logger.error(f"Failed to load calibration {file_path}: {e}")
+            return False
+
+        self.camera_to_laser_transform = camera_to_laser_transform
+        # Keep the pinned and newest correspondences, as when they are added
+        self._calibration_camera_points = [tuple(point) for point in camera_points]
+        self._calibration_laser_coords = [tuple(coord) for coord in laser_coords]
+        self._num_pinned_correspondences = num_pinned_correspondences
+        self._drop_excess_correspondences()
+        self.camera_frame_size = (int(camera_frame_size[0]), int(camera_frame_size[1]))
+        self.is_calibrated = True
+        self._logger.info(
+            f"Loaded calibration from {file_path}: {len(laser_coords)} correspondences, saved at {time.ctime(timestamp)} with mean reprojection error {reprojection_error}"
+        )
+        return True
 
     def camera_point_to_laser_coord(
         self, position: Tuple[float, float, float]
@@ -154,13 +521,31 @@ class Calibration:
         Returns:
             Tuple[float, float]: (x, y) laser coordinates.
         """
-        homogeneous_camera_point = np.hstack((position, 1))
-        transformed_point = homogeneous_camera_point @ self.camera_to_laser_transform
-        transformed_point = transformed_point / transformed_point[2]
-        return (transformed_point[0], transformed_point[1])
+        laser_coord = self.camera_points_to_laser_coords(np.array([position]))[0]
+        return (laser_coord[0], laser_coord[1])
+
+    def camera_points_to_laser_coords(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Transform 3D positions in camera-space to laser coords.
+
+        Args:
+            positions (np.ndarray): (N, 3) positions (x, y, z) in camera-space.
+        Returns:
+            np.ndarray: (N, 2) (x, y) laser coordinates.
+        """
+        positions = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        homogeneous_camera_points = np.hstack(
+            (positions, np.ones((positions.shape[0], 1)))
+        )
+        transformed_points = homogeneous_camera_points @ self.camera_to_laser_transform
+        return transformed_points[:, :2] / transformed_points[:, 2][:, np.newaxis]
 
     async def _find_point_correspondence(
-        self, laser_coord: Tuple[float, float], num_attempts: int = 3
+        self,
+        laser_coord: Tuple[float, float],
+        num_attempts: int = 3,
+        camera_pixel: Optional[Tuple[float, float]] = None,
+        not_before_timestamp: float = 0.0,
     ) -> Optional[Tuple[float, float, float]]:
         """
         For the given laser coord, find the corresponding 3D point in camera-space.
@@ -168,6 +553,8 @@ class Calibration:
         Args:
             laser_coord (Tuple[float, float]): Laser coordinate (x, y) to find point correspondence for.
             num_attempts (int): Number of tries to detect the laser and find the point correspondence.
+            camera_pixel (Optional[Tuple[float, float]]): Expected camera pixel (x, y) of the laser. When provided, the laser is only searched for around it.
+            not_before_timestamp (float): Wall clock time in seconds. The laser is only detected on frames whose exposure started at or after this time. A non-positive value uses the current frame.
         Returns:
             Optional[Tuple[float, float, float]]: 3D position in camera-space, or None if the laser could not be detected.
         """
@@ -177,7 +564,18 @@ class Calibration:
                 f"Attempt {attempt} to detect laser and find point correspondence."
             )
             attempt += 1
-            result = await self._camera_node.get_laser_detection()
+            if camera_pixel is not None and self._laser_detection_roi_radius > 0.0:
+                result = await self._camera_node.get_laser_detection(
+                    roi_center=Vector2(
+                        x=float(camera_pixel[0]), y=float(camera_pixel[1])
+                    ),
+                    roi_radius=self._laser_detection_roi_radius,
+                    not_before_timestamp=not_before_timestamp,
+                )
+            else:
+                result = await self._camera_node.get_laser_detection(
+                    not_before_timestamp=not_before_timestamp
+                )
             detection_result = result.result
             instances = detection_result.instances
             if instances:
@@ -187,8 +585,10 @@ class Calibration:
                     f"Found point correspondence: laser_coord = {laser_coord}, pixel = {instance.point}, position = {instance.position}."
                 )
                 return (instance.position.x, instance.position.y, instance.position.z)
-            # TODO: optimize the frame callback time and reduce this
-            await asyncio.sleep(0.5)
+            # Try again on the next frame
+            not_before_timestamp = max(
+                not_before_timestamp, detection_result.timestamp + NEXT_FRAME_SECS
+            )
         self._logger.info(
             f"Failed to find point. {len(self._calibration_laser_coords)} total correspondences."
         )
@@ -199,7 +599,8 @@ class Calibration:
         laser_coord: Tuple[float, float],
         camera_point: Tuple[float, float, float],
         update_transform: bool = False,
-    ):
+        reject_outlier: bool = False,
+    ) -> bool:
         """
         Add the point correspondence between laser coord and camera-space position and optionally
         update the transform.
@@ -208,17 +609,55 @@ class Calibration:
             laser_coord (Tuple[float, float]): Laser coordinate (x, y) of the point correspondence.
             camera_point (Tuple[float, float, float]): Camera-space position (x, y, z) of the point correspondence.
             update_transform (bool): Whether to update the transform matrix or not.
+            reject_outlier (bool): Whether to reject the point correspondence if it disagrees with the current transform by more than outlier_threshold, e.g. due to a bad laser detection.
+        Returns:
+            bool: Whether the point correspondence was added.
         """
+        if reject_outlier and self.is_calibrated and self._outlier_threshold > 0.0:
+            error = np.linalg.norm(
+                np.array(self.camera_point_to_laser_coord(camera_point))
+                - np.array(laser_coord)
+            )
+            if error > self._outlier_threshold:
+                self._logger.info(
+                    f"Rejected point correspondence: error {error} exceeds {self._outlier_threshold}."
+                )
+                return False
+
         self._calibration_laser_coords.append(laser_coord)
         self._calibration_camera_points.append(camera_point)
+        if self._is_calibrating:
+            self._num_pinned_correspondences += 1
+        self._drop_excess_correspondences()
         self._logger.info(
             f"Added point correspondence. {len(self._calibration_laser_coords)} total correspondences."
         )
 
         if update_transform:
             await self._update_transform_nonlinear_least_squares()
+        return True
+
+    def _drop_excess_correspondences(self):
+        # Drop the oldest unpinned correspondences beyond max_correspondences
+        num_excess_correspondences = (
+            len(self._calibration_laser_coords)
+            - self._num_pinned_correspondences
+            - self._max_correspondences
+        )
+        if num_excess_correspondences > 0:
+            start = self._num_pinned_correspondences
+            end = start + num_excess_correspondences
+            del self._calibration_laser_coords[start:end]
+            del self._calibration_camera_points[start:end]
+
+    async def _update_transform_nonlinear_least_squares(self, robust: bool = True):
+        """
+        Refine the transform with nonlinear least squares, starting from the current transform.
+
+        Args:
+            robust (bool): Whether to use a Huber loss and cap the number of evaluations, for incremental updates of an already accurate transform. Otherwise, fits with a squared loss until convergence.
+        """
 
-    async def _update_transform_nonlinear_least_squares(self):
         def residuals(parameters, camera_points, laser_coords):
             homogeneous_camera_points = np.hstack(
                 (camera_points, np.ones((camera_points.shape[0], 1)))
@@ -241,13 +680,22 @@ class Calibration:
                 self.camera_to_laser_transform.flatten(),
                 args=(camera_points, laser_coords),
                 method="trf",
+                **(
+                    {
+                        "loss": "huber",
+                        "f_scale": HUBER_LOSS_SCALE,
+                        "max_nfev": MAX_FIT_EVALUATIONS,
+                    }
+                    if robust
+                    else {}
+                ),
             ),
         )
 
         self.camera_to_laser_transform = result.x.reshape((4, 3))
 
         self._logger.info(
-            "Updated camera to laser transform using nonlinear least squares"
+            f"Updated camera to laser transform using {'robust ' if robust else ''}nonlinear least squares"
         )
         self._get_reprojection_error(
             camera_points, laser_coords, self.camera_to_laser_transform
@@ -6,11 +6,11 @@ class CameraContext:
         self._camera_node = camera_node
 
     @asynccontextmanager
-    async def laser_detection_settings(self):
+    async def laser_detection_settings(self, exposure_us: float = 1.0):
         get_state_res = await self._camera_node.get_state()
         prev_exposure_us = get_state_res.state.exposure_us
         prev_gain_db = get_state_res.state.gain_db
-        await self._camera_node.set_exposure(exposure_us=1.0)
+        await self._camera_node.set_exposure(exposure_us=exposure_us)
         await self._camera_node.set_gain(gain_db=0.0)
         try:
             yield
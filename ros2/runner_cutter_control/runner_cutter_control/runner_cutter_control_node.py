@@ -8,6 +8,9 @@ finding a specific runner to burn, and burning said runner.
 
 import asyncio
 import logging
+import os
+import re
+import time
 from dataclasses import dataclass, field
 from typing import List, Optional, Set, Tuple
 
@@ -29,7 +32,7 @@ from aioros2 import (
 from camera_control.camera_control_node import CameraControlNode
 from common_interfaces.msg import Vector2
 from laser_control.laser_control_node import LaserControlNode
-from runner_cutter_control.calibration import Calibration
+from runner_cutter_control.calibration import NEXT_FRAME_SECS, Calibration
 from runner_cutter_control.camera_context import CameraContext
 from runner_cutter_control.tracker import Track, Tracker, TrackState
 from runner_cutter_control_interfaces.msg import State, Track as TrackMsg
@@ -48,6 +51,42 @@ class RunnerCutterControlParams:
     burn_laser_color: List[float] = field(default_factory=lambda: [0.0, 0.0, 1.0])
     burn_time_secs: float = 5.0
     enable_aiming: bool = True
+    # Radius in pixels around the expected laser pixel in which to detect the laser when aiming and
+    # adding calibration points. A non-positive value searches the whole frame
+    laser_detection_roi_radius: float = 256.0
+    # Time for the galvos to settle after the laser is moved. The laser is detected on the first
+    # camera frame whose exposure started after this
+    laser_settle_time_secs: float = 0.05
+    # Number of grid points rendered at once during calibration. Above 1, the points in a batch are
+    # identified with a temporal on/off code over a few frames, instead of one frame per point. With
+    # the classical laser detector, the camera node's laser_spot_max_spots must be at least this
+    calibration_batch_size: int = 1
+    # Camera exposure when rendering a calibration batch. Must cover at least one laser DAC frame
+    # (1 / fps of the laser node) so that every point in the batch is captured
+    calibration_batch_exposure_us: float = 40000.0
+    # Dir in which calibrations are saved, per camera and laser DAC, and loaded from on start. An
+    # empty value disables saving and loading calibrations
+    calibration_dir: str = "~/runner-cutter-app/calibration"
+    # Max mean reprojection error, in laser coords, of the points checked when verifying a
+    # calibration. Above this, the transform is refined
+    calibration_verify_max_error: float = 0.01
+    # Max number of point correspondences gathered while aiming that are kept, in addition to those
+    # found by calibration, which are always kept. Beyond this, new ones replace the oldest ones, so
+    # that updating the transform does not get slower
+    calibration_max_correspondences: int = 200
+    # Max reprojection error, in laser coords, of a correspondence gathered while aiming against the
+    # current transform. Correspondences above this are rejected as bad laser detections
+    calibration_outlier_threshold: float = 0.05
+
+
+# Laser coords checked when verifying a calibration: the corners and center of the calibration grid
+CALIBRATION_VERIFY_LASER_COORDS = [
+    (0.0, 0.0),
+    (1.0, 0.0),
+    (0.0, 1.0),
+    (1.0, 1.0),
+    (0.5, 0.5),
+]
 
 
 @node("runner_cutter_control_node")
@@ -77,7 +116,13 @@ class RunnerCutterControlNode:
             self.laser_node,
             self.camera_node,
             self.runner_cutter_control_params.tracking_laser_color,
-            self.get_logger(),
+            laser_detection_roi_radius=self.runner_cutter_control_params.laser_detection_roi_radius,
+            laser_settle_time_secs=self.runner_cutter_control_params.laser_settle_time_secs,
+            batch_size=self.runner_cutter_control_params.calibration_batch_size,
+            batch_exposure_us=self.runner_cutter_control_params.calibration_batch_exposure_us,
+            max_correspondences=self.runner_cutter_control_params.calibration_max_correspondences,
+            outlier_threshold=self.runner_cutter_control_params.calibration_outlier_threshold,
+            logger=self.get_logger(),
         )
         self.runner_tracker = Tracker(self.get_logger())
         self.state_machine = StateMachine(
@@ -90,12 +135,18 @@ class RunnerCutterControlNode:
             self.runner_cutter_control_params.burn_laser_color,
             self.runner_cutter_control_params.burn_time_secs,
             self.runner_cutter_control_params.enable_aiming,
+            self.runner_cutter_control_params.laser_detection_roi_radius,
+            self.runner_cutter_control_params.laser_settle_time_secs,
+            self.runner_cutter_control_params.calibration_verify_max_error,
             self.get_logger(),
         )
 
         # Publish initial state
         self.publish_state()
 
+        if self.runner_cutter_control_params.calibration_dir:
+            asyncio.create_task(self._load_calibration_task())
+
     # TODO: use action instead once there's a new release of roslib. Currently
     # roslib does not support actions with ROS2
     @service("~/calibrate", Trigger)
@@ -106,6 +157,14 @@ class RunnerCutterControlNode:
         asyncio.create_task(self.state_machine.run_calibration())
         return result(success=True)
 
+    @service("~/verify_calibration", Trigger)
+    async def verify_calibration(self):
+        if self.state_machine.state != "idle":
+            return result(success=False)
+
+        asyncio.create_task(self.state_machine.run_verify_calibration())
+        return result(success=True)
+
     @service("~/add_calibration_points", AddCalibrationPoints)
     async def add_calibration_points(self, normalized_pixel_coords):
         if self.state_machine.state != "idle":
@@ -150,6 +209,51 @@ class RunnerCutterControlNode:
     async def get_state(self):
         return result(state=self._get_state())
 
+    async def save_calibration(self):
+        if not self.runner_cutter_control_params.calibration_dir:
+            return
+
+        calibration_file_path = await self._get_calibration_file_path()
+        if calibration_file_path is None:
+            self.get_logger().warning(
+                "Calibration not saved: camera device ID is not known"
+            )
+            return
+
+        camera_id, laser_id, file_path = calibration_file_path
+        self.calibration.save(file_path, camera_id, laser_id)
+
+    async def _load_calibration_task(self):
+        # The camera device ID is only known once the camera is connected, so keep trying until it
+        # is, unless the system gets calibrated in the meantime
+        while not self.calibration.is_calibrated:
+            calibration_file_path = await self._get_calibration_file_path()
+            if calibration_file_path is not None:
+                camera_id, laser_id, file_path = calibration_file_path
+                if self.calibration.load(file_path, camera_id, laser_id):
+                    self.publish_state()
+                return
+            await asyncio.sleep(1.0)
+
+    async def _get_calibration_file_path(self) -> Optional[Tuple[str, str, str]]:
+        """
+        Returns:
+            Optional[Tuple[str, str, str]]: Camera device ID, laser DAC ID, and path of the calibration file for them, or None if the camera device ID is not known yet.
+        """
+        camera_state_res = await self.camera_node.get_state()
+        camera_id = camera_state_res.state.device_id
+        if not camera_id:
+            return None
+
+        laser_state_res = await self.laser_node.get_state()
+        laser_id = f"{laser_state_res.dac_type}{laser_state_res.dac_index}"
+        file_name = re.sub(r"[^\w.-]", "_", f"{camera_id}_{laser_id}") + ".npz"
+        file_path = os.path.join(
+            os.path.expanduser(self.runner_cutter_control_params.calibration_dir),
+            file_name,
+        )
+        return camera_id, laser_id, file_path
+
     def publish_state(self):
         state = self._get_state()
         asyncio.create_task(
@@ -193,6 +297,7 @@ class StateMachine:
     states = [
         "idle",
         "calibration",
+        "verify_calibration",
         "add_calibration_points",
         "manual_target_aim_laser",
         "acquire_target",
@@ -211,6 +316,9 @@ class StateMachine:
         burn_laser_color: Tuple[float, float, float],
         burn_time_secs: float,
         enable_aiming: bool,
+        laser_detection_roi_radius: float = 0.0,
+        laser_settle_time_secs: float = 0.0,
+        calibration_verify_max_error: float = 0.01,
         logger: Optional[logging.Logger] = None,
     ):
         self._node = node
@@ -223,12 +331,17 @@ class StateMachine:
         self._burn_laser_color = burn_laser_color
         self._burn_time_secs = burn_time_secs
         self._enable_aiming = enable_aiming
+        self._laser_detection_roi_radius = laser_detection_roi_radius
+        self._laser_settle_time_secs = laser_settle_time_secs
+        self._calibration_verify_max_error = calibration_verify_max_error
         if logger:
             self._logger = logger
         else:
             self._logger = logging.getLogger(__name__)
             self._logger.setLevel(logging.INFO)
         self.detected_track_ids: Set[int] = set()
+        # Laser coord of the last burned target, used to pick the closest next target
+        self._last_target_laser_coord: Optional[np.ndarray] = None
 
         self.machine = AsyncMachine(
             model=self,
@@ -239,6 +352,16 @@ class StateMachine:
         # Calibration states
         self.machine.add_transition("run_calibration", "idle", "calibration")
         self.machine.add_transition("calibration_complete", "calibration", "idle")
+        # Verify Calibration states
+        self.machine.add_transition(
+            "run_verify_calibration",
+            "idle",
+            "verify_calibration",
+            conditions=["is_calibrated"],
+        )
+        self.machine.add_transition(
+            "verify_calibration_complete", "verify_calibration", "idle"
+        )
         # Add Calibration Points states
         self.machine.add_transition(
             "run_add_calibration_points",
@@ -294,9 +417,19 @@ class StateMachine:
     async def on_enter_calibration(self):
         self._logger.info(f"Entered state <calibration>")
         self._node.publish_state()
-        await self._calibration.calibrate()
+        if await self._calibration.calibrate():
+            await self._node.save_calibration()
         await self.calibration_complete()
 
+    async def on_enter_verify_calibration(self):
+        self._logger.info(f"Entered state <verify_calibration>")
+        self._node.publish_state()
+        if await self._calibration.verify(
+            CALIBRATION_VERIFY_LASER_COORDS, self._calibration_verify_max_error
+        ):
+            await self._node.save_calibration()
+        await self.verify_calibration_complete()
+
     async def on_enter_add_calibration_points(
         self, normalized_pixel_coords: List[Tuple[float, float]]
     ):
@@ -315,16 +448,30 @@ class StateMachine:
         positions = [
             (position.x, position.y, position.z) for position in result.positions
         ]
+        # The laser is expected to appear at the pixels the positions were found at
+        camera_pixels = [
+            self._normalized_to_camera_pixel(normalized_pixel_coord)
+            for normalized_pixel_coord in normalized_pixel_coords
+        ]
         # Filter out any invalid positions
-        positions = [p for p in positions if not all(x < 0 for x in p)]
+        valid_idxs = [
+            idx
+            for idx, position in enumerate(positions)
+            if not all(x < 0 for x in position)
+        ]
         # Convert camera positions to laser pixels
         laser_coords = [
-            self._calibration.camera_point_to_laser_coord(position)
-            for position in positions
+            tuple(laser_coord)
+            for laser_coord in self._calibration.camera_points_to_laser_coords(
+                np.array([positions[idx] for idx in valid_idxs])
+            )
         ]
         await self._calibration.add_calibration_points(
-            laser_coords, update_transform=True
+            laser_coords,
+            update_transform=True,
+            camera_pixels=[camera_pixels[idx] for idx in valid_idxs],
         )
+        await self._node.save_calibration()
         await self.add_calibration_points_complete()
 
     async def on_enter_manual_target_aim_laser(
@@ -342,6 +489,7 @@ class StateMachine:
             (position.x, position.y, position.z) for position in result.positions
         ]
         target_position = positions[0]
+        camera_pixel = self._normalized_to_camera_pixel(normalized_pixel_coord)
 
         corrected_laser_coord = await self._aim(target_position, camera_pixel)
         if corrected_laser_coord is not None:
@@ -351,6 +499,15 @@ class StateMachine:
 
         await self.manual_target_aim_laser_complete()
 
+    def _normalized_to_camera_pixel(
+        self, normalized_pixel_coord: Tuple[float, float]
+    ) -> Tuple[int, int]:
+        frame_width, frame_height = self._calibration.camera_frame_size
+        return (
+            round(min(max(normalized_pixel_coord[0], 0.0), 1.0) * frame_width),
+            round(min(max(normalized_pixel_coord[1], 0.0), 1.0) * frame_height),
+        )
+
     async def _detect_runners(self):
         self._logger.info("Detecting runners...")
         result = await self._camera_node.get_runner_detection()
@@ -416,33 +573,32 @@ class StateMachine:
                 f"Active track with ID {target_track.id} already exists. Setting it as target."
             )
         else:
-            # Find a track to target
-            while True:
-                track = self._runner_tracker.get_next_pending_track()
-                if track is None:
-                    break
-
-                self._logger.info(f"Processing pending track {track.id}...")
-
-                # Check whether the laser coordinates are out of bounds
-                laser_coord = self._calibration.camera_point_to_laser_coord(
-                    track.position
+            # Find a track to target among all pending tracks at once
+            tracks, laser_coords, out_of_bounds_tracks = (
+                self._runner_tracker.get_pending_tracks_in_bounds(
+                    self._calibration.camera_points_to_laser_coords
                 )
-                if (
-                    laser_coord[0] < 0.0
-                    or laser_coord[0] > 1.0
-                    or laser_coord[1] < 0.0
-                    or laser_coord[1] > 1.0
-                ):
-                    self._logger.info(
-                        f"Track {track.id} is out of laser bounds. Marking as failed."
+            )
+            for track in out_of_bounds_tracks:
+                self._logger.info(
+                    f"Track {track.id} is out of laser bounds. Marking as failed."
+                )
+                self._runner_tracker.process_track(track.id, TrackState.FAILED)
+            if tracks:
+                # Target the track closest to the last target, which minimizes how far the laser
+                # moves between targets. Without a last target, keep the pending order
+                target_idx = 0
+                if self._last_target_laser_coord is not None:
+                    target_idx = int(
+                        np.argmin(
+                            np.linalg.norm(
+                                laser_coords - self._last_target_laser_coord, axis=1
+                            )
+                        )
                     )
-                    self._runner_tracker.process_track(track.id, TrackState.FAILED)
-                    continue
-                else:
-                    self._logger.info(f"Setting track {track.id} as target.")
-                    target_track = track
-                    break
+                target_track = tracks[target_idx]
+                self._logger.info(f"Setting track {target_track.id} as target.")
+                self._runner_tracker.process_track(target_track.id, TrackState.ACTIVE)
 
         if target_track is None:
             self._logger.info("No target found.")
@@ -500,11 +656,26 @@ class StateMachine:
         return corrected_laser_coord
 
     async def _get_laser_pixel_and_pos(
-        self, max_attempts: int = 3
+        self,
+        max_attempts: int = 3,
+        expected_pixel: Optional[Tuple[float, float]] = None,
+        not_before_timestamp: float = 0.0,
     ) -> Tuple[Optional[Tuple[float, float]], Optional[Tuple[float, float, float]]]:
         attempt = 0
         while attempt < max_attempts:
-            result = await self._camera_node.get_laser_detection()
+            # Only search for the laser around where it is expected to be, if known
+            if expected_pixel is not None and self._laser_detection_roi_radius > 0.0:
+                result = await self._camera_node.get_laser_detection(
+                    roi_center=Vector2(
+                        x=float(expected_pixel[0]), y=float(expected_pixel[1])
+                    ),
+                    roi_radius=self._laser_detection_roi_radius,
+                    not_before_timestamp=not_before_timestamp,
+                )
+            else:
+                result = await self._camera_node.get_laser_detection(
+                    not_before_timestamp=not_before_timestamp
+                )
             detection_result = result.result
             instances = detection_result.instances
             if instances:
@@ -517,9 +688,10 @@ class StateMachine:
                     instance.position.y,
                     instance.position.z,
                 )
-            # No lasers detected. Try again.
-            # TODO: optimize the frame callback time and reduce this
-            await asyncio.sleep(0.5)
+            # No lasers detected. Try again on the next frame.
+            not_before_timestamp = max(
+                not_before_timestamp, detection_result.timestamp + NEXT_FRAME_SECS
+            )
             attempt += 1
         return None, None
 
@@ -535,10 +707,12 @@ class StateMachine:
             await self._laser_node.set_points(
                 points=[Vector2(x=current_laser_coord[0], y=current_laser_coord[1])]
             )
-            # Wait for galvo to settle and for camera frame capture
-            # TODO: optimize the frame callback time and reduce this
-            await asyncio.sleep(0.5)
-            laser_pixel, laser_pos = await self._get_laser_pixel_and_pos()
+            # The laser is aimed at the target, so it is expected to appear near the target pixel.
+            # Detect it on the first frame whose exposure started after the galvo has settled
+            laser_pixel, laser_pos = await self._get_laser_pixel_and_pos(
+                expected_pixel=target_pixel,
+                not_before_timestamp=time.time() + self._laser_settle_time_secs,
+            )
             if laser_pixel is None or laser_pos is None:
                 self._logger.info("Could not detect laser.")
                 return None
@@ -556,7 +730,10 @@ class StateMachine:
                 # Use this opportunity to add to calibration points since we have the laser
                 # coord and associated position in camera space
                 await self._calibration.add_point_correspondence(
-                    current_laser_coord, laser_pos, update_transform=True
+                    current_laser_coord,
+                    laser_pos,
+                    update_transform=True,
+                    reject_outlier=True,
                 )
 
                 # Scale correction by the camera frame size
@@ -588,6 +765,7 @@ class StateMachine:
         self._node.publish_state()
 
         self._logger.info(f"Burning track {target.id}...")
+        self._last_target_laser_coord = np.array(laser_coord)
         await self._laser_node.set_points(
             points=[Vector2(x=laser_coord[0], y=laser_coord[1])]
         )
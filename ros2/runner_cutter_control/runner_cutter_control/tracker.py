@@ -1,8 +1,10 @@
 import logging
 from enum import Enum
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from collections import deque
 
+import numpy as np
+
 
 class TrackState(Enum):
     PENDING = 1  # Still needs to be burned
@@ -104,6 +106,43 @@ class Tracker:
             return next_track
         return None
 
+    def get_pending_tracks_in_bounds(
+        self,
+        positions_to_coords: Callable[[np.ndarray], np.ndarray],
+        min_coord: Tuple[float, float] = (0.0, 0.0),
+        max_coord: Tuple[float, float] = (1.0, 1.0),
+    ) -> Tuple[List[Track], np.ndarray, List[Track]]:
+        """
+        Map the positions of all pending tracks to coords in one pass, and split the tracks by
+        whether their coords are within bounds. Tracks are not removed from the pending tracks.
+
+        Args:
+            positions_to_coords (Callable[[np.ndarray], np.ndarray]): Maps (N, 3) positions to (N, 2) coords, such as laser coords.
+            min_coord (Tuple[float, float]): Min (x, y) of in-bounds coords.
+            max_coord (Tuple[float, float]): Max (x, y) of in-bounds coords.
+        Returns:
+            Tuple[List[Track], np.ndarray, List[Track]]: Pending tracks within bounds in pending order, their (N, 2) coords, and pending tracks out of bounds.
+        """
+        pending_tracks = list(self._pending_tracks)
+        if not pending_tracks:
+            return [], np.empty((0, 2)), []
+
+        coords = positions_to_coords(
+            np.array([track.position for track in pending_tracks], dtype=np.float64)
+        )
+        in_bounds = np.all((coords >= min_coord) & (coords <= max_coord), axis=1)
+        in_bounds_tracks = [
+            track
+            for track, is_in_bounds in zip(pending_tracks, in_bounds)
+            if is_in_bounds
+        ]
+        out_of_bounds_tracks = [
+            track
+            for track, is_in_bounds in zip(pending_tracks, in_bounds)
+            if not is_in_bounds
+        ]
+        return in_bounds_tracks, coords[in_bounds], out_of_bounds_tracks
+
     def process_track(self, track_id: int, new_state: TrackState):
         if track_id not in self.tracks:
             return
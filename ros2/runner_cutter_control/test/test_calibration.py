@@ -0,0 +1,216 @@
+"""
+Decoding of batched calibration points, with fake laser and camera nodes. The camera detects a spot
+at a fixed pixel for each rendered laser coord, and its camera-space position encodes the laser
+coord, so that decoded correspondences can be checked directly.
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import pytest
+
+pytest.importorskip("rclpy")
+
+from runner_cutter_control.calibration import Calibration
+
+
+def _laser_coord_to_pixel(laser_coord: Tuple[float, float]) -> Tuple[float, float]:
+    return (100.0 + laser_coord[0] * 800.0, 100.0 + laser_coord[1] * 600.0)
+
+
+def _laser_coord_to_position(
+    laser_coord: Tuple[float, float],
+) -> Tuple[float, float, float]:
+    return (laser_coord[0], laser_coord[1], 1.0)
+
+
+def _make_instance(pixel: Tuple[float, float], position: Tuple[float, float, float]):
+    return SimpleNamespace(
+        point=SimpleNamespace(x=pixel[0], y=pixel[1]),
+        position=SimpleNamespace(x=position[0], y=position[1], z=position[2]),
+    )
+
+
+class FakeLaserNode:
+    def __init__(self):
+        self.laser_coords: List[Tuple[float, float]] = []
+
+    async def clear_points(self):
+        self.laser_coords = []
+
+    async def set_points(self, points):
+        self.laser_coords = [(point.x, point.y) for point in points]
+
+    async def set_color(self, r, g, b, i):
+        pass
+
+    async def play(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+class FakeCameraNode:
+    def __init__(
+        self,
+        laser_node: FakeLaserNode,
+        missed_laser_coords: Optional[List[List[Tuple[float, float]]]] = None,
+        spurious_pixels: Optional[List[List[Tuple[float, float]]]] = None,
+    ):
+        """
+        Args:
+            laser_node (FakeLaserNode): Laser node whose rendered laser coords are detected.
+            missed_laser_coords (Optional[List[List[Tuple[float, float]]]]): For each detection call, laser coords that are rendered but not detected. Calls beyond the list miss none.
+            spurious_pixels (Optional[List[List[Tuple[float, float]]]]): For each detection call, pixels of detections that do not correspond to any rendered laser coord. Calls beyond the list have none.
+        """
+        self._laser_node = laser_node
+        self._missed_laser_coords = missed_laser_coords or []
+        self._spurious_pixels = spurious_pixels or []
+        self.num_detections = 0
+
+    async def get_state(self):
+        return SimpleNamespace(state=SimpleNamespace(exposure_us=1.0, gain_db=0.0))
+
+    async def set_exposure(self, exposure_us):
+        pass
+
+    async def set_gain(self, gain_db):
+        pass
+
+    async def get_laser_detection(self, not_before_timestamp=0.0, **kwargs):
+        call_idx = self.num_detections
+        self.num_detections += 1
+        missed_laser_coords = (
+            self._missed_laser_coords[call_idx]
+            if call_idx < len(self._missed_laser_coords)
+            else []
+        )
+        spurious_pixels = (
+            self._spurious_pixels[call_idx]
+            if call_idx < len(self._spurious_pixels)
+            else []
+        )
+        instances = [
+            _make_instance(
+                _laser_coord_to_pixel(laser_coord),
+                _laser_coord_to_position(laser_coord),
+            )
+            for laser_coord in self._laser_node.laser_coords
+            if laser_coord not in missed_laser_coords
+        ]
+        instances.extend(
+            _make_instance(pixel, (-1.0, -1.0, -1.0)) for pixel in spurious_pixels
+        )
+        # Detections are not in the order laser coords are rendered in
+        instances.reverse()
+        return SimpleNamespace(
+            result=SimpleNamespace(instances=instances, timestamp=not_before_timestamp)
+        )
+
+
+LASER_COORDS = [(0.0, 0.0), (0.5, 0.0), (1.0, 0.0), (0.0, 0.5), (0.5, 0.5)]
+# Batch of 5 points: one frame with all points, then one frame per bit of codes 1 to 5
+NUM_FRAMES_PER_BATCH = 4
+
+
+def _calibrate_batch(camera_node: FakeCameraNode, laser_node: FakeLaserNode):
+    calibration = Calibration(laser_node, camera_node, (1.0, 0.0, 0.0))
+    asyncio.run(
+        calibration.add_calibration_points_batched(LASER_COORDS, len(LASER_COORDS))
+    )
+    return list(
+        zip(
+            calibration._calibration_laser_coords,
+            calibration._calibration_camera_points,
+        )
+    )
+
+
+def _assert_correspondences_correct(correspondences):
+    for laser_coord, camera_point in correspondences:
+        assert camera_point == _laser_coord_to_position(laser_coord)
+
+
+def test_batch_decodes_all_points():
+    laser_node = FakeLaserNode()
+    camera_node = FakeCameraNode(laser_node)
+
+    correspondences = _calibrate_batch(camera_node, laser_node)
+
+    assert camera_node.num_detections == NUM_FRAMES_PER_BATCH
+    assert sorted(laser_coord for laser_coord, _ in correspondences) == sorted(
+        LASER_COORDS
+    )
+    _assert_correspondences_correct(correspondences)
+
+
+def test_batch_ignores_spurious_spots():
+    laser_node = FakeLaserNode()
+    # A spot seen only in the frame with all points has code 0, and a spot seen in every frame has
+    # code 7, which is out of range. A spot seen in the code frames of the last point has its code
+    # 5, so that code is ambiguous and the last point is not decoded
+    camera_node = FakeCameraNode(
+        laser_node,
+        spurious_pixels=[
+            [(5.0, 5.0), (900.0, 5.0), (50.0, 700.0)],
+            [(900.0, 5.0), (50.0, 700.0)],
+            [(900.0, 5.0)],
+            [(900.0, 5.0), (50.0, 700.0)],
+        ],
+    )
+
+    correspondences = _calibrate_batch(camera_node, laser_node)
+
+    decoded_laser_coords = [laser_coord for laser_coord, _ in correspondences]
+    assert sorted(decoded_laser_coords) == sorted(LASER_COORDS[:-1])
+    _assert_correspondences_correct(correspondences)
+
+
+def test_batch_with_missed_spot_is_retried():
+    laser_node = FakeLaserNode()
+    # The first point is missed in the first code frame, which would otherwise corrupt its code
+    camera_node = FakeCameraNode(
+        laser_node, missed_laser_coords=[[], [LASER_COORDS[0]]]
+    )
+
+    correspondences = _calibrate_batch(camera_node, laser_node)
+
+    assert camera_node.num_detections == 2 + NUM_FRAMES_PER_BATCH
+    assert sorted(laser_coord for laser_coord, _ in correspondences) == sorted(
+        LASER_COORDS
+    )
+    _assert_correspondences_correct(correspondences)
+
+
+def test_batch_with_missed_spot_and_spurious_spot_is_retried():
+    laser_node = FakeLaserNode()
+    # A spurious spot makes up for the missed spot in the count of detections of the frame with all
+    # points, so the batch is only dropped once a code frame comes up short
+    camera_node = FakeCameraNode(
+        laser_node,
+        missed_laser_coords=[[LASER_COORDS[2]], [LASER_COORDS[2]]],
+        spurious_pixels=[[(5.0, 5.0)]],
+    )
+
+    correspondences = _calibrate_batch(camera_node, laser_node)
+
+    assert sorted(laser_coord for laser_coord, _ in correspondences) == sorted(
+        LASER_COORDS
+    )
+    _assert_correspondences_correct(correspondences)
+
+
+def test_failed_batches_fall_back_to_one_point_at_a_time():
+    laser_node = FakeLaserNode()
+    # Every attempt at the batch misses the first point in the frame with all points
+    camera_node = FakeCameraNode(
+        laser_node, missed_laser_coords=[[LASER_COORDS[0]]] * 3
+    )
+
+    correspondences = _calibrate_batch(camera_node, laser_node)
+
+    assert camera_node.num_detections == 3 + len(LASER_COORDS)
+    assert [laser_coord for laser_coord, _ in correspondences] == LASER_COORDS
+    _assert_correspondences_correct(correspondences)